@@ -0,0 +1,114 @@
+# File: assets.py
+
+import mmap
+import os
+import struct
+import threading
+
+# ASTEROIDS_ASSET_PACK=path moves the pack, e.g. to measure a cold start
+PACK_PATH = os.environ.get("ASTEROIDS_ASSET_PACK",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets.pack"))
+
+# Pack layout: header, then one entry record per asset followed by its key,
+# then the asset data (all little-endian). An entry is only used while its
+# source file still has the size and modification time recorded for it.
+MAGIC = b"APAK"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")  # magic, version, entry count
+ENTRY = struct.Struct("<HqqQQ")  # key length, source mtime_ns, source size, data offset, data length
+
+
+def source_stamp(source):
+    stat = os.stat(source)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class AssetPack:
+    # Decoded assets (e.g. raw sound samples) keyed by name, read through a
+    # read-only memory map so a warm launch skips decoding and only touches
+    # the pages it uses. New entries are staged with put() and written by
+    # save(), which replaces the whole file atomically.
+    def __init__(self, path=PACK_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.map = None
+        self.entries = None  # key -> (mtime_ns, size, offset, length)
+        self.staged = {}
+
+    def open(self):
+        self.entries = {}
+        try:
+            with open(self.path, "rb") as file:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+        try:
+            magic, version, count = HEADER.unpack_from(self.map)
+            if magic != MAGIC or version != VERSION:
+                return
+            offset = HEADER.size
+            for _ in range(count):
+                key_length, mtime, size, data_offset, length = ENTRY.unpack_from(self.map, offset)
+                offset += ENTRY.size
+                key = self.map[offset:offset + key_length].decode()
+                offset += key_length
+                if data_offset + length <= len(self.map):
+                    self.entries[key] = (mtime, size, data_offset, length)
+        except struct.error:
+            # Truncated pack: keep what was read, the rest is rebuilt
+            pass
+
+    def get(self, key, source):
+        # A read-only view of the cached data, or None if it is missing or
+        # older than its source
+        with self.lock:
+            if self.entries is None:
+                self.open()
+            entry = self.entries.get(key)
+            if entry is None or entry[:2] != source_stamp(source):
+                return None
+            offset, length = entry[2:]
+            return memoryview(self.map)[offset:offset + length]
+
+    def put(self, key, source, data):
+        with self.lock:
+            self.staged[key] = (*source_stamp(source), bytes(data))
+
+    def save(self):
+        with self.lock:
+            if not self.staged:
+                return
+            if self.entries is None:
+                self.open()
+            assets = {key: (mtime, size, self.map[offset:offset + length])
+                      for key, (mtime, size, offset, length) in self.entries.items()}
+            assets.update(self.staged)
+            self.staged = {}
+            keys = [key.encode() for key in assets]
+            offset = HEADER.size + sum(ENTRY.size + len(key) for key in keys)
+            index = bytearray(HEADER.pack(MAGIC, VERSION, len(assets)))
+            for key, (mtime, size, data) in zip(keys, assets.values()):
+                index += ENTRY.pack(len(key), mtime, size, offset, len(data))
+                index += key
+                offset += len(data)
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(index)
+                for _, _, data in assets.values():
+                    file.write(data)
+            os.replace(temporary, self.path)
+            self.close_map()
+            self.entries = None
+
+    def close_map(self):
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # A view handed out by get() is still alive; the map goes
+                # when it does
+                pass
+            self.map = None
+
+
+PACK = AssetPack()
@@ -0,0 +1,154 @@
+# File: audio.py
+
+import os
+import queue
+import threading
+import time
+import pygame
+from assets import PACK
+
+SOUND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+
+# Per sound: file, most voices it may use at once, minimum seconds between
+# two plays, longest it may play in seconds, and whether it may steal a busy
+# voice when none are free.
+SOUNDS = {
+    "shoot": ("shoot.wav", 3, 0.05, 0.3, True),
+    "explosion": ("explosion.wav", 4, 0.04, 1.0, True),
+    "thrust": ("thrust.wav", 1, 0.0, 0.3, False),
+}
+
+# Loaded sounds, shared by every SoundPlayer using the same backend
+BANKS = {}
+BANK_LOCK = threading.Lock()
+
+
+class PygameBackend:
+    def __init__(self, voices):
+        pygame.mixer.set_num_channels(max(voices, pygame.mixer.get_num_channels()))
+        # Keep pygame's own Sound.play() from picking our voices
+        pygame.mixer.set_reserved(voices)
+        self.channels = [pygame.mixer.Channel(i) for i in range(voices)]
+
+    @staticmethod
+    def load(path):
+        # Decoded samples are cached in the asset pack for the mixer's
+        # current output format, so later launches skip decoding
+        key = "sound:{}:{}:{}:{}".format(os.path.basename(path), *pygame.mixer.get_init())
+        data = PACK.get(key, path)
+        if data is not None:
+            with data:
+                return pygame.mixer.Sound(buffer=data)
+        sound = pygame.mixer.Sound(path)
+        PACK.put(key, path, sound.get_raw())
+        return sound
+
+    def length(self, sound):
+        return sound.get_length()
+
+    def play(self, voice, sound, max_time):
+        self.channels[voice].play(sound, maxtime=int(max_time * 1000))
+
+
+class NullBackend:
+    # Plays nothing and never touches the files, for headless runs. Every
+    # sound lasts its maximum play time.
+    def __init__(self, voices):
+        pass
+
+    @staticmethod
+    def load(path):
+        return path
+
+    def length(self, sound):
+        return float("inf")
+
+    def play(self, voice, sound, max_time):
+        pass
+
+
+def default_backend():
+    return PygameBackend if pygame.mixer.get_init() else NullBackend
+
+
+def load_bank(backend):
+    # Takes a backend class; safe to call from a loader thread ahead of the
+    # first SoundPlayer
+    with BANK_LOCK:
+        if backend not in BANKS:
+            BANKS[backend] = {name: backend.load(os.path.join(SOUND_DIR, file))
+                              for name, (file, *_) in SOUNDS.items()}
+            PACK.save()
+        return BANKS[backend]
+
+
+class SoundPlayer:
+    # World events are rate limited on the caller's thread and queued; a
+    # mixer thread assigns each sound to one of a fixed set of voices,
+    # stealing the one closest to finishing when all are busy.
+    def __init__(self, voices=8, backend=None, threaded=True):
+        if backend is None:
+            backend = default_backend()
+        self.backend = backend(voices)
+        self.bank = load_bank(backend)
+        self.voices = [None] * voices  # (sound name, end time) per voice
+        self.last_played = {}
+        self.played = 0
+        self.dropped = 0
+        self.stolen = 0
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self.run, name="audio", daemon=True)
+            self.thread.start()
+
+    def on_event(self, event, position):
+        settings = SOUNDS.get(event)
+        if settings is None:
+            return
+        now = time.perf_counter()
+        if now - self.last_played.get(event, -1.0) < settings[2]:
+            self.dropped += 1
+            return
+        self.last_played[event] = now
+        if self.thread is None:
+            self.play(event)
+        else:
+            self.queue.put(event)
+
+    def run(self):
+        while True:
+            name = self.queue.get()
+            if name is None:
+                break
+            self.play(name)
+
+    def play(self, name):
+        _, max_voices, _, max_time, steal = SOUNDS[name]
+        now = time.perf_counter()
+        busy = [i for i, voice in enumerate(self.voices) if voice is not None and voice[1] > now]
+        own = [i for i in busy if self.voices[i][0] == name]
+        if len(own) >= max_voices:
+            candidates = own
+        elif len(busy) < len(self.voices):
+            candidates = None
+        else:
+            candidates = busy
+        if candidates is None:
+            voice = next(i for i, voice in enumerate(self.voices) if voice is None or voice[1] <= now)
+        elif steal:
+            voice = min(candidates, key=lambda i: self.voices[i][1])
+            self.stolen += 1
+        else:
+            self.dropped += 1
+            return
+        sound = self.bank[name]
+        self.backend.play(voice, sound, max_time)
+        self.voices[voice] = (name, now + min(self.backend.length(sound), max_time))
+        self.played += 1
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,247 @@
+# File: batch_world.py
+
+import numpy as np
+from entities import BULLET_SPEED, TIMESTEP
+from world import LEFT, RIGHT, THRUST, FIRE  # action bits, one int per game per step
+
+SHIP_RADIUS = 15
+BULLET_RADIUS = 2
+BULLET_LIFETIME = 1.0  # seconds, as Bullet
+START_LIVES = 3
+
+
+class BatchWorld:
+    # Steps many independent games at once. Each game's entities live in a
+    # fixed number of slots along the second axis of the arrays below; an
+    # asteroid slot is free when its size is 0 and a bullet slot when its
+    # lifetime (in seconds) is 0. Asteroids that find no free slot are not
+    # created; `dropped` counts them per game. Mirrors World for the ship,
+    # asteroids and bullets; saucers and power-ups are not simulated.
+    def __init__(self, num_games, width=800, height=600, max_asteroids=64, max_bullets=32, seed=None):
+        self.num_games = num_games
+        self.width = width
+        self.height = height
+        self.max_asteroids = max_asteroids
+        self.max_bullets = max_bullets
+        self.rng = np.random.default_rng(seed)
+        self.bounds = np.array([width, height], dtype=np.float32)
+        self.inverse_bounds = 1 / self.bounds
+
+        n, a, b = num_games, max_asteroids, max_bullets
+        self.ship_position = np.zeros((n, 2), dtype=np.float32)
+        self.ship_speed = np.zeros((n, 2), dtype=np.float32)
+        self.ship_angle = np.zeros(n, dtype=np.float32)
+        self.asteroid_position = np.zeros((n, a, 2), dtype=np.float32)
+        self.asteroid_speed = np.zeros((n, a, 2), dtype=np.float32)
+        self.asteroid_size = np.zeros((n, a), dtype=np.int32)
+        self.bullet_position = np.zeros((n, b, 2), dtype=np.float32)
+        self.bullet_speed = np.zeros((n, b, 2), dtype=np.float32)
+        self.bullet_lifetime = np.zeros((n, b), dtype=np.float32)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.dropped = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int32)
+        self.level = np.zeros(n, dtype=np.int32)
+        self.games = np.arange(n)
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.num_games, dtype=bool)
+        self.ship_position[mask] = (self.width // 2, self.height // 2)
+        self.ship_speed[mask] = 0
+        self.ship_angle[mask] = 0
+        self.asteroid_size[mask] = 0
+        self.bullet_lifetime[mask] = 0
+        self.score[mask] = 0
+        self.lives[mask] = START_LIVES
+        self.level[mask] = 1
+        counts = np.where(mask, 4, 0)
+        self.spawn_asteroids(counts)
+        return self.observe()
+
+    def spawn_asteroids(self, counts):
+        # Fill the first `counts[g]` free slots of each game with new
+        # asteroids entering from a random screen edge.
+        free = self.asteroid_size == 0
+        rank = np.cumsum(free, axis=1) - 1
+        new = free & (rank < counts[:, None])
+        self.dropped += np.maximum(counts - free.sum(axis=1), 0)
+        total = int(new.sum())
+        if total == 0:
+            return
+        size = self.rng.integers(1, 4, total)
+        radius = size * 10
+        side = self.rng.integers(0, 4, total)
+        along_x = self.rng.integers(0, self.width + 1, total).astype(np.float64)
+        along_y = self.rng.integers(0, self.height + 1, total).astype(np.float64)
+        x = np.select([side == 0, side == 1, side == 2], [along_x, along_x, -radius], self.width + radius)
+        y = np.select([side == 0, side == 1, side == 2], [-radius, self.height + radius, along_y], along_y)
+        self.asteroid_size[new] = size
+        self.asteroid_position[new] = np.stack([x, y], axis=1)
+        self.asteroid_speed[new] = self.rng.uniform(-1, 1, (total, 2))
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        previous_score = self.score.copy()
+        previous_dropped = self.dropped.copy()
+
+        # Ship controls in World.step order: fire, rotate, then thrust
+        self.fire((actions & FIRE) != 0, np.radians(self.ship_angle))
+        self.ship_angle += 5 * (((actions & LEFT) != 0).astype(np.int32) - ((actions & RIGHT) != 0))
+        angle = np.radians(self.ship_angle)
+        thrust = (actions & THRUST) != 0
+        self.ship_speed[:, 0] += np.where(thrust, np.cos(angle) * 0.1, 0)
+        self.ship_speed[:, 1] -= np.where(thrust, np.sin(angle) * 0.1, 0)
+
+        # Motion, matching Ship/Asteroid/Bullet.update. Only the leading
+        # slots that can hold live entities are touched.
+        asteroids = self.asteroid_extent()
+        bullets = self.bullet_extent()
+        self.ship_position += self.ship_speed
+        self.ship_speed *= 0.99
+        self.wrap(self.ship_position)
+        self.asteroid_position[:, :asteroids] += self.asteroid_speed[:, :asteroids]
+        self.wrap(self.asteroid_position[:, :asteroids])
+        lifetime = self.bullet_lifetime[:, :bullets]
+        self.bullet_position[:, :bullets] += self.bullet_speed[:, :bullets]
+        self.wrap(self.bullet_position[:, :bullets])
+        # As entities.countdown: half a step of slack, expired reads 0
+        lifetime -= TIMESTEP
+        lifetime[lifetime <= TIMESTEP / 2] = 0
+
+        asteroids = self.check_collisions(asteroids, bullets)
+
+        # Level progression
+        cleared = ~(self.asteroid_size[:, :asteroids] > 0).any(axis=1)
+        if cleared.any():
+            self.level += cleared
+            self.spawn_asteroids(np.where(cleared, self.level + 3, 0))
+
+        reward = self.score - previous_score
+        done = self.lives <= 0
+        info = {}
+        if (self.dropped != previous_dropped).any():
+            info["dropped_asteroids"] = self.dropped - previous_dropped
+        if done.any():
+            info["final_score"] = np.where(done, self.score, 0)
+            info["final_level"] = np.where(done, self.level, 0)
+            self.reset(done)
+        return self.observe(), reward, done, info
+
+    def wrap(self, position):
+        # Same result as np.remainder for positions, but much cheaper on the
+        # strided slot slices passed in here.
+        position -= np.floor(position * self.inverse_bounds) * self.bounds
+
+    def asteroid_extent(self):
+        used = np.flatnonzero((self.asteroid_size != 0).any(axis=0))
+        return int(used[-1]) + 1 if len(used) else 0
+
+    def bullet_extent(self):
+        used = np.flatnonzero((self.bullet_lifetime != 0).any(axis=0))
+        return int(used[-1]) + 1 if len(used) else 0
+
+    def fire(self, firing, angle):
+        free = self.bullet_lifetime == 0
+        has_free = free.any(axis=1)
+        firing = firing & has_free
+        if not firing.any():
+            return
+        games = self.games[firing]
+        slots = free[firing].argmax(axis=1)
+        self.bullet_position[games, slots] = self.ship_position[games]
+        self.bullet_speed[games, slots, 0] = np.cos(angle[games]) * BULLET_SPEED
+        self.bullet_speed[games, slots, 1] = -np.sin(angle[games]) * BULLET_SPEED
+        self.bullet_lifetime[games, slots] = BULLET_LIFETIME
+
+    def check_collisions(self, asteroids, bullets):
+        # Returns the asteroid extent, which splitting may have grown
+        size = self.asteroid_size[:, :asteroids]
+        position = self.asteroid_position[:, :asteroids]
+        reach = (size * 10 + BULLET_RADIUS).astype(np.float32)
+        reach *= reach
+        reach[size == 0] = -1
+
+        # Bullet-Asteroid: each bullet takes the first asteroid it overlaps,
+        # each asteroid is destroyed by the first bullet that chose it. Only
+        # live bullets are tested, so cost follows the number in flight.
+        games, slots = np.nonzero(self.bullet_lifetime[:, :bullets])
+        bullet = self.bullet_position[games, slots]
+        dx = position[:, :, 0].take(games, axis=0)
+        dx -= bullet[:, 0, None]
+        dx *= dx
+        dy = position[:, :, 1].take(games, axis=0)
+        dy -= bullet[:, 1, None]
+        dy *= dy
+        dx += dy
+        hit = dx < reach.take(games, axis=0)
+        bullet_hit = np.flatnonzero(hit.any(axis=1))
+        if len(bullet_hit):
+            games, slots, target = games[bullet_hit], slots[bullet_hit], hit[bullet_hit].argmax(axis=1)
+            # np.nonzero yields bullets in (game, slot) order, so the first
+            # occurrence of each (game, asteroid) pair is the earliest bullet.
+            _, first = np.unique(games * self.max_asteroids + target, return_index=True)
+            games, slots, target = games[first], slots[first], target[first]
+            self.bullet_lifetime[games, slots] = 0
+            np.add.at(self.score, games, 100 * size[games, target])
+            self.split_asteroids(games, target)
+            asteroids = self.asteroid_extent()
+
+        # Ship-Asteroid, including fragments split off just now
+        size = self.asteroid_size[:, :asteroids]
+        position = self.asteroid_position[:, :asteroids]
+        reach = (size * 10 + SHIP_RADIUS).astype(np.float32)
+        reach *= reach
+        reach[size == 0] = -1
+        dx = position[:, :, 0] - self.ship_position[:, 0, None]
+        dx *= dx
+        dy = position[:, :, 1] - self.ship_position[:, 1, None]
+        dy *= dy
+        dx += dy
+        crashed = (dx < reach).any(axis=1)
+        if crashed.any():
+            self.lives -= crashed
+            self.ship_position[crashed] = (self.width // 2, self.height // 2)
+            self.ship_speed[crashed] = 0
+            self.ship_angle[crashed] = 0
+        return asteroids
+
+    def split_asteroids(self, games, parents):
+        # A destroyed asteroid bigger than size 1 becomes two smaller ones:
+        # the first reuses its slot, the second takes the next free slot.
+        size = self.asteroid_size
+        size[games, parents] -= 1
+        splitting = size[games, parents] > 0
+        games, parents = games[splitting], parents[splitting]
+        if len(games) == 0:
+            return
+        self.asteroid_speed[games, parents] = self.rng.uniform(-1, 1, (len(games), 2))
+
+        # Rank each request within its game (games arrive sorted) and hand
+        # out that game's free slots in order; the rest are dropped.
+        rows, row = np.unique(games, return_inverse=True)
+        free = size[rows] == 0
+        free_slots = np.argsort(~free, axis=1, kind="stable")
+        rank = np.arange(len(games)) - np.searchsorted(games, games)
+        placed = rank < free.sum(axis=1)[row]
+        np.add.at(self.dropped, games[~placed], 1)
+        games, parents, rank, row = games[placed], parents[placed], rank[placed], row[placed]
+        slots = free_slots[row, rank]
+        size[games, slots] = size[games, parents]
+        self.asteroid_position[games, slots] = self.asteroid_position[games, parents]
+        self.asteroid_speed[games, slots] = self.rng.uniform(-1, 1, (len(games), 2))
+
+    def observe(self):
+        # Arrays are views of the live state and change on the next step;
+        # copy anything that has to outlive it.
+        return {
+            "ship_position": self.ship_position,
+            "ship_speed": self.ship_speed,
+            "ship_angle": self.ship_angle,
+            "asteroid_position": self.asteroid_position,
+            "asteroid_size": self.asteroid_size,
+            "bullet_position": self.bullet_position,
+            "bullet_lifetime": self.bullet_lifetime,
+            "score": self.score,
+            "lives": self.lives,
+            "level": self.level,
+        }
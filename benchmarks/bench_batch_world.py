@@ -0,0 +1,61 @@
+# File: benchmarks/bench_batch_world.py
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from batch_world import BatchWorld, LEFT, RIGHT, THRUST, FIRE
+from world import World, Inputs
+
+NUM_GAMES = 1024
+STEPS = 600
+LOOP_GAMES = 16
+TARGET_SPEEDUP = 100
+
+
+def random_actions(rng, count):
+    # Mostly thrusting and turning, firing every few frames
+    actions = rng.integers(0, 8, count)
+    return actions | np.where(rng.random(count) < 0.2, FIRE, 0)
+
+
+def bench_loop(rng):
+    worlds = [World(800, 600, seed=i) for i in range(LOOP_GAMES)]
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        for world, action in zip(worlds, random_actions(rng, LOOP_GAMES)):
+            world.step(Inputs(bool(action & LEFT), bool(action & RIGHT),
+                              bool(action & THRUST), bool(action & FIRE)))
+            if world.game_over:
+                world.reset()
+    elapsed = time.perf_counter() - start
+    return LOOP_GAMES * STEPS / elapsed
+
+
+def bench_batch(rng):
+    batch = BatchWorld(NUM_GAMES, seed=0)
+    batch.reset()
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        batch.step(random_actions(rng, NUM_GAMES))
+    elapsed = time.perf_counter() - start
+    return NUM_GAMES * STEPS / elapsed
+
+
+def main():
+    rng = np.random.default_rng(0)
+    loop_rate = bench_loop(rng)
+    batch_rate = bench_batch(rng)
+    print(f"World.step loop:  {loop_rate:12,.0f} game-steps/s")
+    print(f"BatchWorld.step:  {batch_rate:12,.0f} game-steps/s ({NUM_GAMES} games)")
+    speedup = batch_rate / loop_rate
+    print(f"speedup:          {speedup:12.1f}x")
+    print(f"{TARGET_SPEEDUP}x target:      {'met' if speedup >= TARGET_SPEEDUP else 'not met':>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# File: benchmarks/bench_collisions.py
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from entities import Asteroid, Bullet, FlyingSaucer
+from world import World
+
+WIDTH = 800
+HEIGHT = 600
+FRAMES = 20
+
+
+def populate(count):
+    # Roughly the mix seen in a busy late level: half rocks, the rest shots
+    # plus the odd saucer.
+    random.seed(count)
+    num_saucers = max(1, count // 50)
+    num_asteroids = count // 2
+    num_bullets = count - num_asteroids - num_saucers
+    asteroids = [Asteroid(random.randint(1, 3), WIDTH, HEIGHT,
+                          (random.uniform(0, WIDTH), random.uniform(0, HEIGHT)))
+                 for _ in range(num_asteroids)]
+    bullets = [Bullet((random.uniform(0, WIDTH), random.uniform(0, HEIGHT)), random.uniform(0, 360))
+               for _ in range(num_bullets)]
+    saucers = [FlyingSaucer(WIDTH, HEIGHT) for _ in range(num_saucers)]
+    return asteroids, bullets, saucers
+
+
+def naive_pairs(bullets, asteroids, saucers):
+    hits = 0
+    for bullet in bullets:
+        for asteroid in asteroids:
+            if bullet.collides_with(asteroid):
+                hits += 1
+                break
+        for saucer in saucers:
+            if bullet.collides_with(saucer):
+                hits += 1
+                break
+    return hits
+
+
+def bench(world, count):
+    asteroids, bullets, saucers = populate(count)
+    grid_total = 0.0
+    naive_total = 0.0
+    for _ in range(FRAMES):
+        world.asteroids = list(asteroids)
+        world.bullets = list(bullets)
+        world.flying_saucers = list(saucers)
+        start = time.perf_counter()
+        world.check_collisions()
+        grid_total += time.perf_counter() - start
+
+        # The old all-pairs loop is quadratic; sample it once at the top end.
+        if count <= 1000 or _ == 0:
+            start = time.perf_counter()
+            naive_pairs(bullets, asteroids, saucers)
+            naive_total += time.perf_counter() - start
+    naive_frames = FRAMES if count <= 1000 else 1
+    return grid_total / FRAMES * 1000, naive_total / naive_frames * 1000
+
+
+def main():
+    world = World(WIDTH, HEIGHT, seed=0)
+    # The same entity objects are reused for every frame, so destroyed ones
+    # must not be recycled by the world's pools.
+    world.bullet_pool.max_size = 0
+    world.asteroid_pool.max_size = 0
+    print(f"{'entities':>10} {'grid ms/frame':>15} {'all-pairs ms':>15}")
+    for count in (10, 100, 1000, 10000):
+        grid_ms, naive_ms = bench(world, count)
+        print(f"{count:>10} {grid_ms:>15.3f} {naive_ms:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# File: benchmarks/bench_leaderboard.py
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from leaderboard import Leaderboard
+
+PROCESSES = 16
+GAMES = 200  # per process
+ROWS = 100000
+
+
+def finish_games(path, index, barrier, results):
+    # Every process starts submitting at the same moment, like a batch of
+    # headless games ending together
+    leaderboard = Leaderboard(path)
+    rng = random.Random(index)
+    barrier.wait()
+    times = []
+    for game in range(GAMES):
+        start = time.perf_counter()
+        leaderboard.submit(rng.randrange(100000), rng.randrange(1, 20), name=f"bot{index}",
+                           replay=f"game{index}-{game}.rec")
+        times.append(time.perf_counter() - start)
+    leaderboard.close()
+    results.put(times)
+
+
+def bench_concurrent(path):
+    barrier = multiprocessing.Barrier(PROCESSES)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=finish_games, args=(path, i, barrier, results))
+               for i in range(PROCESSES)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    times = sorted(t for _ in workers for t in results.get())
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    leaderboard = Leaderboard(path, threaded=False)
+    count = leaderboard.reader.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+    check = leaderboard.reader.execute("PRAGMA integrity_check").fetchone()[0]
+    leaderboard.close()
+    print(f"{PROCESSES} processes x {GAMES} games submitted at once:")
+    print(f"  {count} of {PROCESSES * GAMES} rows stored, integrity check: {check}")
+    print(f"  {elapsed:.2f}s until every process had exited")
+    print(f"  submit() on a game thread: {times[len(times) // 2] * 1e6:.0f} us median, "
+          f"{times[len(times) * 99 // 100] * 1e6:.0f} us p99, {times[-1] * 1e6:.0f} us worst "
+          f"(one core shared by {PROCESSES} processes)")
+
+
+def bench_queries(path):
+    leaderboard = Leaderboard(path)
+    rng = random.Random(0)
+    for _ in range(ROWS):
+        leaderboard.submit(rng.randrange(1000000), rng.randrange(1, 20), name="filler")
+    leaderboard.flush()
+    repeats = 1000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        leaderboard.top(10)
+    top = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        leaderboard.high_score()
+    high = (time.perf_counter() - start) / repeats
+    plan = leaderboard.reader.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM scores ORDER BY score DESC, created LIMIT 10").fetchall()
+    leaderboard.close()
+    print(f"\nqueries over {ROWS + PROCESSES * GAMES} rows:")
+    print(f"  {top * 1e6:8.1f} us top(10)")
+    print(f"  {high * 1e6:8.1f} us high_score()")
+    print(f"  plan: {plan[0][-1]}")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "leaderboard.db")
+        bench_concurrent(path)
+        bench_queries(path)
@@ -0,0 +1,84 @@
+# File: benchmarks/bench_levels.py
+
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from levels import LevelSet
+from renderer import Renderer
+from world import World, Inputs
+
+WIDTH = 800
+HEIGHT = 600
+COUNTS = (100, 1000, 4000)
+TRANSITIONS = 5
+# Frames drawn before each level change, at 60 per second. Real levels last
+# far longer; this is enough for the planner thread and the renderer to
+# get the next wave ready.
+LEAD_FRAMES = 90
+# Frames timed after the change, once things have settled
+SETTLED_FRAMES = 30
+
+
+def legacy_spawn(world, count):
+    # What a level change used to do: random sizes, each asteroid generating
+    # its own outline from the world's random stream
+    for _ in range(count):
+        world.asteroids.append(world.make_asteroid(world.rng.randint(1, 3)))
+
+
+def frame(world, renderer):
+    start = time.perf_counter()
+    renderer.capture(world)
+    world.step(Inputs())
+    renderer.update()
+    renderer.draw(world)
+    return time.perf_counter() - start
+
+
+def transition_times(window, world):
+    # Whole frames (tick and draw): the one where the field is empty and
+    # the next wave spawns, and the frames after it
+    renderer = Renderer(window, WIDTH, HEIGHT, dirty_rects=True, seed=1)
+    changes = []
+    settled = []
+    for _ in range(TRANSITIONS):
+        world.asteroid_pool.release_all(world.asteroids)
+        world.asteroids = []
+        for _ in range(LEAD_FRAMES):
+            renderer.draw(world)
+            time.sleep(1 / 60)
+        changes.append(frame(world, renderer))
+        settled.extend(frame(world, renderer) for _ in range(SETTLED_FRAMES))
+    changes.sort()
+    settled.sort()
+    return changes[len(changes) // 2] * 1000, changes[-1] * 1000, settled[len(settled) // 2] * 1000
+
+
+def main():
+    pygame.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    print(f"ms per frame at a level change: median / worst of {TRANSITIONS} changes, "
+          f"then the median frame after")
+    print(f"{'asteroids':>9} {'legacy':>22} {'on demand':>22} {'planned ahead':>22}")
+    for count in COUNTS:
+        levels = LevelSet({"count": [count, 0], "max_count": count})
+        results = []
+        for threaded, legacy in ((False, True), (False, False), (True, False)):
+            world = World(WIDTH, HEIGHT, seed=1, levels=levels, threaded_waves=threaded)
+            if legacy:
+                world.spawn_wave = lambda level, world=world: legacy_spawn(world, count)
+            world.step(Inputs())
+            results.append("%6.2f / %6.2f, %6.2f" % transition_times(window, world))
+        print(f"{count:9d} {results[0]:>22} {results[1]:>22} {results[2]:>22}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
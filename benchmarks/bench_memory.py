@@ -0,0 +1,93 @@
+# File: benchmarks/bench_memory.py
+
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from entities import Asteroid, Bullet, FlyingSaucer, PowerUp, TICK_RATE
+from world import World, Inputs
+
+WIDTH = 800
+HEIGHT = 600
+SESSION_TICKS = 10 * 60 * TICK_RATE  # a 10-minute session
+SAMPLE = 10000
+
+
+def dict_backed(cls):
+    # The same class without __slots__, i.e. how entities were stored before
+    attrs = {name: value for name, value in vars(cls).items()
+             if name not in cls.__slots__ and name not in ("__slots__", "__dict__", "__weakref__")}
+    return type("Dict" + cls.__name__, (), attrs)
+
+
+def bytes_per_entity(make):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [make() for _ in range(SAMPLE)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / SAMPLE
+
+
+def run_session(pooled):
+    collections = [0, 0, 0]
+
+    def count(phase, info):
+        if phase == "start":
+            collections[info["generation"]] += 1
+
+    rng = random.Random(1)
+    world = World(WIDTH, HEIGHT, seed=1)
+    if not pooled:
+        world.bullet_pool.max_size = 0
+        world.asteroid_pool.max_size = 0
+    gc.collect()
+    gc.callbacks.append(count)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for tick in range(SESSION_TICKS):
+        world.step(Inputs(left=rng.random() < 0.3, right=rng.random() < 0.3,
+                          thrust=rng.random() < 0.4, fire=tick % 4 == 0))
+        if world.game_over:
+            world.reset()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    gc.callbacks.remove(count)
+    allocations = world.bullet_pool.created + world.asteroid_pool.created
+    return elapsed, collections, allocations, peak
+
+
+def main():
+    print("bytes per entity (object plus its lists):")
+    samples = {
+        Bullet: lambda cls: cls((400, 300), 45),
+        Asteroid: lambda cls: cls(3, WIDTH, HEIGHT),
+        FlyingSaucer: lambda cls: cls(WIDTH, HEIGHT),
+        PowerUp: lambda cls: cls("shield", WIDTH, HEIGHT),
+    }
+    for cls, make in samples.items():
+        legacy_cls = dict_backed(cls)
+        slotted = bytes_per_entity(lambda: make(cls))
+        legacy = bytes_per_entity(lambda: make(legacy_cls))
+        print(f"  {cls.__name__:<14} {slotted:8.0f} B with __slots__, {legacy:8.0f} B dict-backed")
+
+    print(f"\n{SESSION_TICKS} tick session:")
+    for pooled in (False, True):
+        elapsed, collections, allocations, peak = run_session(pooled)
+        label = "pooled" if pooled else "unpooled"
+        print(f"  {label:<9} {elapsed:6.1f}s (traced), {allocations:6} bullet/asteroid allocations, "
+              f"peak {peak / 1024:7.1f} KiB, "
+              f"gc collections gen0/1/2: {collections[0]}/{collections[1]}/{collections[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# File: benchmarks/bench_particles.py
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from particles import ParticleSystem
+
+WIDTH = 800
+HEIGHT = 600
+TARGET_LIVE = 50000
+FRAMES = 300
+FRAME_BUDGET_MS = 1000 / 60
+
+
+def main():
+    pygame.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    random.seed(0)
+    system = ParticleSystem(capacity=65536)
+    colors = [(255, 255, 255), (255, 128, 0), (0, 255, 255)]
+
+    def top_up():
+        while system.live_count() < TARGET_LIVE:
+            for _ in range(50):
+                system.create_explosion((random.uniform(0, WIDTH), random.uniform(0, HEIGHT)),
+                                        random.choice(colors))
+
+    top_up()
+    frame_times = []
+    live_counts = []
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        top_up()
+        system.update()
+        window.fill((0, 0, 0))
+        system.draw(window)
+        frame_times.append((time.perf_counter() - start) * 1000)
+        live_counts.append(system.live_count())
+
+    frame_times.sort()
+    mean = sum(frame_times) / len(frame_times)
+    p95 = frame_times[int(len(frame_times) * 0.95)]
+    print(f"live particles: min {min(live_counts)}, mean {sum(live_counts) // len(live_counts)}")
+    print(f"frame time: mean {mean:.2f} ms, p95 {p95:.2f} ms (budget {FRAME_BUDGET_MS:.2f} ms)")
+    print("sustains 60 FPS" if p95 <= FRAME_BUDGET_MS else "misses 60 FPS")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
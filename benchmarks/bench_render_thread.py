@@ -0,0 +1,84 @@
+# File: benchmarks/bench_render_thread.py
+
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from entities import Asteroid
+from render_thread import RenderThread
+from renderer import CommandBuffer, Renderer
+from world import World, Inputs
+
+WIDTH = 800
+HEIGHT = 600
+FRAMES = 300
+COUNTS = (100, 1000, 5000)
+
+
+def field(count):
+    world = World(WIDTH, HEIGHT, seed=count, threaded_waves=False)
+    rng = random.Random(count)
+    world.asteroids = [Asteroid(rng.randint(1, 3), WIDTH, HEIGHT, (rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT)), rng)
+                       for _ in range(count)]
+    for asteroid in world.asteroids:
+        asteroid.id = world.new_id()
+    return world
+
+
+def run(window, count, threaded):
+    # One tick and one frame at a time, as Game.run and Game.present do.
+    # Returns the mean frame time and the main thread's share of it in ms.
+    world = field(count)
+    renderer = Renderer(window, WIDTH, HEIGHT, dirty_rects=True, seed=count)
+    world.subscribe(renderer.on_event)
+    render_thread = RenderThread(renderer) if threaded else None
+    frame = CommandBuffer()
+    submitted = False
+    inputs = Inputs(left=True, fire=True)
+    busy = []
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        begin = time.perf_counter()
+        renderer.capture(world)
+        world.step(inputs)
+        renderer.update()
+        if render_thread is None:
+            renderer.draw(world, 0.5)
+            busy.append(time.perf_counter() - begin)
+            renderer.present()
+        else:
+            renderer.record(world, 0.5, frame)
+            busy.append(time.perf_counter() - begin)
+            render_thread.wait()
+            if submitted:
+                renderer.present()
+            frame = render_thread.submit(frame)
+            submitted = True
+    if render_thread is not None:
+        render_thread.close()
+    elapsed = time.perf_counter() - start
+    return elapsed / FRAMES * 1000, statistics.fmean(busy) * 1000
+
+
+def main():
+    pygame.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    print(f"{FRAMES} frames, one tick each, on {os.cpu_count()} CPU(s)")
+    print(f"{'asteroids':>10} {'mode':>9} {'frame ms':>9} {'main thread ms':>15}")
+    for count in COUNTS:
+        for threaded in (False, True):
+            frame, busy = run(window, count, threaded)
+            print(f"{count:10d} {'threaded' if threaded else 'inline':>9} {frame:9.3f} {busy:15.3f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# File: benchmarks/bench_saucers.py
+
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from collision import time_of_impact
+from entities import Bullet, FlyingSaucer, Ship
+from saucer_ai import DIFFICULTIES, DIFFICULTY_NAMES, SaucerAI
+from world import World
+
+WIDTH = 800
+HEIGHT = 600
+TICKS = 600
+LEVEL = 20
+COUNTS = (1, 10, 100, 200)
+SHOTS = 5000
+
+
+def saucer_world(count, budget, difficulty="hard"):
+    world = World(WIDTH, HEIGHT, seed=count, threaded_waves=False, difficulty=difficulty)
+    world.saucer_ai.budget = budget
+    world.level = LEVEL
+    world.asteroids = []
+    world.spawn_wave(LEVEL)
+    for _ in range(count):
+        saucer = FlyingSaucer(WIDTH, HEIGHT, world.rng)
+        saucer.id = world.new_id()
+        world.flying_saucers.append(saucer)
+    return world
+
+
+def bench_cost(count, budget):
+    # Time spent flying the saucers each tick, with the asteroid field
+    # moving underneath them
+    world = saucer_world(count, budget)
+    ships = [world.ship]
+    times = []
+    for _ in range(TICKS):
+        for asteroid in world.asteroids:
+            asteroid.update(WIDTH, HEIGHT)
+        world.bullets.clear()
+        start = time.perf_counter()
+        world.update_saucers(ships)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.fmean(times) * 1000, times[int(len(times) * 0.95)] * 1000
+
+
+def aim(ai, rng):
+    # One shot from a saucer at a ship cruising in a random direction,
+    # possibly across a screen edge. Returns whether it hits.
+    saucer = FlyingSaucer(WIDTH, HEIGHT, rng)
+    saucer.position = [rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT)]
+    saucer.speed = [0, 0]
+    angle = rng.uniform(0, math.tau)
+    distance = rng.uniform(80, 250)
+    ship = Ship((saucer.position[0] + math.cos(angle) * distance) % WIDTH,
+                (saucer.position[1] + math.sin(angle) * distance) % HEIGHT)
+    heading = rng.uniform(0, math.tau)
+    cruise = rng.uniform(1, 4)
+    ship.speed = [math.cos(heading) * cruise, math.sin(heading) * cruise]
+    ships = [ship]
+    ai.plan(saucer, ships, [], None, WIDTH, HEIGHT)
+    bullet = ai.shoot(saucer, ships, Bullet, WIDTH, HEIGHT)
+    while bullet.lifetime > 0:
+        bullet.update(WIDTH, HEIGHT)
+        ship.position[0] = (ship.position[0] + ship.speed[0]) % WIDTH
+        ship.position[1] = (ship.position[1] + ship.speed[1]) % HEIGHT
+        if time_of_impact(bullet, ship, WIDTH, HEIGHT) is not None:
+            return True
+    return False
+
+
+def bench_accuracy(difficulty):
+    ai = SaucerAI(difficulty)
+    # Aim only; dodging needs an asteroid field
+    ai.settings = dict(DIFFICULTIES[difficulty], avoid=0)
+    rng = random.Random(difficulty)
+    return sum(aim(ai, rng) for _ in range(SHOTS)) / SHOTS
+
+
+def main():
+    print(f"saucer AI per tick over a level-{LEVEL} field, {TICKS} ticks, hard difficulty")
+    print(f"{'saucers':>8} {'budget':>8} {'mean ms':>8} {'p95 ms':>8}")
+    for count in COUNTS:
+        for budget in (count, SaucerAI().budget):
+            mean, p95 = bench_cost(count, budget)
+            print(f"{count:8d} {budget:8d} {mean:8.3f} {p95:8.3f}")
+    print()
+    print(f"single shots at a cruising ship, {SHOTS} per difficulty")
+    print(f"{'difficulty':>10} {'hit rate':>9}")
+    for difficulty in DIFFICULTY_NAMES:
+        print(f"{difficulty:>10} {bench_accuracy(difficulty):9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# File: benchmarks/bench_spectators.py
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from entities import TICK_RATE
+from farm import random_policy
+from spectator import (StateEncoder, SpectatorState, SpectatorServer, broadcast_game, watch,
+                       TOLERANCE)
+from world import World
+
+WIDTH = 800
+HEIGHT = 600
+TICKS = 36000  # ten minutes of play
+SPECTATORS = 100
+SECONDS = 10
+
+
+def max_error(world, state):
+    # Largest distance along either axis between an entity and where the
+    # spectator draws it
+    pairs = [(world.ship, state.ship)]
+    for entities in (world.asteroids, world.bullets, world.power_ups):
+        pairs += [(entity, state.index[entity.id]) for entity in entities]
+    error = 0.0
+    for entity, view in pairs:
+        for axis, size in ((0, WIDTH), (1, HEIGHT)):
+            d = abs(entity.position[axis] - view.position[axis]) % size
+            error = max(error, min(d, size - d))
+    return error
+
+
+def bench_codec():
+    # Encode and decode in lockstep, with a second spectator joining from a
+    # keyframe halfway through.
+    world = World(WIDTH, HEIGHT, seed=3)
+    encoder = StateEncoder(WIDTH, HEIGHT)
+    early = SpectatorState()
+    late = None
+    rng = random.Random(3)
+    encode_time = 0.0
+    total_bytes = 0
+    entity_frames = 0
+    error = 0.0
+    encoder.encode(world)
+    early.apply(encoder.keyframe())
+    for tick in range(TICKS):
+        world.step(random_policy(world, rng))
+        if world.game_over:
+            world.reset()
+        start = time.perf_counter()
+        delta = encoder.encode(world)
+        encode_time += time.perf_counter() - start
+        total_bytes += len(delta) + 2
+        entity_frames += len(world.asteroids) + len(world.bullets) + len(world.flying_saucers) + len(world.power_ups)
+        early.apply(delta)
+        if late is None and tick == TICKS // 2:
+            late = SpectatorState()
+            late.apply(encoder.keyframe())
+        elif late is not None:
+            late.apply(delta)
+            assert late.ship.position == early.ship.position
+            assert all(view.position == early.index[i].position for i, view in late.index.items())
+        error = max(error, max_error(world, early))
+
+    seconds = TICKS / TICK_RATE
+    print(f"codec, {TICKS} ticks ({seconds / 60:.0f} min of play):")
+    print(f"  {total_bytes / seconds:8.0f} bytes/s per spectator ({total_bytes / TICKS:.1f} bytes/tick)")
+    print(f"  {encode_time / TICKS * 1e6:8.1f} us to encode a tick, "
+          f"{encode_time / entity_frames * 1e9:.0f} ns per entity")
+    print(f"  {error:8.2f} px largest drift (tolerance {TOLERANCE} px); late joiner matched exactly")
+
+
+async def bench_fanout():
+    world = World(WIDTH, HEIGHT, seed=5)
+    server = SpectatorServer(StateEncoder(WIDTH, HEIGHT))
+    await server.start()
+    received = [0] * SPECTATORS
+
+    def counter(index):
+        def on_frame(state, events, size):
+            received[index] += size + 2
+        return on_frame
+
+    clients = [asyncio.create_task(watch("127.0.0.1", server.port, SpectatorState(), counter(i)))
+               for i in range(SPECTATORS)]
+    start = time.perf_counter()
+    await broadcast_game(world, server, random_policy, SECONDS)
+    elapsed = time.perf_counter() - start
+    await server.close()
+    await asyncio.gather(*clients, return_exceptions=True)
+    per_viewer = sum(received) / SPECTATORS / elapsed
+    print(f"\nloopback fan-out, {SPECTATORS} spectators for {SECONDS}s:")
+    print(f"  {SECONDS * TICK_RATE / elapsed:8.1f} ticks/s achieved (target {TICK_RATE})")
+    print(f"  {per_viewer:8.0f} bytes/s received per spectator, {server.keyframes_sent} keyframes sent")
+
+
+if __name__ == "__main__":
+    bench_codec()
+    asyncio.run(bench_fanout())
@@ -0,0 +1,47 @@
+# File: benchmarks/bench_sprites.py
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from entities import Asteroid
+from renderer import Renderer
+from world import World
+
+WIDTH = 800
+HEIGHT = 600
+FRAMES = 120
+
+
+def main():
+    pygame.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    print(f"{'asteroids':>10} {'draw ms/frame':>15} {'hit rate':>10} {'cache KiB':>10}")
+    for count in (10, 100, 1000, 5000):
+        random.seed(count)
+        world = World(WIDTH, HEIGHT, seed=count)
+        world.asteroids = [Asteroid(random.randint(1, 3), WIDTH, HEIGHT,
+                                    (random.uniform(0, WIDTH), random.uniform(0, HEIGHT)))
+                           for _ in range(count)]
+        for asteroid in world.asteroids:
+            asteroid.id = world.new_id()
+        renderer = Renderer(window, WIDTH, HEIGHT)
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            world.ship.rotate(1)
+            renderer.draw(world)
+        elapsed = (time.perf_counter() - start) / FRAMES * 1000
+        stats = renderer.sprites.stats()
+        print(f"{count:>10} {elapsed:>15.3f} {stats['hit_rate']:>10.1%} {stats['memory_bytes'] // 1024:>10}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# File: benchmarks/bench_starfield.py
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from starfield import Starfield
+
+WIDTH = 800
+HEIGHT = 600
+FRAMES = 600
+COUNTS = (100, 1000, 10000, 50000)
+
+
+class LegacyStarfield:
+    # The previous implementation: one object and one draw call per star
+    def __init__(self, width, height, rng, count):
+        self.height = height
+        self.stars = [[rng.randint(0, width), rng.randint(0, height), rng.uniform(0.1, 0.5)]
+                      for _ in range(count)]
+
+    def update(self):
+        for star in self.stars:
+            star[1] += star[2]
+            if star[1] > self.height:
+                star[1] = 0
+
+    def draw(self, window):
+        return [pygame.draw.circle(window, (255, 255, 255), (int(x), int(y)), 1)
+                for x, y, _ in self.stars]
+
+
+def frame_cost(window, starfield, clear, erase=None):
+    # The layered starfield paints the background itself, so it replaces the
+    # clear. With `erase` it draws as in dirty rect mode, repainting only
+    # that and the stars that moved while its far layer stands still.
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        if clear:
+            window.fill((0, 0, 0))
+        starfield.update()
+        if clear:
+            starfield.draw(window)
+        else:
+            starfield.draw(window, None, erase)
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+
+def main():
+    pygame.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    print("ms per frame to clear, update and draw the starfield")
+    print(f"{'stars':>8} {'per-star':>9} {'repaint':>8} {'dirty':>8} {'build ms':>9}")
+    for count in COUNTS:
+        legacy = frame_cost(window, LegacyStarfield(WIDTH, HEIGHT, random.Random(0), count), True) \
+            if count <= 10000 else float("nan")
+        start = time.perf_counter()
+        starfield = Starfield(WIDTH, HEIGHT, random.Random(0), count=count)
+        build = (time.perf_counter() - start) * 1000
+        repaint = frame_cost(window, starfield, False)
+        dirty = frame_cost(window, starfield, False, [])
+        print(f"{count:8d} {legacy:9.3f} {repaint:8.3f} {dirty:8.3f} {build:9.1f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# File: benchmarks/bench_startup.py
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RUNS = 5
+TARGET_MS = 150
+
+
+def launch(pack, database):
+    # One launch of main.py up to its first menu frame. Returns the time to
+    # the first frame, the part of it spent importing pygame, and to the
+    # game being ready, as measured in the game, and the wall time of the
+    # whole process.
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", ASTEROIDS_STARTUP_PROBE="1",
+               ASTEROIDS_ASSET_PACK=pack, ASTEROIDS_LEADERBOARD=database, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, os.path.join(ROOT, "main.py")], env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    wall = (time.perf_counter() - start) * 1000
+    first_frame, pygame_import = re.search(r"first frame ([\d.]+) ms \(pygame import ([\d.]+) ms\)", output).groups()
+    ready = float(re.search(r"game ready ([\d.]+) ms", output).group(1))
+    return float(first_frame), float(pygame_import), ready, wall
+
+
+def report(label, runs):
+    first_frame, pygame_import, ready, wall = (statistics.median(values) for values in zip(*runs))
+    verdict = "ok" if first_frame < TARGET_MS else "over target"
+    print(f"{label:>6} {first_frame:12.1f} {pygame_import:15.1f} {ready:11.1f} {wall:10.1f}  {verdict}")
+
+
+def main():
+    print(f"median of {RUNS} launches, target first frame < {TARGET_MS} ms")
+    print(f"{'':>6} {'first frame':>12} {'pygame import':>15} {'game ready':>11} {'process':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        pack = os.path.join(directory, "assets.pack")
+        database = os.path.join(directory, "leaderboard.db")
+        # Each cold launch starts without the pack and rebuilds it
+        cold = []
+        for _ in range(RUNS):
+            if os.path.exists(pack):
+                os.remove(pack)
+            cold.append(launch(pack, database))
+        report("cold", cold)
+        report("warm", [launch(pack, database) for _ in range(RUNS)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# File: benchmarks/bench_swept.py
+
+import math
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from collision import time_of_impact
+from entities import Asteroid, Bullet, TICK_RATE
+
+WIDTH = 800
+HEIGHT = 600
+SHOTS = 20000
+# Ticks merged into one, i.e. logic at 60, 30, 15 and 7.5 Hz
+STEPS = (1, 2, 4, 8)
+
+
+def shoot(rng, step):
+    # One bullet aimed to pass through a small, still asteroid somewhere
+    # along its flight, possibly across a screen edge. Returns whether a
+    # discrete and a swept test see the hit.
+    asteroid = Asteroid(1, WIDTH, HEIGHT, (rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT)), rng, [0, 0])
+    angle = rng.uniform(0, 360)
+    distance = rng.uniform(20, 200)
+    miss = rng.uniform(-0.9, 0.9) * (asteroid.radius + 2)  # off-centre, but always within reach
+    radians = math.radians(angle)
+    start = (asteroid.position[0] - math.cos(radians) * distance + math.sin(radians) * miss,
+             asteroid.position[1] + math.sin(radians) * distance + math.cos(radians) * miss)
+    bullet = Bullet([start[0] % WIDTH, start[1] % HEIGHT], angle)
+    bullet.speed[:] = [bullet.speed[0] * step, bullet.speed[1] * step]
+    discrete = swept = False
+    dt = step / TICK_RATE
+    while bullet.lifetime > 0 and not (discrete and swept):
+        bullet.update(WIDTH, HEIGHT, dt)
+        asteroid.update(WIDTH, HEIGHT)
+        discrete = discrete or bullet.collides_with(asteroid)
+        swept = swept or time_of_impact(bullet, asteroid, WIDTH, HEIGHT) is not None
+    return discrete, swept
+
+
+def main():
+    print(f"bullets aimed through a size-1 asteroid, {SHOTS} shots per tick rate")
+    print(f"{'logic Hz':>9} {'px/tick':>8} {'discrete missed':>16} {'swept missed':>13}")
+    for step in STEPS:
+        rng = random.Random(step)
+        discrete_hits = swept_hits = 0
+        for _ in range(SHOTS):
+            discrete, swept = shoot(rng, step)
+            discrete_hits += discrete
+            swept_hits += swept
+        print(f"{TICK_RATE / step:9.1f} {5 * step:8d} {1 - discrete_hits / SHOTS:16.1%} "
+              f"{1 - swept_hits / SHOTS:13.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# File: benchmarks/suite.py
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from entities import Asteroid, FlyingSaucer
+from particles import ParticleSystem
+from renderer import Renderer
+from starfield import Starfield
+from world import World, Inputs
+
+WIDTH = 800
+HEIGHT = 600
+FRAMES = 300
+WARMUP = 30
+ALLOC_FRAMES = 60
+# Timed runs of each case, each from a fresh scenario; results are the
+# median over runs
+REPEATS = 5
+# Differences below these are noise, whatever the percentage. A time is
+# also only a regression if it moved by more than its p95 varied between
+# runs, in the baseline or now.
+MIN_TIME_MS = 0.05
+MIN_ALLOC_KB = 4.0
+
+
+# Scenarios: each builds a World already in the described state and returns
+# it with a function giving the inputs for a frame. The ship's shield is kept
+# up so no scenario ends early.
+
+def level20():
+    world = World(WIDTH, HEIGHT, seed=20, threaded_waves=False)
+    world.asteroid_pool.release_all(world.asteroids)
+    world.asteroids = []
+    world.level = 20
+    world.spawn_wave(world.level)
+
+    def inputs(frame):
+        return Inputs(left=frame % 90 < 30, thrust=frame % 60 < 20, fire=frame % 10 == 0)
+    return world, inputs
+
+
+def barrage():
+    # The ship fires every frame while six saucers shoot back
+    world = World(WIDTH, HEIGHT, seed=7, threaded_waves=False)
+    for _ in range(6):
+        saucer = FlyingSaucer(WIDTH, HEIGHT, world.rng)
+        saucer.id = world.new_id()
+        world.flying_saucers.append(saucer)
+
+    def inputs(frame):
+        return Inputs(left=True, fire=True)
+    return world, inputs
+
+
+def explosions():
+    world = World(WIDTH, HEIGHT, seed=3, threaded_waves=False)
+
+    def inputs(frame):
+        # Thirty blasts a frame, on top of whatever the game itself blows up
+        for _ in range(30):
+            world.emit("explosion", (world.rng.uniform(0, WIDTH), world.rng.uniform(0, HEIGHT)))
+        return Inputs()
+    return world, inputs
+
+
+SCENARIOS = {"level20": level20, "barrage": barrage, "explosions": explosions}
+
+
+def keep_alive(world):
+    world.ship.shield_active = True
+    world.ship.shield_timer = 1000
+
+
+# Cases: each returns a frame function that advances its scenario by one
+# frame and returns the seconds spent in the part being measured.
+
+def world_phase(scenario, phase):
+    def setup(window):
+        world, inputs = SCENARIOS[scenario]()
+        frame_number = [0]
+
+        def frame():
+            keep_alive(world)
+            world.apply_inputs(world.ship, inputs(frame_number[0]))
+            frame_number[0] += 1
+            start = time.perf_counter()
+            world.update()
+            middle = time.perf_counter()
+            world.check_collisions()
+            end = time.perf_counter()
+            return middle - start if phase == "update" else end - middle
+        return frame
+    return setup
+
+
+def draw(scenario):
+    def setup(window):
+        world, inputs = SCENARIOS[scenario]()
+        renderer = Renderer(window, WIDTH, HEIGHT, seed=1)
+        world.subscribe(renderer.on_event)
+        frame_number = [0]
+
+        def frame():
+            keep_alive(world)
+            world.step(inputs(frame_number[0]))
+            frame_number[0] += 1
+            start = time.perf_counter()
+            renderer.update()
+            renderer.draw(world)
+            return time.perf_counter() - start
+        return frame
+    return setup
+
+
+def particles(phase):
+    def setup(window):
+        world, inputs = explosions()
+        system = ParticleSystem(seed=1)
+        world.subscribe(lambda event, position: event == "explosion" and system.create_explosion(position))
+        frame_number = [0]
+
+        def frame():
+            inputs(frame_number[0])
+            frame_number[0] += 1
+            start = time.perf_counter()
+            if phase == "update":
+                system.update()
+            else:
+                system.draw(window)
+            return time.perf_counter() - start
+        return frame
+    return setup
+
+
+def starfield(count):
+    def setup(window):
+        stars = Starfield(WIDTH, HEIGHT, random.Random(1), count=count)
+
+        def frame():
+            start = time.perf_counter()
+            stars.update()
+            stars.draw(window)
+            return time.perf_counter() - start
+        return frame
+    return setup
+
+
+def vertices(window):
+    rng = random.Random(1)
+    asteroids = [Asteroid(size, WIDTH, HEIGHT, rng=rng) for size in (1, 2, 3) * 100]
+
+    def frame():
+        start = time.perf_counter()
+        for asteroid in asteroids:
+            asteroid.generate_vertices(rng)
+        return time.perf_counter() - start
+    return frame
+
+
+CASES = {
+    "level20/update": world_phase("level20", "update"),
+    "level20/collisions": world_phase("level20", "collisions"),
+    "level20/draw": draw("level20"),
+    "barrage/update": world_phase("barrage", "update"),
+    "barrage/collisions": world_phase("barrage", "collisions"),
+    "barrage/draw": draw("barrage"),
+    "explosions/particles_update": particles("update"),
+    "explosions/particles_draw": particles("draw"),
+    "explosions/draw": draw("explosions"),
+    "starfield/400": starfield(400),
+    "starfield/10000": starfield(10000),
+    "asteroid/generate_vertices_x300": vertices,
+}
+
+
+def timed_run(setup, window, frames):
+    frame = setup(window)
+    for _ in range(WARMUP):
+        frame()
+    # The collector is paused so a collection landing in one case doesn't
+    # show up as a regression in it
+    gc.collect()
+    gc.disable()
+    try:
+        return sorted(frame() * 1000 for _ in range(frames))
+    finally:
+        gc.enable()
+
+
+def measure(setup, window, frames, repeats):
+    runs = [timed_run(setup, window, frames) for _ in range(repeats)]
+    p95s = [times[min(len(times) - 1, len(times) * 95 // 100)] for times in runs]
+
+    # A last, untimed pass with tracemalloc on, from a fresh scenario
+    frame = setup(window)
+    for _ in range(WARMUP):
+        frame()
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    for _ in range(ALLOC_FRAMES):
+        frame()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50_ms": statistics.median(times[len(times) // 2] for times in runs),
+        "p95_ms": statistics.median(p95s),
+        "p95_spread_ms": max(p95s) - min(p95s),
+        "mean_ms": statistics.median(statistics.fmean(times) for times in runs),
+        "peak_kb": (peak - start) / 1024,
+        "retained_kb": (current - start) / 1024,
+    }
+
+
+def run(frames, repeats, only=None):
+    pygame.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {}
+    for name, setup in CASES.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        results[name] = measure(setup, window, frames, repeats)
+        result = results[name]
+        print(f"{name:<32} p50 {result['p50_ms']:7.3f} ms  p95 {result['p95_ms']:7.3f} ms  "
+              f"spread {result['p95_spread_ms']:6.3f} ms  peak {result['peak_kb']:8.1f} KB", flush=True)
+    pygame.quit()
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "pygame": pygame.version.ver, "frames": frames, "repeats": repeats, "created": time.time()},
+        "results": results,
+    }
+
+
+def compare(baseline, current, time_threshold, alloc_threshold):
+    # Returns the names of the cases that regressed or are missing from
+    # `current`
+    regressions = []
+    print(f"{'case':<32} {'p95 ms':>17} {'change':>8} {'peak KB':>19} {'change':>8}")
+    for name, base in baseline["results"].items():
+        result = current["results"].get(name)
+        if result is None:
+            regressions.append(name)
+            print(f"{name:<32} {base['p95_ms']:7.3f} -> {'-':>7} {'':>8} {base['peak_kb']:8.1f} -> {'-':>8} "
+                  f"{'':>8}  MISSING")
+            continue
+        # Results saved before runs were repeated have no spread
+        noise = max(MIN_TIME_MS, base.get("p95_spread_ms", 0.0), result.get("p95_spread_ms", 0.0))
+        slower = result["p95_ms"] - base["p95_ms"]
+        bigger = result["peak_kb"] - base["peak_kb"]
+        time_change = slower / base["p95_ms"] if base["p95_ms"] else 0.0
+        alloc_change = bigger / base["peak_kb"] if base["peak_kb"] else 0.0
+        failed = []
+        if time_change > time_threshold and slower > noise:
+            failed.append("time")
+        if alloc_change > alloc_threshold and bigger > MIN_ALLOC_KB:
+            failed.append("allocations")
+        if failed:
+            regressions.append(name)
+        print(f"{name:<32} {base['p95_ms']:7.3f} -> {result['p95_ms']:7.3f} {time_change:+8.1%} "
+              f"{base['peak_kb']:8.1f} -> {result['peak_kb']:8.1f} {alloc_change:+8.1%}"
+              f"{'  REGRESSED: ' + ', '.join(failed) if failed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game loop benchmark suite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the suite and optionally save the results")
+    run_parser.add_argument("--frames", type=int, default=FRAMES)
+    run_parser.add_argument("--repeats", type=int, default=REPEATS, help="timed runs per case")
+    run_parser.add_argument("--only", nargs="*", help="run only cases whose name contains one of these")
+    run_parser.add_argument("--output", help="JSON file to write, e.g. a new baseline")
+    compare_parser = subparsers.add_parser("compare", help="fail if results regressed against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--current", help="saved results to check (default: run the suite now)")
+    compare_parser.add_argument("--frames", type=int, default=FRAMES)
+    compare_parser.add_argument("--repeats", type=int, default=REPEATS, help="timed runs per case")
+    compare_parser.add_argument("--time-threshold", type=float, default=0.25,
+                                help="allowed p95 frame time increase (default 0.25 = 25%%)")
+    compare_parser.add_argument("--alloc-threshold", type=float, default=0.10,
+                                help="allowed peak allocation increase (default 0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args.frames, args.repeats, args.only)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if args.current:
+        with open(args.current) as file:
+            current = json.load(file)
+    else:
+        current = run(args.frames, args.repeats, list(baseline["results"]))
+        print()
+    regressions = compare(baseline, current, args.time_threshold, args.alloc_threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed or missing")
+        return 1
+    print("\nno regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# File: collision.py
+
+import math
+
+
+def wrapped(delta, size):
+    # The shortest offset between two coordinates on a wrapping axis
+    delta %= size
+    return delta - size if delta > size / 2 else delta
+
+
+def time_of_impact(a, b, width, height):
+    # Swept circle test over the tick that just moved both entities from
+    # position - speed to position. Returns the fraction of the tick
+    # (0 to 1) at which they first touched, or None if they didn't. Offsets
+    # are taken across the screen edges, so entities touching across a wrap
+    # count too.
+    vx = a.speed[0] - b.speed[0]
+    vy = a.speed[1] - b.speed[1]
+    reach = a.radius + b.radius
+    # Offset at the end of the tick, wrapped inline as this runs for every
+    # broad-phase candidate
+    dx = (a.position[0] - b.position[0]) % width
+    if dx > width / 2:
+        dx -= width
+    dy = (a.position[1] - b.position[1]) % height
+    if dy > height / 2:
+        dy -= height
+    # Most candidates are nowhere near along one axis
+    if abs(dx) > reach + abs(vx) or abs(dy) > reach + abs(vy):
+        return None
+    # Offset at the start of the tick
+    dx -= vx
+    dy -= vy
+    c = dx * dx + dy * dy - reach * reach
+    if c < 0:
+        return 0.0
+    speed = vx * vx + vy * vy
+    if speed == 0:
+        return None
+    half_b = dx * vx + dy * vy
+    if half_b >= 0:
+        # Moving apart
+        return None
+    discriminant = half_b * half_b - speed * c
+    if discriminant < 0:
+        return None
+    t = (-half_b - math.sqrt(discriminant)) / speed
+    return t if t < 1 else None
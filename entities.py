@@ -1,21 +1,53 @@
 # File: entities.py
 
-import pygame
 import math
 import random
 
+# The simulation always advances in fixed steps; timers hold seconds left
+TICK_RATE = 60
+TIMESTEP = 1 / TICK_RATE
+POWER_UP_SECONDS = 5.0
+# Pixels per tick
+BULLET_SPEED = 5
+
+# Unit circle points for each asteroid vertex count, so building an
+# asteroid's outline needs no trig calls
+MIN_VERTICES = 8
+MAX_VERTICES = 12
+UNIT_CIRCLES = {n: tuple((math.cos(i * (2 * math.pi / n)), math.sin(i * (2 * math.pi / n))) for i in range(n))
+                for n in range(MIN_VERTICES, MAX_VERTICES + 1)}
+
+
+def asteroid_vertices(radius, rng=random):
+    vertices = []
+    for x, y in UNIT_CIRCLES[rng.randint(MIN_VERTICES, MAX_VERTICES)]:
+        distance = radius * rng.uniform(0.8, 1.2)
+        vertices.append((distance * x, distance * y))
+    return tuple(vertices)
+
+
+def countdown(remaining, dt):
+    # Half a step of slack absorbs float error, so a 5 s timer lasts exactly
+    # 300 steps at 60 Hz. Expired timers read 0.0.
+    remaining -= dt
+    return remaining if remaining > dt / 2 else 0.0
+
+
 class Ship:
+    __slots__ = ("position", "angle", "speed", "radius", "shield_active", "shield_timer",
+                 "rapid_fire_active", "rapid_fire_timer", "multi_shot_active", "multi_shot_timer")
+
     def __init__(self, x, y):
         self.position = [x, y]
         self.angle = 0
         self.speed = [0, 0]
         self.radius = 15
         self.shield_active = False
-        self.shield_timer = 0
+        self.shield_timer = 0.0
         self.rapid_fire_active = False
-        self.rapid_fire_timer = 0
+        self.rapid_fire_timer = 0.0
         self.multi_shot_active = False
-        self.multi_shot_timer = 0
+        self.multi_shot_timer = 0.0
 
     def rotate(self, direction):
         self.angle += direction * 5
@@ -25,7 +57,7 @@ class Ship:
         self.speed[0] += math.cos(angle_rad) * 0.1
         self.speed[1] -= math.sin(angle_rad) * 0.1
 
-    def update(self, width, height):
+    def update(self, width, height, dt=TIMESTEP):
         self.position[0] += self.speed[0]
         self.position[1] += self.speed[1]
         
@@ -39,35 +71,20 @@ class Ship:
 
         # Update power-up timers
         if self.shield_active:
-            self.shield_timer -= 1
+            self.shield_timer = countdown(self.shield_timer, dt)
             if self.shield_timer <= 0:
                 self.shield_active = False
 
         if self.rapid_fire_active:
-            self.rapid_fire_timer -= 1
+            self.rapid_fire_timer = countdown(self.rapid_fire_timer, dt)
             if self.rapid_fire_timer <= 0:
                 self.rapid_fire_active = False
 
         if self.multi_shot_active:
-            self.multi_shot_timer -= 1
+            self.multi_shot_timer = countdown(self.multi_shot_timer, dt)
             if self.multi_shot_timer <= 0:
                 self.multi_shot_active = False
 
-    def draw(self, window):
-        angle_rad = math.radians(self.angle)
-        points = [
-            (self.position[0] + self.radius * math.cos(angle_rad),
-             self.position[1] - self.radius * math.sin(angle_rad)),
-            (self.position[0] + self.radius * math.cos(angle_rad + 2.5),
-             self.position[1] - self.radius * math.sin(angle_rad + 2.5)),
-            (self.position[0] + self.radius * math.cos(angle_rad - 2.5),
-             self.position[1] - self.radius * math.sin(angle_rad - 2.5))
-        ]
-        pygame.draw.polygon(window, (255, 255, 255), points, 2)
-
-        if self.shield_active:
-            pygame.draw.circle(window, (0, 255, 255), (int(self.position[0]), int(self.position[1])), self.radius + 5, 1)
-
     def reset(self, x, y):
         self.position = [x, y]
         self.speed = [0, 0]
@@ -75,52 +92,57 @@ class Ship:
 
     def activate_shield(self):
         self.shield_active = True
-        self.shield_timer = 300  # 5 seconds at 60 FPS
+        self.shield_timer = POWER_UP_SECONDS
 
     def activate_rapid_fire(self):
         self.rapid_fire_active = True
-        self.rapid_fire_timer = 300  # 5 seconds at 60 FPS
+        self.rapid_fire_timer = POWER_UP_SECONDS
 
     def activate_multi_shot(self):
         self.multi_shot_active = True
-        self.multi_shot_timer = 300  # 5 seconds at 60 FPS
+        self.multi_shot_timer = POWER_UP_SECONDS
 
     def collides_with(self, other):
         distance = math.hypot(self.position[0] - other.position[0], self.position[1] - other.position[1])
         return distance < self.radius + other.radius
 
 class Asteroid:
-    def __init__(self, size, width, height, position=None):
+    __slots__ = ("id", "size", "radius", "position", "speed", "vertices")
+
+    def __init__(self, size, width, height, position=None, rng=random, speed=None, vertices=None):
+        self.position = [0, 0]
+        self.speed = [0, 0]
+        self.init(size, width, height, position, rng, speed, vertices)
+
+    def init(self, size, width, height, position=None, rng=random, speed=None, vertices=None):
+        # Also used to recycle a pooled asteroid; position and speed lists
+        # are updated in place. Waves pass in a precomputed speed and outline.
         self.size = size
         self.radius = size * 10
         if position:
-            self.position = list(position)
+            self.position[:] = position
+        else:
+            self.position[:] = self.get_spawn_position(width, height, rng)
+        if speed is None:
+            self.speed[0] = rng.uniform(-1, 1)
+            self.speed[1] = rng.uniform(-1, 1)
         else:
-            self.position = self.get_spawn_position(width, height)
-        self.speed = [random.uniform(-1, 1), random.uniform(-1, 1)]
-        self.vertices = self.generate_vertices()
+            self.speed[:] = speed
+        self.vertices = vertices if vertices is not None else self.generate_vertices(rng)
 
-    def get_spawn_position(self, width, height):
-        side = random.choice(['top', 'bottom', 'left', 'right'])
+    def get_spawn_position(self, width, height, rng=random):
+        side = rng.choice(['top', 'bottom', 'left', 'right'])
         if side == 'top':
-            return [random.randint(0, width), -self.radius]
+            return [rng.randint(0, width), -self.radius]
         elif side == 'bottom':
-            return [random.randint(0, width), height + self.radius]
+            return [rng.randint(0, width), height + self.radius]
         elif side == 'left':
-            return [-self.radius, random.randint(0, height)]
+            return [-self.radius, rng.randint(0, height)]
         else:  # right
-            return [width + self.radius, random.randint(0, height)]
-
-    def generate_vertices(self):
-        num_vertices = random.randint(8, 12)
-        vertices = []
-        for i in range(num_vertices):
-            angle = i * (2 * math.pi / num_vertices)
-            distance = self.radius * random.uniform(0.8, 1.2)
-            x = distance * math.cos(angle)
-            y = distance * math.sin(angle)
-            vertices.append((x, y))
-        return vertices
+            return [width + self.radius, rng.randint(0, height)]
+
+    def generate_vertices(self, rng=random):
+        return asteroid_vertices(self.radius, rng)
 
     def update(self, width, height):
         self.position[0] += self.speed[0]
@@ -130,84 +152,81 @@ class Asteroid:
         self.position[0] %= width
         self.position[1] %= height
 
-    def draw(self, window):
-        points = [(self.position[0] + x, self.position[1] + y) for x, y in self.vertices]
-        pygame.draw.polygon(window, (255, 255, 255), points, 2)
-
 class Bullet:
-    def __init__(self, position, angle):
-        self.position = list(position)
-        self.speed = [math.cos(math.radians(angle)) * 5,
-                      -math.sin(math.radians(angle)) * 5]
-        self.lifetime = 60  # frames
+    __slots__ = ("id", "position", "speed", "lifetime", "radius", "owner")
+
+    def __init__(self, position, angle, owner=None):
+        self.position = [0, 0]
+        self.speed = [0, 0]
+        self.init(position, angle, owner)
+
+    def init(self, position, angle, owner=None):
+        # owner identifies who fired it; None for saucer bullets
+        self.position[:] = position
+        self.speed[0] = math.cos(math.radians(angle)) * BULLET_SPEED
+        self.speed[1] = -math.sin(math.radians(angle)) * BULLET_SPEED
+        self.lifetime = 1.0  # seconds
         self.radius = 2
+        self.owner = owner
 
-    def update(self, width, height):
+    def update(self, width, height, dt=TIMESTEP):
         self.position[0] += self.speed[0]
         self.position[1] += self.speed[1]
-        self.lifetime -= 1
+        self.lifetime = countdown(self.lifetime, dt)
 
         # Screen wrapping
         self.position[0] %= width
         self.position[1] %= height
 
-    def draw(self, window):
-        pygame.draw.circle(window, (255, 255, 255), (int(self.position[0]), int(self.position[1])), self.radius)
-
     def collides_with(self, other):
         distance = math.hypot(self.position[0] - other.position[0], self.position[1] - other.position[1])
         return distance < self.radius + other.radius
 
 
 class FlyingSaucer:
-    def __init__(self, width, height):
-        self.size = random.choice([1, 2])
+    # Flies across the screen and reports when it is ready to fire; where
+    # it steers and aims is decided by saucer_ai.SaucerAI, which keeps its
+    # plan in target, lead_ticks and speed[1].
+    __slots__ = ("id", "rng", "size", "radius", "position", "speed", "shoot_timer", "think_timer",
+                 "target", "lead_ticks")
+
+    def __init__(self, width, height, rng=random):
+        self.rng = rng
+        self.size = rng.choice([1, 2])
         self.radius = self.size * 15
         self.position = self.get_spawn_position(width, height)
-        self.speed = [random.choice([-1, 1]) * (3 - self.size), 0]
-        self.shoot_timer = 0
+        self.speed = [rng.choice([-1, 1]) * (3 - self.size), 0]
+        self.shoot_timer = 0.0
+        self.think_timer = 0.0
+        self.target = None
+        self.lead_ticks = 0.0
 
     def get_spawn_position(self, width, height):
-        return [random.choice([-self.radius, width + self.radius]), random.randint(0, height)]
+        return [self.rng.choice([-self.radius, width + self.radius]), self.rng.randint(0, height)]
 
-    def update(self, ship, width, height):
+    def update(self, width, height, dt=TIMESTEP):
+        # Returns whether the saucer is ready to fire
         self.position[0] += self.speed[0]
-        self.position[1] = max(self.radius, min(height - self.radius, self.position[1] + random.uniform(-1, 1)))
-        
+        self.position[1] = max(self.radius, min(height - self.radius, self.position[1] + self.speed[1]))
+
         # Wrap around horizontally
         if self.position[0] < -self.radius and self.speed[0] < 0:
             self.position[0] = width + self.radius
         elif self.position[0] > width + self.radius and self.speed[0] > 0:
             self.position[0] = -self.radius
 
-        # Shooting logic
-        self.shoot_timer -= 1
-        if self.shoot_timer <= 0:
-            self.shoot_timer = random.randint(60, 120)
-            return self.shoot(ship)
-        return None
-
-    def shoot(self, ship):
-        angle = math.atan2(ship.position[1] - self.position[1], ship.position[0] - self.position[0])
-        return Bullet(self.position, math.degrees(angle))
-
-    def draw(self, window):
-        pygame.draw.ellipse(window, (255, 255, 255), (self.position[0] - self.radius, self.position[1] - self.radius // 2, 
-                                            self.radius * 2, self.radius), 2)
-        pygame.draw.rect(window, (255, 255, 255), (self.position[0] - self.radius // 2, self.position[1] - self.radius // 4, 
-                                         self.radius, self.radius // 2), 2)
+        self.think_timer = countdown(self.think_timer, dt)
+        self.shoot_timer = countdown(self.shoot_timer, dt)
+        return self.shoot_timer <= 0
 
 class PowerUp:
-    def __init__(self, power_type, width, height):
+    __slots__ = ("id", "type", "position", "radius", "duration")
+
+    def __init__(self, power_type, width, height, rng=random):
         self.type = power_type
-        self.position = [random.randint(0, width), random.randint(0, height)]
+        self.position = [rng.randint(0, width), rng.randint(0, height)]
         self.radius = 10
-        self.duration = 600  # 10 seconds at 60 FPS
-
-    def update(self):
-        self.duration -= 1
+        self.duration = 10.0  # seconds
 
-    def draw(self, window):
-        color = (0, 255, 0) if self.type == "shield" else (255, 255, 0) if self.type == "rapid_fire" else (255, 0, 255)
-        pygame.draw.circle(window, color, (int(self.position[0]), int(self.position[1])), self.radius)
-        pygame.draw.circle(window, (255, 255, 255), (int(self.position[0]), int(self.position[1])), self.radius, 1)
\ No newline at end of file
+    def update(self, dt=TIMESTEP):
+        self.duration = countdown(self.duration, dt)
@@ -0,0 +1,196 @@
+# File: farm.py
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+from world import World, Inputs
+
+WIDTH = 800
+HEIGHT = 600
+
+# Per-game observation record: frame, ship x/y/angle, score, lives, level,
+# asteroid count, then (x, y, radius) for up to max_asteroids asteroids.
+HEADER_FIELDS = 8
+
+
+class FarmBuffers:
+    # Numpy views over one shared memory block. Every game has a sequence
+    # counter that is odd while its record is being written, so readers can
+    # detect and retry torn reads without any locking.
+    def __init__(self, buf, num_games, num_workers, max_asteroids):
+        self.record_size = HEADER_FIELDS + 3 * max_asteroids
+        self.max_asteroids = max_asteroids
+        offset = 0
+        self.sequence, offset = self.view(buf, offset, np.int64, (num_games,))
+        self.ticks, offset = self.view(buf, offset, np.int64, (num_workers,))
+        self.acked, offset = self.view(buf, offset, np.int64, (num_workers,))
+        self.game_frames, offset = self.view(buf, offset, np.int64, (num_workers,))
+        self.records, offset = self.view(buf, offset, np.float64, (num_games, self.record_size))
+
+    @staticmethod
+    def view(buf, offset, dtype, shape):
+        array = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        return array, offset + array.nbytes
+
+    @staticmethod
+    def size(num_games, num_workers, max_asteroids):
+        record_size = HEADER_FIELDS + 3 * max_asteroids
+        return 8 * (num_games + 3 * num_workers) + 8 * num_games * record_size
+
+    def write(self, game, world, frame):
+        record = self.records[game]
+        asteroids = world.asteroids[:self.max_asteroids]
+        self.sequence[game] += 1
+        record[:HEADER_FIELDS] = (frame, world.ship.position[0], world.ship.position[1], world.ship.angle,
+                                  world.score, world.lives, world.level, len(asteroids))
+        if asteroids:
+            record[HEADER_FIELDS:HEADER_FIELDS + 3 * len(asteroids)] = [
+                value for asteroid in asteroids
+                for value in (asteroid.position[0], asteroid.position[1], asteroid.radius)]
+        self.sequence[game] += 1
+
+    def read(self, game, retries=1000):
+        for _ in range(retries):
+            before = self.sequence[game]
+            if before % 2 == 0:
+                record = self.records[game].copy()
+                if self.sequence[game] == before:
+                    return record
+            # The writer is mid-record; let it finish
+            time.sleep(0)
+        raise RuntimeError(f"game {game} record kept changing while reading")
+
+
+def random_policy(world, rng):
+    return Inputs(left=rng.random() < 0.3, right=rng.random() < 0.3,
+                  thrust=rng.random() < 0.5, fire=rng.random() < 0.1)
+
+
+def run_worker(index, games, shm, num_games, num_workers, max_asteroids, max_lead, policy, seed, stop):
+    buffers = FarmBuffers(shm.buf, num_games, num_workers, max_asteroids)
+    # A previous worker may have died mid-write and left a record marked busy
+    for game in games:
+        buffers.sequence[game] += buffers.sequence[game] % 2
+    rng = random.Random(seed + index)
+    worlds = [World(WIDTH, HEIGHT, seed=seed + game) for game in games]
+    tick = int(buffers.ticks[index])
+    while not stop.is_set():
+        # Backpressure: don't run more than max_lead ticks past what the
+        # controller last read.
+        if max_lead and tick - buffers.acked[index] >= max_lead:
+            time.sleep(0.0005)
+            continue
+        for game, world in zip(games, worlds):
+            world.step(policy(world, rng))
+            if world.game_over:
+                world.reset()
+            buffers.write(game, world, world.tick)
+        tick += 1
+        buffers.ticks[index] = tick
+        buffers.game_frames[index] += len(games)
+
+
+class GameFarm:
+    def __init__(self, num_games, num_workers=None, max_asteroids=64, max_lead=60,
+                 policy=random_policy, seed=0):
+        self.num_games = num_games
+        self.num_workers = min(num_games, num_workers or os.cpu_count())
+        self.max_asteroids = max_asteroids
+        self.max_lead = max_lead
+        self.policy = policy
+        self.seed = seed
+        self.assignments = [list(range(w, num_games, self.num_workers)) for w in range(self.num_workers)]
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=FarmBuffers.size(num_games, self.num_workers, max_asteroids))
+        self.buffers = FarmBuffers(self.shm.buf, num_games, self.num_workers, max_asteroids)
+        self.buffers.sequence[:] = 0
+        self.buffers.ticks[:] = 0
+        self.buffers.acked[:] = 0
+        self.buffers.game_frames[:] = 0
+        self.stop_event = multiprocessing.Event()
+        self.workers = [None] * self.num_workers
+        self.restarts = 0
+        self.started = None
+
+    def start_worker(self, index):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(index, self.assignments[index], self.shm, self.num_games, self.num_workers,
+                  self.max_asteroids, self.max_lead, self.policy, self.seed, self.stop_event),
+            daemon=True)
+        process.start()
+        self.workers[index] = process
+
+    def start(self):
+        self.started = time.perf_counter()
+        for index in range(self.num_workers):
+            self.start_worker(index)
+
+    def poll(self):
+        # Restart any worker that died; its games start over from a fresh
+        # World while the farm-wide counters keep going.
+        for index, process in enumerate(self.workers):
+            if process is not None and process.exitcode is not None and not self.stop_event.is_set():
+                self.restarts += 1
+                self.start_worker(index)
+
+    def observations(self):
+        records = np.stack([self.buffers.read(game) for game in range(self.num_games)])
+        self.buffers.acked[:] = self.buffers.ticks
+        return records
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        frames = int(self.buffers.game_frames.sum())
+        return {
+            "elapsed": elapsed,
+            "frames": frames,
+            "fps": frames / elapsed,
+            "fps_per_core": frames / elapsed / self.num_workers,
+            "workers": self.num_workers,
+            "restarts": self.restarts,
+        }
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.workers:
+            if process is not None:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        self.buffers = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many headless games across all cores")
+    parser.add_argument("--games", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--max-lead", type=int, default=60)
+    args = parser.parse_args()
+
+    farm = GameFarm(args.games, args.workers, max_lead=args.max_lead)
+    farm.start()
+    try:
+        deadline = time.perf_counter() + args.seconds
+        while time.perf_counter() < deadline:
+            farm.poll()
+            farm.observations()
+            time.sleep(1 / 60)
+        report = farm.report()
+    finally:
+        farm.stop()
+    print(f"{report['frames']:,} frames in {report['elapsed']:.1f}s on {report['workers']} workers: "
+          f"{report['fps']:,.0f} fps, {report['fps_per_core']:,.0f} fps per core, "
+          f"{report['restarts']} restarts")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,187 +1,166 @@
 # File: game.py
 
-import pygame
 import random
-from entities import Ship, Asteroid, Bullet, FlyingSaucer, PowerUp
-from particles import ParticleSystem
-from starfield import Starfield
+import time
+import pygame
+from world import World, Inputs, TIMESTEP
+from renderer import Renderer, CommandBuffer
+from render_thread import RenderThread
+from audio import SoundPlayer
+from profiler import FrameProfiler
+from replay import InputLog
+
+# Logic ticks a single frame may run to catch up, and the longest frame time
+# counted; anything beyond is dropped so a stall can't snowball
+MAX_TICKS_PER_FRAME = 5
+MAX_FRAME_TIME = 0.25
 
 class Game:
-    def __init__(self, window, width, height):
+    # Pygame frontend: turns keyboard state into World inputs and hands the
+    # world to the renderer and sound player, which subscribe to its events.
+    # With a seed every game plays out the same for the same inputs; with
+    # record=True each game's inputs are kept in input_log for replay.py.
+    # levels is an optional LevelSet replacing the built-in difficulty curve
+    # and difficulty sets how well saucers fly and shoot.
+    # The world ticks at a fixed rate from an accumulator of real time while
+    # frames are drawn as often as the display allows, interpolated between
+    # the last two ticks. With threaded_render each frame is recorded into a
+    # command buffer and drawn on a RenderThread during the next frame's ticks.
+    def __init__(self, window, width, height, seed=None, dirty_rects=False, record=False, levels=None,
+                 difficulty="normal", threaded_render=False):
         self.window = window
         self.width = width
         self.height = height
-        self.ship = Ship(width // 2, height // 2)
-        self.asteroids = []
-        self.bullets = []
-        self.flying_saucers = []
-        self.power_ups = []
-        self.score = 0
-        self.lives = 3
-        self.level = 1
-        self.particle_system = ParticleSystem()
-        self.starfield = Starfield(width, height)
-        self.font = pygame.font.Font(None, 36)
-        self.load_sounds()
-        self.spawn_asteroids(4)
-
-    def load_sounds(self):
-        self.shoot_sound = pygame.mixer.Sound("sounds/shoot.wav")
-        self.explosion_sound = pygame.mixer.Sound("sounds/explosion.wav")
-        self.thrust_sound = pygame.mixer.Sound("sounds/thrust.wav")
+        self.seed = seed
+        self.record = record
+        self.input_log = None
+        self.started = None  # wall-clock time the current game began
+        self.levels = levels
+        self.world = World(width, height, seed, levels, difficulty=difficulty)
+        self.renderer = Renderer(window, width, height, dirty_rects, seed)
+        self.sound_player = SoundPlayer()
+        self.world.subscribe(self.renderer.on_event)
+        self.world.subscribe(self.sound_player.on_event)
+        self.profiler = FrameProfiler()
+        self.world.profiler = self.profiler
+        self.renderer.profiler = self.profiler
+        self.render_thread = RenderThread(self.renderer) if threaded_render else None
+        self.frame = CommandBuffer()
+        self.frame_submitted = False
+        self.frame_ready = False  # run() drew or recorded a frame not yet presented
+        self.accumulator = 0.0
+        self.last_time = None
+        self.fire_pending = False
+        self.dropped_time = 0.0
+
+    @property
+    def score(self):
+        return self.world.score
 
     def reset(self):
-        self.ship = Ship(self.width // 2, self.height // 2)
-        self.asteroids = []
-        self.bullets = []
-        self.flying_saucers = []
-        self.power_ups = []
-        self.score = 0
-        self.lives = 3
-        self.level = 1
-        self.spawn_asteroids(4)
-
-    def spawn_asteroids(self, num):
-        for _ in range(num):
-            size = random.randint(1, 3)
-            asteroid = Asteroid(size, self.width, self.height)
-            self.asteroids.append(asteroid)
-        print(f"Spawned {num} asteroids. Total asteroids: {len(self.asteroids)}")
-
-    def run(self):
+        seed = self.seed if self.seed is not None else random.getrandbits(32)
+        self.started = time.time()
+        self.world.reset(seed)
+        if self.record:
+            self.input_log = InputLog(seed, self.width, self.height, self.world.saucer_ai.difficulty, self.levels)
+        self.finish_drawing()
+        # The buffer may still hold the last game's final frame
+        self.frame.clear()
+        self.frame_ready = False
+        self.renderer.invalidate()
+        self.accumulator = 0.0
+        self.last_time = None
+        self.fire_pending = False
+
+    def present(self):
+        # Does nothing until run() has made a frame, e.g. straight after reset()
+        if not self.frame_ready:
+            return
+        self.frame_ready = False
+        if self.render_thread is None:
+            self.renderer.present()
+        else:
+            # Show the frame drawn while this one's ticks ran, then hand
+            # this one over
+            self.render_thread.wait()
+            if self.frame_submitted:
+                self.renderer.present()
+            self.frame = self.render_thread.submit(self.frame)
+            self.frame_submitted = True
+        self.profiler.mark("present")
+        world = self.world
+        self.profiler.end_frame((len(world.asteroids), len(world.bullets), len(world.flying_saucers),
+                                 len(world.power_ups), self.renderer.particle_system.live_count()))
+
+    def finish_drawing(self):
+        # Called before anything else draws on the window
+        if self.render_thread is not None:
+            self.render_thread.wait()
+        self.frame_submitted = False
+
+    def read_inputs(self):
+        inputs = Inputs()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                return True
+                return None
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    self.bullets.append(Bullet(self.ship.position, self.ship.angle))
-                    self.shoot_sound.play()
+                    # Kept until a tick consumes it, as a frame may run none
+                    self.fire_pending = True
+                elif event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                    self.renderer.invalidate()
 
         keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            self.ship.rotate(1)
-        if keys[pygame.K_RIGHT]:
-            self.ship.rotate(-1)
-        if keys[pygame.K_UP]:
-            self.ship.thrust()
-            self.thrust_sound.play()
-
-        self.update()
-        self.check_collisions()
-        self.draw()
-
-        return self.lives <= 0
-
-    def update(self):
-        self.ship.update(self.width, self.height)
-        for asteroid in self.asteroids:
-            asteroid.update(self.width, self.height)
-        for bullet in self.bullets:
-            bullet.update(self.width, self.height)
-        for saucer in self.flying_saucers:
-            saucer_bullet = saucer.update(self.ship, self.width, self.height)
-            if saucer_bullet:
-                self.bullets.append(saucer_bullet)
-        for power_up in self.power_ups:
-            power_up.update()
-
-        self.particle_system.update()
-        self.starfield.update()
-
-        # Spawn flying saucers
-        if random.randint(1, 1000) == 1:
-            self.flying_saucers.append(FlyingSaucer(self.width, self.height))
-
-        # Spawn power-ups
-        if random.randint(1, 600) == 1:
-            self.power_ups.append(PowerUp(random.choice(["shield", "rapid_fire", "multi_shot"]), self.width, self.height))
+        inputs.left = keys[pygame.K_LEFT]
+        inputs.right = keys[pygame.K_RIGHT]
+        inputs.thrust = keys[pygame.K_UP]
+        return inputs
 
-        # Remove expired bullets and power-ups
-        self.bullets = [bullet for bullet in self.bullets if bullet.lifetime > 0]
-        self.power_ups = [power_up for power_up in self.power_ups if power_up.duration > 0]
-
-        # Level progression
-        if len(self.asteroids) == 0:
-            self.level += 1
-            self.spawn_asteroids(self.level + 3)
-
-        print(f"Number of asteroids: {len(self.asteroids)}")
-
-    def check_collisions(self):
-        for bullet in self.bullets[:]:
-            # Bullet-Asteroid collision
-            for asteroid in self.asteroids[:]:
-                if bullet.collides_with(asteroid):
-                    self.bullets.remove(bullet)
-                    self.asteroids.remove(asteroid)
-                    self.explosion_sound.play()
-                    self.score += 100 * asteroid.size
-                    self.particle_system.create_explosion(asteroid.position)
-                    if asteroid.size > 1:
-                        for _ in range(2):
-                            self.asteroids.append(Asteroid(asteroid.size - 1, self.width, self.height, asteroid.position))
-                    break
-
-            # Bullet-Flying Saucer collision
-            for saucer in self.flying_saucers[:]:
-                if bullet.collides_with(saucer):
-                    self.bullets.remove(bullet)
-                    self.flying_saucers.remove(saucer)
-                    self.explosion_sound.play()
-                    self.score += 500 * saucer.size
-                    self.particle_system.create_explosion(saucer.position)
-                    break
-
-        # Ship-Asteroid collision
-        for asteroid in self.asteroids:
-            if self.ship.collides_with(asteroid) and not self.ship.shield_active:
-                self.lives -= 1
-                self.explosion_sound.play()
-                self.particle_system.create_explosion(self.ship.position)
-                self.ship.reset(self.width // 2, self.height // 2)
-                break
-
-        # Ship-Flying Saucer collision
-        for saucer in self.flying_saucers[:]:
-            if self.ship.collides_with(saucer) and not self.ship.shield_active:
-                self.lives -= 1
-                self.explosion_sound.play()
-                self.particle_system.create_explosion(self.ship.position)
-                self.ship.reset(self.width // 2, self.height // 2)
-                self.flying_saucers.remove(saucer)
+    def run(self):
+        self.profiler.begin_frame()
+        now = time.perf_counter()
+        if self.last_time is None:
+            # The first frame of a game runs one tick straight away
+            self.last_time = now - TIMESTEP
+        elapsed = now - self.last_time
+        self.last_time = now
+        if elapsed > MAX_FRAME_TIME:
+            self.dropped_time += elapsed - MAX_FRAME_TIME
+            elapsed = MAX_FRAME_TIME
+        self.accumulator += elapsed
+
+        inputs = self.read_inputs()
+        if inputs is None:
+            self.finish_drawing()
+            return True
+        self.profiler.mark("input")
+
+        world = self.world
+        ticks = 0
+        while self.accumulator >= TIMESTEP and not world.game_over:
+            if ticks == MAX_TICKS_PER_FRAME:
+                # Still behind: let the game slow down rather than spiral
+                self.dropped_time += self.accumulator - TIMESTEP
+                self.accumulator = TIMESTEP
                 break
-
-        # Ship-PowerUp collision
-        for power_up in self.power_ups[:]:
-            if self.ship.collides_with(power_up):
-                if power_up.type == "shield":
-                    self.ship.activate_shield()
-                elif power_up.type == "rapid_fire":
-                    self.ship.activate_rapid_fire()
-                elif power_up.type == "multi_shot":
-                    self.ship.activate_multi_shot()
-                self.power_ups.remove(power_up)
-
-    def draw(self):
-        self.window.fill((0, 0, 0))
-        self.starfield.draw(self.window)
-        self.ship.draw(self.window)
-        for asteroid in self.asteroids:
-            asteroid.draw(self.window)
-        for bullet in self.bullets:
-            bullet.draw(self.window)
-        for saucer in self.flying_saucers:
-            saucer.draw(self.window)
-        for power_up in self.power_ups:
-            power_up.draw(self.window)
-        self.particle_system.draw(self.window)
-
-        # Draw HUD
-        self.draw_text(f"Score: {self.score}", (100, 30))
-        self.draw_text(f"Lives: {self.lives}", (self.width - 100, 30))
-        self.draw_text(f"Level: {self.level}", (self.width // 2, 30))
-
-    def draw_text(self, text, position):
-        text_surface = self.font.render(text, True, (255, 255, 255))
-        text_rect = text_surface.get_rect(center=position)
-        self.window.blit(text_surface, text_rect)
\ No newline at end of file
+            inputs.fire = self.fire_pending
+            self.fire_pending = False
+            self.renderer.capture(world)
+            world.step(inputs)
+            if self.input_log is not None:
+                self.input_log.record(inputs, world)
+            self.renderer.update()
+            self.accumulator -= TIMESTEP
+            ticks += 1
+        alpha = min(1.0, self.accumulator / TIMESTEP)
+        if self.render_thread is None:
+            self.renderer.draw(world, alpha)
+        else:
+            self.renderer.record(world, alpha, self.frame)
+        self.frame_ready = True
+        self.profiler.mark("draw")
+
+        if world.game_over:
+            self.finish_drawing()
+        return world.game_over
@@ -0,0 +1,144 @@
+# File: leaderboard.py
+
+import getpass
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leaderboard.db")
+# Seconds a connection waits for another process to finish writing
+BUSY_TIMEOUT = 30.0
+# After a failed write the writer waits this many seconds before trying the
+# same scores again, and gives them up after MAX_ATTEMPTS tries
+RETRY_DELAY = 1.0
+MAX_ATTEMPTS = 5
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    created REAL NOT NULL,
+    replay TEXT
+);
+CREATE INDEX IF NOT EXISTS scores_by_rank ON scores (score DESC, created);
+"""
+
+
+def default_name():
+    try:
+        return getpass.getuser()
+    except Exception:
+        return "player"
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    # WAL lets readers carry on while a writer commits, and a commit is a
+    # single append to the log, so a crash mid-write never leaves a
+    # half-written table behind.
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    with connection:
+        connection.executescript(SCHEMA)
+    return connection
+
+
+class Leaderboard:
+    # Scores are queued and written by a background thread, so finishing a
+    # game never waits on the disk. Whatever is queued when the writer wakes
+    # up goes in as one transaction. A failed transaction is retried along
+    # with whatever was queued meanwhile; `failures` counts failed writes and
+    # `dropped` the scores given up on. Queries read on the caller's thread
+    # through their own connection.
+    def __init__(self, path=DEFAULT_PATH, threaded=True):
+        self.path = path
+        self.reader = connect(path)
+        self.queue = queue.Queue()
+        self.written = 0
+        self.failures = 0
+        self.dropped = 0
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self.run, name="leaderboard", daemon=True)
+            self.thread.start()
+
+    def submit(self, score, level, name=None, replay=None):
+        entry = (name or default_name(), score, level, time.time(), replay)
+        if self.thread is None:
+            self.write(self.reader, [entry])
+        else:
+            self.queue.put(entry)
+
+    def run(self):
+        connection = connect(self.path)
+        pending = []  # scores from a failed write, tried again with the next batch
+        taken = 0  # queue items not marked done yet
+        attempts = 0
+        stop = False
+        try:
+            while True:
+                items = []
+                try:
+                    items.append(self.queue.get(timeout=RETRY_DELAY if pending else None))
+                    while True:
+                        items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    pass
+                taken += len(items)
+                stop = stop or None in items
+                pending.extend(item for item in items if item is not None)
+                try:
+                    if pending:
+                        self.write(connection, pending)
+                    pending = []
+                    attempts = 0
+                except Exception:
+                    self.failures += 1
+                    attempts += 1
+                    if attempts < MAX_ATTEMPTS and not stop:
+                        log.warning("Couldn't write %d scores, retrying", len(pending), exc_info=True)
+                        continue
+                    log.error("Couldn't write %d scores, dropping them", len(pending), exc_info=True)
+                    self.dropped += len(pending)
+                    pending = []
+                    attempts = 0
+                for _ in range(taken):
+                    self.queue.task_done()
+                taken = 0
+                if stop:
+                    break
+        finally:
+            connection.close()
+
+    def write(self, connection, entries):
+        with connection:
+            connection.executemany(
+                "INSERT INTO scores (name, score, level, created, replay) VALUES (?, ?, ?, ?, ?)", entries)
+        self.written += len(entries)
+
+    def flush(self):
+        # Blocks until everything submitted so far is on disk
+        if self.thread is not None:
+            self.queue.join()
+
+    def top(self, count=10):
+        return self.reader.execute(
+            "SELECT name, score, level, created, replay FROM scores ORDER BY score DESC, created LIMIT ?",
+            (count,)).fetchall()
+
+    def high_score(self):
+        row = self.reader.execute("SELECT score FROM scores ORDER BY score DESC, created LIMIT 1").fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.reader.close()
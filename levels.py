@@ -0,0 +1,188 @@
+# File: levels.py
+
+import argparse
+import json
+import queue
+import random
+import threading
+import time
+
+from entities import Asteroid, asteroid_vertices
+
+# Level files are JSON:
+#
+#   {"curve": {"count": [3, 1], "max_count": 4096, "sizes": [1, 1, 1], "speed": [1.0, 0.0]},
+#    "waves": {"5": {"count": 12, "sizes": [0, 0, 1]},
+#              "10": {"asteroids": [[3, 400, 100], [3, 400, 500, 0.5, 0.0]]}}}
+#
+# The curve gives every level's asteroid count (base + per_level * level, up
+# to max_count), the relative odds of sizes 1, 2 and 3, and the speed scale
+# (base + per_level * (level - 1)) applied to the usual random velocity. A
+# plain number for count or speed is used for every level.
+# Entries under "waves" override any of these for one level, or place
+# asteroids by hand as [size, x, y] or [size, x, y, speed_x, speed_y].
+DEFAULT_CURVE = {"count": [3, 1], "max_count": 4096, "sizes": [1, 1, 1], "speed": [1.0, 0.0]}
+# Waves prepared ahead of the one being played
+LOOKAHEAD = 2
+# Asteroids built between pauses that let the game thread run
+CHUNK = 64
+
+
+class LevelSet:
+    def __init__(self, curve=None, waves=None):
+        self.curve = dict(DEFAULT_CURVE, **(curve or {}))
+        self.waves = {int(level): wave for level, wave in (waves or {}).items()}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.loads(file.read())
+
+    @classmethod
+    def loads(cls, text):
+        data = json.loads(text)
+        return cls(data.get("curve"), data.get("waves"))
+
+    def dumps(self):
+        # The same settings as a level file
+        return json.dumps({"curve": self.curve, "waves": {str(level): wave for level, wave in self.waves.items()}},
+                          sort_keys=True)
+
+    def spec(self, level):
+        # The curve's settings for this level with any override applied
+        spec = dict(self.curve, **self.waves.get(level, {}))
+        if "count" not in self.waves.get(level, {}):
+            base, per_level = spec["count"] if isinstance(spec["count"], list) else (spec["count"], 0)
+            spec["count"] = min(spec["max_count"], base + per_level * level)
+        base, per_level = spec["speed"] if isinstance(spec["speed"], list) else (spec["speed"], 0.0)
+        spec["speed"] = base + per_level * (level - 1)
+        return spec
+
+
+def spawn_position(radius, width, height, rng):
+    # Just off a random edge, as Asteroid.get_spawn_position does
+    side = rng.randrange(4)
+    if side == 0:
+        return [rng.randint(0, width), -radius]
+    elif side == 1:
+        return [rng.randint(0, width), height + radius]
+    elif side == 2:
+        return [-radius, rng.randint(0, height)]
+    return [width + radius, rng.randint(0, height)]
+
+
+def build_wave(level_set, level, seed, width, height, pause=False):
+    # Returns the wave's asteroids, not yet given IDs. Each wave has its own
+    # random stream, so the result is the same whether it was built ahead on
+    # the planner thread or on demand.
+    spec = level_set.spec(level)
+    rng = random.Random(f"{seed}:{level}")
+    speed = spec["speed"]
+    asteroids = []
+    placed = spec.get("asteroids")
+    if placed is not None:
+        for entry in placed:
+            size, x, y = entry[:3]
+            if len(entry) >= 5:
+                velocity = [entry[3], entry[4]]
+            else:
+                velocity = [rng.uniform(-1, 1) * speed, rng.uniform(-1, 1) * speed]
+            asteroids.append(Asteroid(size, width, height, [x, y], rng, velocity,
+                                      asteroid_vertices(size * 10, rng)))
+        return asteroids
+    sizes = rng.choices((1, 2, 3), weights=spec["sizes"], k=spec["count"])
+    for i, size in enumerate(sizes):
+        if pause and i % CHUNK == CHUNK - 1:
+            time.sleep(0)
+        radius = size * 10
+        position = spawn_position(radius, width, height, rng)
+        velocity = [rng.uniform(-1, 1) * speed, rng.uniform(-1, 1) * speed]
+        asteroids.append(Asteroid(size, width, height, position, rng, velocity, asteroid_vertices(radius, rng)))
+    return asteroids
+
+
+class WavePlanner:
+    # Builds the next few waves on a background thread so a level change
+    # only has to hand out IDs to asteroids that already exist. One thread
+    # serves every planner in the process.
+    requests = queue.SimpleQueue()
+    thread = None
+    thread_lock = threading.Lock()
+
+    def __init__(self, level_set, width, height, threaded=True):
+        self.level_set = level_set
+        self.width = width
+        self.height = height
+        self.threaded = threaded
+        self.lock = threading.Lock()
+        self.seed = None
+        self.level = 0  # last wave taken
+        self.ready = {}
+        self.built_ahead = 0
+        self.built_on_demand = 0
+
+    def start(self, seed):
+        with self.lock:
+            self.seed = seed
+            self.level = 0
+            self.ready.clear()
+
+    def take(self, level):
+        # The wave for this level, built now if the thread hasn't got to it
+        with self.lock:
+            wave = self.ready.pop(level, None)
+            self.level = level
+        if wave is None:
+            wave = build_wave(self.level_set, level, self.seed, self.width, self.height)
+            self.built_on_demand += 1
+        self.prepare(level + 1)
+        return wave
+
+    def peek(self, level):
+        # The wave planned for this level, if it is ready, without taking it
+        with self.lock:
+            return self.ready.get(level)
+
+    def prepare(self, first):
+        if not self.threaded:
+            return
+        for level in range(first, first + LOOKAHEAD):
+            WavePlanner.requests.put((self, self.seed, level))
+        with WavePlanner.thread_lock:
+            if WavePlanner.thread is None:
+                WavePlanner.thread = threading.Thread(target=WavePlanner.run, name="waves", daemon=True)
+                WavePlanner.thread.start()
+
+    @staticmethod
+    def run():
+        while True:
+            planner, seed, level = WavePlanner.requests.get()
+            with planner.lock:
+                if seed != planner.seed or level <= planner.level or level in planner.ready:
+                    continue
+            wave = build_wave(planner.level_set, level, seed, planner.width, planner.height, pause=True)
+            with planner.lock:
+                # Dropped if the game was reset while building
+                if seed == planner.seed and level > planner.level:
+                    planner.ready[level] = wave
+                    planner.built_ahead += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the waves a level file produces")
+    parser.add_argument("path", nargs="?", help="level file (default: the built-in curve)")
+    parser.add_argument("--levels", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    level_set = LevelSet.load(args.path) if args.path else LevelSet()
+    for level in range(1, args.levels + 1):
+        start = time.perf_counter()
+        wave = build_wave(level_set, level, args.seed, 800, 600)
+        elapsed = time.perf_counter() - start
+        counts = [sum(1 for asteroid in wave if asteroid.size == size) for size in (1, 2, 3)]
+        print(f"level {level:3d}: {len(wave):5d} asteroids (sizes 1/2/3: {counts[0]}/{counts[1]}/{counts[2]}), "
+              f"speed x{level_set.spec(level)['speed']:.2f}, built in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
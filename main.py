@@ -1,21 +1,119 @@
-import pygame
+import time
+
+START = time.perf_counter()
+
+import logging
+import os
 import sys
-from game import Game
+# pygame.pkgdata uses pkg_resources when it can import it, which takes about as
+# long as the rest of pygame; without it pygame reads its own data files
+# directly. Hidden only for the import.
+HIDE_PKG_RESOURCES = "pkg_resources" not in sys.modules
+if HIDE_PKG_RESOURCES:
+    sys.modules["pkg_resources"] = None
+import pygame
+if HIDE_PKG_RESOURCES:
+    del sys.modules["pkg_resources"]
+PYGAME_IMPORTED = time.perf_counter()
+
+# Only what the menu needs is imported here. The game modules (renderer,
+# particles and the rest) are imported by the preloader thread.
+from leaderboard import Leaderboard, DEFAULT_PATH
 from menu import Menu
+from startup import Preloader
+
+# Diagnostics: ASTEROIDS_LOG_LEVEL=DEBUG enables game logging, and
+# ASTEROIDS_TRACE=path.csv (or .json) saves the frame profile on quit.
+# F3 toggles the profiler overlay in game. ASTEROIDS_SEED makes every game
+# deterministic and ASTEROIDS_RECORD=path saves each finished game's input
+# log for replay.py, to path with the game's start time and seed added to
+# the name. ASTEROIDS_LEADERBOARD=path picks the leaderboard database and
+# ASTEROIDS_LEVELS=path loads a level file (see levels.py).
+# ASTEROIDS_DIFFICULTY=easy, normal or hard sets how well saucers play.
+# ASTEROIDS_RENDER_THREAD=1 draws frames on a separate thread.
+# Frames are capped at FALLBACK_FPS, or at n per second with
+# ASTEROIDS_FPS=n. ASTEROIDS_VSYNC=1 syncs them to the display's refresh
+# rate instead where the driver allows it. pygame only offers vsync with
+# its SCALED mode, which also scales the picture with the window
+# (letterboxed) and maps mouse positions back to the 800x600 surface.
+# ASTEROIDS_STARTUP_PROBE=1 prints the time to the first frame and to the
+# game being ready, then exits.
+logging.basicConfig(level=os.environ.get("ASTEROIDS_LOG_LEVEL", "WARNING").upper())
+TRACE_PATH = os.environ.get("ASTEROIDS_TRACE")
+SEED = os.environ.get("ASTEROIDS_SEED")
+RECORD_PATH = os.environ.get("ASTEROIDS_RECORD")
+LEADERBOARD_PATH = os.environ.get("ASTEROIDS_LEADERBOARD", DEFAULT_PATH)
+LEVELS_PATH = os.environ.get("ASTEROIDS_LEVELS")
+DIFFICULTY = os.environ.get("ASTEROIDS_DIFFICULTY", "normal")
+RENDER_THREAD = bool(os.environ.get("ASTEROIDS_RENDER_THREAD"))
+FPS = int(os.environ.get("ASTEROIDS_FPS", "0"))
+VSYNC = bool(os.environ.get("ASTEROIDS_VSYNC"))
+# Cap used without vsync, as the refresh rate can't be queried
+FALLBACK_FPS = 120
+STARTUP_PROBE = bool(os.environ.get("ASTEROIDS_STARTUP_PROBE"))
+log = logging.getLogger("main")
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+# Initialize what the menu needs; the preloader starts the mixer
+pygame.display.init()
+pygame.font.init()
+preloader = Preloader()
 
 # Set up the game window
 WIDTH = 800
 HEIGHT = 600
-window = pygame.display.set_mode((WIDTH, HEIGHT))
+window = None
+if VSYNC and not FPS:
+    try:
+        window = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, vsync=1)
+    except pygame.error:
+        log.warning("vsync unavailable, capping at %d frames per second", FALLBACK_FPS)
+if window is None:
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    FPS = FPS or FALLBACK_FPS
 pygame.display.set_caption("Asteroids")
 
-# Create game and menu instances
-game = Game(window, WIDTH, HEIGHT)
-menu = Menu(window, WIDTH, HEIGHT)
+# The menu comes up first; the game is built when it is first needed
+leaderboard = Leaderboard(LEADERBOARD_PATH)
+menu = Menu(window, WIDTH, HEIGHT, leaderboard)
+game = None
+
+
+def first_frame():
+    menu.on_frame = None
+    elapsed = (time.perf_counter() - START) * 1000
+    log.info("First frame after %.0f ms", elapsed)
+    if STARTUP_PROBE:
+        print(f"first frame {elapsed:.1f} ms (pygame import {(PYGAME_IMPORTED - START) * 1000:.1f} ms)")
+        preloader.wait()
+        print(f"game ready {(time.perf_counter() - START) * 1000:.1f} ms "
+              f"(preload took {preloader.elapsed * 1000:.1f} ms)")
+        leaderboard.close()
+        pygame.quit()
+        sys.exit()
+
+
+def make_game():
+    from levels import LevelSet
+    return preloader.make_game(window, WIDTH, HEIGHT, seed=int(SEED) if SEED else None, dirty_rects=True,
+                               record=bool(RECORD_PATH),
+                               levels=LevelSet.load(LEVELS_PATH) if LEVELS_PATH else None,
+                               difficulty=DIFFICULTY, threaded_render=RENDER_THREAD)
+
+
+def save_replay():
+    # One file per game, so each leaderboard row keeps its own replay
+    root, extension = os.path.splitext(RECORD_PATH)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(game.started))
+    path = f"{root}-{stamp}-{game.input_log.seed}{extension}"
+    copy = 1
+    while os.path.exists(path):
+        copy += 1
+        path = f"{root}-{stamp}-{game.input_log.seed}-{copy}{extension}"
+    game.input_log.save(path)
+    return path
+
+
+menu.on_frame = first_frame
 
 # Game states
 MENU = 0
@@ -27,18 +125,21 @@ clock = pygame.time.Clock()
 current_state = MENU
 
 while True:
+    action = None
     if current_state == MENU:
         action = menu.run()
         if action == "start":
             current_state = PLAYING
+            if game is None:
+                game = make_game()
             game.reset()
-        elif action == "quit":
-            pygame.quit()
-            sys.exit()
     elif current_state == PLAYING:
         game_over = game.run()
         if game_over:
             current_state = GAME_OVER
+            # Submitted once, when the game ends, however long the game
+            # over screen stays up
+            menu.save_high_score(game.score, game.world.level, save_replay() if RECORD_PATH else None)
     elif current_state == GAME_OVER:
         action = menu.run_game_over(game.score)
         if action == "restart":
@@ -47,5 +148,15 @@ while True:
         elif action == "menu":
             current_state = MENU
 
-    pygame.display.flip()
-    clock.tick(60)
\ No newline at end of file
+    if action == "quit":
+        if TRACE_PATH and game is not None:
+            game.profiler.export(TRACE_PATH)
+        leaderboard.close()
+        pygame.quit()
+        sys.exit()
+
+    if current_state == PLAYING:
+        game.present()
+    else:
+        pygame.display.flip()
+    clock.tick(FPS)
\ No newline at end of file
@@ -1,31 +1,36 @@
 # File: menu.py
 
 import pygame
+from leaderboard import Leaderboard
+from text_cache import TextCache
+
+FPS = 60
 
 class Menu:
-    def __init__(self, window, width, height):
+    def __init__(self, window, width, height, leaderboard=None):
         self.window = window
         self.width = width
         self.height = height
         self.font = pygame.font.Font(None, 36)
         self.title_font = pygame.font.Font(None, 72)
+        self.text_cache = TextCache()
+        self.clock = pygame.time.Clock()
+        # Called after each menu frame is shown
+        self.on_frame = None
+        self.leaderboard = leaderboard if leaderboard is not None else Leaderboard()
         self.load_high_score()
 
     def load_high_score(self):
-        try:
-            with open("high_score.txt", "r") as file:
-                self.high_score = int(file.read())
-        except FileNotFoundError:
-            self.high_score = 0
+        self.high_score = self.leaderboard.high_score()
 
-    def save_high_score(self, score):
-        if score > self.high_score:
-            self.high_score = score
-            with open("high_score.txt", "w") as file:
-                file.write(str(self.high_score))
+    def save_high_score(self, score, level=1, replay=None):
+        # Every finished game goes on the leaderboard; the write happens in
+        # the background
+        self.leaderboard.submit(score, level, replay=replay)
+        self.high_score = max(self.high_score, score)
 
     def draw_text(self, text, font, color, position):
-        text_surface = font.render(text, True, color)
+        text_surface = self.text_cache.render(font, text, color)
         text_rect = text_surface.get_rect(center=position)
         self.window.blit(text_surface, text_rect)
 
@@ -47,9 +52,12 @@ class Menu:
             self.draw_text(f"High Score: {self.high_score}", self.font, (255, 255, 255), (self.width // 2, self.height * 5 // 6))
 
             pygame.display.flip()
+            if self.on_frame is not None:
+                self.on_frame()
+            self.clock.tick(FPS)
 
     def run_game_over(self, score):
-        self.save_high_score(score)
+        # The score is submitted by whoever ended the game, once
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -66,4 +74,7 @@ class Menu:
             self.draw_text("Press SPACE to restart", self.font, (255, 255, 255), (self.width // 2, self.height * 2 // 3))
             self.draw_text("Press M for main menu", self.font, (255, 255, 255), (self.width // 2, self.height * 3 // 4))
 
-            pygame.display.flip()
\ No newline at end of file
+            pygame.display.flip()
+            if self.on_frame is not None:
+                self.on_frame()
+            self.clock.tick(FPS)
\ No newline at end of file
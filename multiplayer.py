@@ -0,0 +1,557 @@
+# File: multiplayer.py
+
+import argparse
+import asyncio
+import math
+import multiprocessing
+import random
+import struct
+import time
+from collections import deque
+
+from entities import Ship, TICK_RATE, TIMESTEP
+from world import World, Inputs, FIRE
+from spectator import (StateEncoder, SpectatorState, ShipView, frame_message, unframe, quantize,
+                       set_motion, COUNT, KEYFRAME)
+
+WIDTH = 800
+HEIGHT = 600
+MAX_PLAYERS = 4
+START_LIVES = 3
+RESPAWN_TICKS = 2 * TICK_RATE
+MAX_PENDING = 8  # queued inputs per player; older ones are dropped (and counted) past this
+IDLE = Inputs()
+INPUTS = [Inputs.from_bits(bits) for bits in range(16)]
+
+# Client to server
+JOIN = 1
+INPUT = 2
+JOIN_RECORD = struct.Struct("<BH")  # JOIN, room
+INPUT_RECORD = struct.Struct("<BIB")  # INPUT, sequence, input bits
+
+# Server to client. A snapshot starts with the spectator delta flags for
+# the shared field, then this header, every ship, and the field sections.
+# A keyframe is sent on joining and whenever a client fell behind.
+SNAPSHOT_HEADER = struct.Struct("<IIH")  # tick, last input sequence applied, level
+KEYFRAME_HEADER = struct.Struct("<BIIHHH")  # player id, tick, last input sequence applied, width, height, level
+SHIP_RECORD = struct.Struct("<BhhhhHbIB")  # player id, motion, angle, lives, score, shield
+
+
+class Player:
+    __slots__ = ("id", "ship", "score", "lives", "respawn", "last_sequence", "held", "pending")
+
+    def __init__(self, player_id, x, y):
+        self.id = player_id
+        self.ship = Ship(x, y)
+        self.score = 0
+        self.lives = START_LIVES
+        self.respawn = 0
+        self.last_sequence = 0
+        self.held = 0
+        self.pending = deque(maxlen=MAX_PENDING)
+
+    @property
+    def alive(self):
+        return self.lives > 0
+
+
+class ArenaWorld(World):
+    # Several ships sharing one asteroid field. Each player keeps their own
+    # score and lives; a player who runs out sits out RESPAWN_TICKS and
+    # comes back with fresh lives. World's own ship is not used.
+    def __init__(self, width, height, seed=None):
+        self.players = {}
+        super().__init__(width, height, seed)
+
+    def reset(self, seed=None):
+        super().reset(seed)
+        for player in self.players.values():
+            player.ship = Ship(*self.spawn_point(player.id))
+            player.score = 0
+            player.lives = START_LIVES
+
+    def spawn_point(self, player_id):
+        angle = player_id * 2 * math.pi / MAX_PLAYERS
+        return self.width // 2 + 60 * math.cos(angle), self.height // 2 + 60 * math.sin(angle)
+
+    def add_player(self, player_id):
+        player = Player(player_id, *self.spawn_point(player_id))
+        self.players[player_id] = player
+        return player
+
+    def remove_player(self, player_id):
+        del self.players[player_id]
+
+    def step(self, inputs):
+        # inputs maps player id to Inputs; missing players do nothing
+        alive = []
+        for player_id, player in self.players.items():
+            if player.alive:
+                self.apply_inputs(player.ship, inputs.get(player_id, IDLE), player_id)
+                alive.append(player)
+            else:
+                player.respawn -= 1
+                if player.respawn <= 0:
+                    player.lives = START_LIVES
+                    player.ship = Ship(*self.spawn_point(player_id))
+        ships = [player.ship for player in alive]
+        for ship in ships:
+            ship.update(self.width, self.height)
+        self.update_field(ships)
+        dead = self.collide_bullets()
+        for ship in ships:
+            self.collide_ship(ship, *dead[1:])
+        self.remove_dead(*dead)
+        for ship in ships:
+            self.collect_power_ups(ship)
+        self.tick += 1
+        self.time += TIMESTEP
+
+    def award(self, bullet, points):
+        player = self.players.get(bullet.owner)
+        if player is not None:
+            player.score += points
+
+    def ship_hit(self, ship):
+        for player in self.players.values():
+            if player.ship is ship:
+                player.lives -= 1
+                self.emit("explosion", ship.position)
+                ship.reset(*self.spawn_point(player.id))
+                self.emit("respawn", ship.position)
+                if not player.alive:
+                    player.respawn = RESPAWN_TICKS
+                return
+
+
+def encode_ships(world):
+    out = bytearray(COUNT.pack(len(world.players)))
+    for player in world.players.values():
+        ship = player.ship
+        out += SHIP_RECORD.pack(player.id, *quantize(ship), ship.angle % 360, player.lives,
+                                player.score, ship.shield_active)
+    return out
+
+
+class Connection:
+    __slots__ = ("transport", "player", "waiting")
+
+    def __init__(self, transport, player):
+        self.transport = transport
+        self.player = player
+        self.waiting = True  # needs a keyframe before the next snapshot
+
+
+class Room:
+    def __init__(self, number, seed=None, max_backlog=64 * 1024):
+        self.number = number
+        self.world = ArenaWorld(WIDTH, HEIGHT, seed)
+        self.encoder = StateEncoder(WIDTH, HEIGHT)
+        self.connections = {}
+        self.max_backlog = max_backlog
+
+    @property
+    def full(self):
+        return len(self.connections) >= MAX_PLAYERS
+
+    def join(self, transport):
+        player_id = next(i for i in range(MAX_PLAYERS) if i not in self.connections)
+        connection = Connection(transport, self.world.add_player(player_id))
+        self.connections[player_id] = connection
+        return connection
+
+    def leave(self, connection):
+        player_id = connection.player.id
+        if self.connections.get(player_id) is connection:
+            del self.connections[player_id]
+            self.world.remove_player(player_id)
+
+    def tick(self):
+        world = self.world
+        inputs = {}
+        for player_id, connection in self.connections.items():
+            player = connection.player
+            if player.pending:
+                player.last_sequence, player.held = player.pending.popleft()
+                inputs[player_id] = INPUTS[player.held]
+            else:
+                # Input late or lost: keep holding the same keys, but only
+                # fire once per press
+                inputs[player_id] = INPUTS[player.held & ~FIRE]
+        world.step(inputs)
+
+        flags, field = self.encoder.encode_entities(world)
+        ships = encode_ships(world)
+        keyframe = None
+        for connection in self.connections.values():
+            transport = connection.transport
+            if transport.get_write_buffer_size() > self.max_backlog:
+                connection.waiting = True
+                continue
+            if connection.waiting:
+                if keyframe is None:
+                    keyframe = ships + self.encoder.keyframe_entities()
+                player = connection.player
+                header = bytes([KEYFRAME]) + KEYFRAME_HEADER.pack(player.id, world.tick, player.last_sequence,
+                                                                   WIDTH, HEIGHT, world.level)
+                transport.write(frame_message(header + keyframe))
+                connection.waiting = False
+            else:
+                header = bytes([flags]) + SNAPSHOT_HEADER.pack(world.tick, connection.player.last_sequence,
+                                                               world.level)
+                transport.write(frame_message(header + ships + field))
+
+
+def percentiles(values, points=(50, 95, 99)):
+    values = sorted(values)
+    if not values:
+        return dict.fromkeys(points, 0.0)
+    return {p: values[min(len(values) - 1, len(values) * p // 100)] for p in points}
+
+
+class ArenaServer:
+    # Hosts up to max_rooms rooms in one process. A single loop ticks every
+    # room at TICK_RATE; when a tick runs long the schedule slips instead of
+    # bunching up catch-up ticks, and joins that would open a room past the
+    # cap are refused, so per-tick latency stays bounded.
+    def __init__(self, host="127.0.0.1", port=0, seed=0, max_rooms=256):
+        self.host = host
+        self.port = port
+        self.seed = seed
+        self.max_rooms = max_rooms
+        self.rooms = {}
+        self.server = None
+        self.tick_times = deque(maxlen=60 * TICK_RATE)
+        self.ticks = 0
+        self.overruns = 0
+        self.dropped_inputs = 0
+        self.running = False
+        self.cpu_share = 0.0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(lambda: ArenaProtocol(self), self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def join(self, number, transport):
+        room = self.rooms.get(number)
+        if room is None:
+            if len(self.rooms) >= self.max_rooms:
+                return None, None
+            room = self.rooms[number] = Room(number, self.seed + number)
+        if room.full:
+            return None, None
+        return room, room.join(transport)
+
+    def leave(self, room, connection):
+        room.leave(connection)
+        if not room.connections and self.rooms.get(room.number) is room:
+            del self.rooms[room.number]
+
+    async def run(self, seconds=None):
+        loop = asyncio.get_running_loop()
+        interval = 1 / TICK_RATE
+        next_tick = loop.time()
+        stop = None if seconds is None else next_tick + seconds
+        started, cpu_started = next_tick, time.process_time()
+        self.running = True
+        while self.running and (stop is None or loop.time() < stop):
+            start = time.perf_counter()
+            for room in list(self.rooms.values()):
+                room.tick()
+            self.tick_times.append((time.perf_counter() - start) * 1000)
+            self.ticks += 1
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                self.overruns += 1
+                next_tick = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+        self.cpu_share = (time.process_time() - cpu_started) / max(1e-9, loop.time() - started)
+
+    def report(self):
+        return {
+            "rooms": len(self.rooms),
+            "players": sum(len(room.connections) for room in self.rooms.values()),
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "dropped_inputs": self.dropped_inputs,
+            "cpu_share": self.cpu_share,
+            "tick_ms": percentiles(self.tick_times),
+        }
+
+    async def close(self):
+        self.running = False
+        self.server.close()
+        for room in self.rooms.values():
+            for connection in room.connections.values():
+                connection.transport.close()
+
+
+class ArenaProtocol(asyncio.Protocol):
+    # One per client connection. Protocol callbacks are much cheaper than
+    # a coroutine per stream when hundreds of clients send input every tick.
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+        self.room = None
+        self.connection = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buffer += data
+        try:
+            for message in unframe(self.buffer):
+                if self.connection is None:
+                    kind, number = JOIN_RECORD.unpack(message)
+                    if kind == JOIN:
+                        self.room, self.connection = self.server.join(number, self.transport)
+                    if self.connection is None:
+                        self.transport.close()
+                        return
+                else:
+                    kind, sequence, bits = INPUT_RECORD.unpack(message)
+                    player = self.connection.player
+                    if kind == INPUT and sequence > player.last_sequence:
+                        if len(player.pending) == MAX_PENDING:
+                            # The client runs too far ahead; the oldest
+                            # queued input is never applied
+                            self.server.dropped_inputs += 1
+                        player.pending.append((sequence, bits & 15))
+        except struct.error:
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        if self.connection is not None:
+            self.server.leave(self.room, self.connection)
+            self.connection = None
+
+
+class PlayerView(ShipView):
+    __slots__ = ("player_id", "lives", "score")
+
+    def __init__(self, player_id):
+        super().__init__()
+        self.player_id = player_id
+        self.lives = START_LIVES
+        self.score = 0
+
+
+class ArenaState(SpectatorState):
+    # The room as a client sees it: every ship as last reported by the
+    # server, plus the shared field predicted between updates.
+    def __init__(self):
+        super().__init__()
+        self.player_id = None
+        self.ships = {}
+        self.acknowledged = 0
+
+    def apply(self, message):
+        events = []
+        flags = message[0]
+        if flags & KEYFRAME:
+            self.player_id, self.tick, self.acknowledged, self.width, self.height, self.level = \
+                KEYFRAME_HEADER.unpack_from(message, 1)
+            offset = self.read_ships(message, 1 + KEYFRAME_HEADER.size)
+            self.read_keyframe_entities(message, offset)
+            self.synced = True
+            return events
+        if not self.synced:
+            return events
+        self.tick, self.acknowledged, self.level = SNAPSHOT_HEADER.unpack_from(message, 1)
+        offset = self.read_ships(message, 1 + SNAPSHOT_HEADER.size)
+        self.predict_entities()
+        self.apply_entities(flags, message, offset, events)
+        return events
+
+    def read_ships(self, message, offset):
+        (count,) = COUNT.unpack_from(message, offset)
+        offset += COUNT.size
+        ships = {}
+        for _ in range(count):
+            player_id, x, y, speed_x, speed_y, angle, lives, score, shield = \
+                SHIP_RECORD.unpack_from(message, offset)
+            offset += SHIP_RECORD.size
+            view = self.ships.get(player_id) or PlayerView(player_id)
+            set_motion(view, x, y, speed_x, speed_y)
+            view.angle, view.lives, view.score, view.shield_active = angle, lives, score, bool(shield)
+            ships[player_id] = view
+        self.ships = ships
+        return offset
+
+
+class ClientProtocol(asyncio.Protocol):
+    def __init__(self, client):
+        self.client = client
+        self.buffer = bytearray()
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def data_received(self, data):
+        self.buffer += data
+        for message in unframe(self.buffer):
+            self.client.receive(message)
+
+    def connection_lost(self, exc):
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+
+class ArenaClient:
+    # Predicts its own ship by running each input locally as soon as it is
+    # sent. When a snapshot arrives, the ship is reset to the server's state
+    # and the inputs the server hasn't applied yet are replayed on top.
+    # While the server holds the player out of lives nothing is predicted,
+    # since the server doesn't move the ship either.
+    def __init__(self, room):
+        self.room = room
+        self.state = ArenaState()
+        self.ship = Ship(WIDTH // 2, HEIGHT // 2)
+        self.sequence = 0
+        self.pending = deque()
+        self.transport = None
+        self.protocol = None
+        self.snapshots = 0
+        self.corrections = 0
+        self.correction_total = 0.0
+
+    async def connect(self, host, port):
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await loop.create_connection(lambda: ClientProtocol(self), host, port)
+        self.transport.write(frame_message(JOIN_RECORD.pack(JOIN, self.room)))
+
+    def close(self):
+        self.transport.close()
+        return self.protocol.closed
+
+    def send(self, inputs):
+        if not self.state.synced:
+            return
+        self.sequence += 1
+        bits = inputs.to_bits()
+        self.pending.append((self.sequence, bits))
+        self.transport.write(frame_message(INPUT_RECORD.pack(INPUT, self.sequence, bits)))
+        if self.alive:
+            self.predict(bits)
+
+    @property
+    def alive(self):
+        own = self.state.ships.get(self.state.player_id)
+        return own is None or own.lives > 0
+
+    def predict(self, bits):
+        inputs = INPUTS[bits]
+        if inputs.left:
+            self.ship.rotate(1)
+        if inputs.right:
+            self.ship.rotate(-1)
+        if inputs.thrust:
+            self.ship.thrust()
+        self.ship.update(self.state.width, self.state.height)
+
+    def receive(self, message):
+        state = self.state
+        state.apply(message)
+        self.snapshots += 1
+        own = state.ships.get(state.player_id)
+        if own is None:
+            return
+        while self.pending and self.pending[0][0] <= state.acknowledged:
+            self.pending.popleft()
+        before = tuple(self.ship.position)
+        ship = self.ship
+        ship.position = list(own.position)
+        ship.speed = list(own.speed)
+        ship.angle = own.angle
+        if own.lives > 0:
+            for _, bits in self.pending:
+                self.predict(bits)
+        error = math.hypot(ship.position[0] - before[0], ship.position[1] - before[1])
+        if error > 0.5:
+            self.corrections += 1
+        self.correction_total += error
+
+
+async def run_bots(host, port, rooms, players, seconds, seed=0):
+    # Loopback load: players bots per room, each holding random keys for a
+    # few ticks at a time like a person would.
+    rng = random.Random(seed)
+    bots = [ArenaClient(room) for room in range(rooms) for _ in range(players)]
+    for bot in bots:
+        await bot.connect(host, port)
+    held = [Inputs() for _ in bots]
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    stop = next_tick + seconds
+    while loop.time() < stop:
+        for i, bot in enumerate(bots):
+            if rng.random() < 0.1:
+                held[i] = Inputs(rng.random() < 0.3, rng.random() < 0.3, rng.random() < 0.5)
+            held[i].fire = rng.random() < 0.05
+            bot.send(held[i])
+        next_tick += 1 / TICK_RATE
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+    await asyncio.gather(*[bot.close() for bot in bots])
+    snapshots = sum(bot.snapshots for bot in bots)
+    return {
+        "bots": len(bots),
+        "snapshots_per_bot_per_second": snapshots / len(bots) / seconds,
+        "corrections_per_bot_per_second": sum(bot.corrections for bot in bots) / len(bots) / seconds,
+        "mean_correction_px": sum(bot.correction_total for bot in bots) / max(1, snapshots),
+    }
+
+
+def bot_process(port, rooms, players, seconds, results):
+    results.put(asyncio.run(run_bots("127.0.0.1", port, rooms, players, seconds)))
+
+
+async def load_test(args):
+    server = ArenaServer(max_rooms=args.max_rooms)
+    await server.start()
+    results = multiprocessing.Queue()
+    bots = multiprocessing.Process(target=bot_process,
+                                   args=(server.port, args.rooms, args.players, args.seconds, results))
+    bots.start()
+    await server.run(args.seconds + 1)
+    report = server.report()
+    bot_report = await asyncio.get_running_loop().run_in_executor(None, results.get)
+    bots.join()
+    await server.close()
+    p = report["tick_ms"]
+    print(f"{args.rooms} rooms x {args.players} players, {report['ticks']} server ticks, "
+          f"{report['overruns']} overruns, {report['dropped_inputs']} dropped inputs, "
+          f"server used {report['cpu_share']:.0%} of a core")
+    print(f"tick time p50 {p[50]:.2f} ms, p95 {p[95]:.2f} ms, p99 {p[99]:.2f} ms "
+          f"(budget {1000 / TICK_RATE:.1f} ms)")
+    print(f"{bot_report['snapshots_per_bot_per_second']:.1f} snapshots/s per bot, "
+          f"{bot_report['corrections_per_bot_per_second']:.2f} visible corrections/s per bot, "
+          f"mean correction {bot_report['mean_correction_px']:.3f} px")
+
+
+async def serve(args):
+    server = ArenaServer(args.host, args.port, max_rooms=args.max_rooms)
+    await server.start()
+    print(f"Serving rooms on {args.host}:{server.port}")
+    try:
+        await server.run()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multiplayer rooms server and loopback load test")
+    parser.add_argument("mode", choices=("serve", "loadtest"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--players", type=int, default=MAX_PLAYERS)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--max-rooms", type=int, default=256)
+    args = parser.parse_args()
+    asyncio.run(serve(args) if args.mode == "serve" else load_test(args))
+
+
+if __name__ == "__main__":
+    main()
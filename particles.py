@@ -1,40 +1,186 @@
 # File: particles.py
 
+import numpy as np
 import pygame
-import random
-import math
-
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = random.randint(1, 3)
-        self.speed = [random.uniform(-1, 1), random.uniform(-1, 1)]
-        self.lifetime = random.randint(30, 60)  # frames
+import pygame.surfarray
 
-    def update(self):
-        self.x += self.speed[0]
-        self.y += self.speed[1]
-        self.lifetime -= 1
+MAX_SIZE = 3
+
+
+def disc_offsets(radius):
+    # Pixel offsets covered by pygame.draw.circle at this radius, so the
+    # batched draw below stamps exactly the same shape.
+    stamp = pygame.Surface((radius * 2 + 2, radius * 2 + 2))
+    center = radius + 1
+    pygame.draw.circle(stamp, (255, 255, 255), (center, center), radius)
+    xs, ys = np.nonzero(pygame.surfarray.array2d(stamp))
+    return np.stack([xs - center, ys - center], axis=1).astype(np.int32)
+
+
+DISC_OFFSETS = {size: disc_offsets(size) for size in range(1, MAX_SIZE + 1)}
+
+
+def stamps(xs, ys, sizes, width, height, owners=False):
+    # For each size, the flat pixel index of every (particle, offset) pair
+    # that lands inside the window and, with owners, the particle each pair
+    # belongs to (otherwise None)
+    for size, offsets in DISC_OFFSETS.items():
+        group = np.flatnonzero(sizes == size)
+        if len(group) == 0:
+            continue
+        gx, gy = xs.take(group), ys.take(group)
+        # Particles clear of the edges need no clipping
+        inside = (gx >= size) & (gx < width - size) & (gy >= size) & (gy < height - size)
+        kept = np.flatnonzero(inside)
+        base = gy.take(kept) * width + gx.take(kept)
+        index = (base[:, None] + (offsets[:, 1] * width + offsets[:, 0])).reshape(-1)
+        yield index, np.repeat(group.take(kept).astype(np.int32), len(offsets)) if owners else None
+        edge = np.flatnonzero(~inside)
+        if len(edge) == 0:
+            continue
+        px = gx.take(edge)[:, None] + offsets[:, 0]
+        py = gy.take(edge)[:, None] + offsets[:, 1]
+        clipped = ((px >= 0) & (px < width) & (py >= 0) & (py < height)).reshape(-1)
+        index = (py * width + px).reshape(-1)[clipped]
+        yield index, np.repeat(group.take(edge).astype(np.int32), len(offsets))[clipped] if owners else None
 
-    def draw(self, window):
-        pygame.draw.circle(window, self.color, (int(self.x), int(self.y)), self.size)
 
 class ParticleSystem:
-    def __init__(self):
-        self.particles = []
+    # Particles live in preallocated parallel arrays used as a ring buffer:
+    # new explosions overwrite the oldest slots once the buffer is full.
+    def __init__(self, capacity=8192, seed=None):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.speed_x = np.zeros(capacity, dtype=np.float32)
+        self.speed_y = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.int32)  # frames
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.uint32)  # packed 0xRRGGBB
+        self.head = 0
+        self.rng = np.random.default_rng(seed)
+        # Newest particle to reach each pixel of the window, for drawing
+        # mixed colors; see draw()
+        self.owner = None
+        self.ranked = 0
 
     def create_explosion(self, position, color=(255, 255, 255)):
-        num_particles = random.randint(10, 20)
-        for _ in range(num_particles):
-            self.particles.append(Particle(position[0], position[1], color))
+        num_particles = int(self.rng.integers(10, 21))
+        start = self.head
+        end = start + num_particles
+        if end <= self.capacity:
+            slots = slice(start, end)
+        else:
+            slots = np.arange(start, end) % self.capacity
+        self.head = end % self.capacity
+        rng = self.rng
+        self.x[slots] = position[0]
+        self.y[slots] = position[1]
+        self.speed_x[slots] = rng.uniform(-1, 1, num_particles)
+        self.speed_y[slots] = rng.uniform(-1, 1, num_particles)
+        self.lifetime[slots] = rng.integers(30, 61, num_particles)
+        self.size[slots] = rng.integers(1, MAX_SIZE + 1, num_particles)
+        self.color[slots] = (color[0] << 16) | (color[1] << 8) | color[2]
 
     def update(self):
-        self.particles = [p for p in self.particles if p.lifetime > 0]
-        for particle in self.particles:
-            particle.update()
+        alive = self.lifetime > 0
+        self.x += self.speed_x
+        self.y += self.speed_y
+        self.lifetime -= alive
+
+    def clear(self):
+        self.lifetime[:] = 0
+
+    def live_count(self):
+        return int(np.count_nonzero(self.lifetime))
+
+    def map_colors(self, window, packed):
+        # Convert packed 0xRRGGBB values to the surface's pixel format.
+        rloss, gloss, bloss, _ = window.get_losses()
+        rshift, gshift, bshift, _ = window.get_shifts()
+        if (rloss, gloss, bloss, rshift, gshift, bshift) == (0, 0, 0, 16, 8, 0):
+            mapped = packed.copy()
+        else:
+            r = (packed >> 16) & 0xFF
+            g = (packed >> 8) & 0xFF
+            b = packed & 0xFF
+            mapped = ((r >> rloss) << rshift) | ((g >> gloss) << gshift) | ((b >> bloss) << bshift)
+        alpha_mask = window.get_masks()[3]
+        if alpha_mask:
+            mapped |= alpha_mask
+        return mapped
+
+    def snapshot(self):
+        # Copies of the live particles' pixel positions, sizes and colors,
+        # oldest first, which draw() accepts in place of the current state,
+        # or None
+        live = np.flatnonzero(self.lifetime)
+        if len(live) == 0:
+            return None
+        # Slots from head on were written before the ones behind it
+        wrap = np.searchsorted(live, self.head)
+        if 0 < wrap < len(live):
+            live = np.concatenate((live[wrap:], live[:wrap]))
+        return (self.x.take(live).astype(np.int32), self.y.take(live).astype(np.int32),
+                self.size.take(live), self.color.take(live))
+
+    def draw(self, window, snapshot=None):
+        # Returns the bounding rect of everything drawn, or None
+        if snapshot is None:
+            snapshot = self.snapshot()
+            if snapshot is None:
+                return None
+        xs, ys, sizes, colors = snapshot
+        left, top = int(xs.min()) - MAX_SIZE, int(ys.min()) - MAX_SIZE
+        bounds = pygame.Rect(left, top, int(xs.max()) + MAX_SIZE - left + 1,
+                             int(ys.max()) + MAX_SIZE - top + 1).clip(window.get_rect())
+
+        if window.get_bytesize() not in (2, 4):
+            for x, y, size, color in zip(xs, ys, sizes, colors):
+                color = int(color)
+                pygame.draw.circle(window, (color >> 16, (color >> 8) & 0xFF, color & 0xFF),
+                                   (int(x), int(y)), int(size))
+            return bounds
+
+        # Stamp each size class into the pixel array with a handful of
+        # vectorized writes instead of one draw call per particle.
+        width, height = window.get_size()
+        pixels = pygame.surfarray.pixels2d(window)
+        mapped = self.map_colors(window, colors).astype(pixels.dtype)
+        rows = pixels.T
+        flat = rows.reshape(-1) if rows.flags.c_contiguous else None
+        try:
+            if (mapped == mapped[0]).all():
+                # With a single color the order the pixels are written in
+                # can't show
+                for index, _ in stamps(xs, ys, sizes, width, height):
+                    self.store(pixels, flat, width, index, mapped[0])
+            else:
+                # Where particles overlap the newest one must win, as with
+                # draw.circle in snapshot order. Repeated indices in one
+                # store are written in no promised order, so each pixel's
+                # newest particle is found with maximum.at first. Ranks keep
+                # growing from frame to frame, so what is left in owner from
+                # earlier frames always loses and never needs clearing.
+                if (self.owner is None or len(self.owner) != width * height
+                        or self.ranked + len(xs) > np.iinfo(np.int32).max):
+                    self.owner = np.full(width * height, -1, dtype=np.int32)
+                    self.ranked = 0
+                owner = self.owner
+                ranked = self.ranked
+                self.ranked += len(xs)
+                pairs = list(stamps(xs, ys, sizes, width, height, owners=True))
+                for index, particle in pairs:
+                    particle += ranked
+                    np.maximum.at(owner, index, particle)
+                for index, _ in pairs:
+                    self.store(pixels, flat, width, index, mapped.take(owner.take(index) - ranked))
+        finally:
+            del pixels, rows, flat
+        return bounds
 
-    def draw(self, window):
-        for particle in self.particles:
-            particle.draw(window)
\ No newline at end of file
+    def store(self, pixels, flat, width, index, values):
+        if flat is not None:
+            flat[index] = values
+        else:
+            pixels[index % width, index // width] = values
@@ -0,0 +1,42 @@
+# File: pool.py
+
+class Pool:
+    # Keeps released objects for reuse instead of allocating new ones.
+    # Pooled classes provide an init method taking the constructor's
+    # arguments.
+    def __init__(self, factory, max_size=1024):
+        self.factory = factory
+        self.max_size = max_size
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            item = self.free.pop()
+            item.init(*args)
+            self.reused += 1
+            return item
+        self.created += 1
+        return self.factory(*args)
+
+    def release(self, item):
+        if len(self.free) < self.max_size:
+            self.free.append(item)
+
+    def release_all(self, items):
+        room = self.max_size - len(self.free)
+        if room > 0:
+            self.free.extend(items[:room])
+
+
+def swap_remove(items, indices):
+    # Removes the items at `indices` in place by moving the last item into
+    # each hole. Order is not preserved. Returns the removed items.
+    removed = []
+    for i in sorted(indices, reverse=True):
+        removed.append(items[i])
+        last = items.pop()
+        if i < len(items):
+            items[i] = last
+    return removed
@@ -0,0 +1,79 @@
+# File: profiler.py
+
+import csv
+import json
+import time
+from collections import deque
+
+PHASES = ("input", "update", "collisions", "draw", "present")
+COUNTS = ("asteroids", "bullets", "saucers", "power_ups", "particles")
+COLUMNS = ("frame",) + PHASES + ("total",) + COUNTS
+
+
+class FrameProfiler:
+    # Splits each frame into phases by calling mark() at the end of each
+    # one, so timing costs a single perf_counter call per phase. Times are
+    # kept in milliseconds for the last `history` frames.
+    def __init__(self, history=3600):
+        self.frames = deque(maxlen=history)
+        self.frame = 0
+        self.visible = False
+        self.last = time.perf_counter()
+        self.times = dict.fromkeys(PHASES, 0.0)
+
+    def begin_frame(self):
+        self.last = time.perf_counter()
+        for phase in PHASES:
+            self.times[phase] = 0.0
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.times[phase] += (now - self.last) * 1000
+        self.last = now
+
+    def end_frame(self, counts):
+        times = [self.times[phase] for phase in PHASES]
+        self.frames.append((self.frame, *times, sum(times), *counts))
+        self.frame += 1
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def percentiles(self, column="total", points=(50, 95, 99)):
+        index = COLUMNS.index(column)
+        values = sorted(row[index] for row in self.frames)
+        if not values:
+            return dict.fromkeys(points, 0.0)
+        return {p: values[min(len(values) - 1, len(values) * p // 100)] for p in points}
+
+    def summary(self):
+        # Lines for the on-screen overlay
+        if not self.frames:
+            return []
+        p = self.percentiles()
+        latest = self.frames[-1]
+        lines = [f"frame p50 {p[50]:.2f}  p95 {p[95]:.2f}  p99 {p[99]:.2f} ms"]
+        for phase in PHASES:
+            lines.append(f"{phase:<10} {self.percentiles(phase)[50]:6.2f} ms")
+        lines.append("  ".join(f"{name} {value}" for name, value in zip(COUNTS, latest[-len(COUNTS):])))
+        return lines
+
+    def rows(self):
+        return [dict(zip(COLUMNS, row)) for row in self.frames]
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(COLUMNS)
+            writer.writerows(self.frames)
+
+    def export_json(self, path):
+        summary = {column: self.percentiles(column) for column in PHASES + ("total",)}
+        with open(path, "w") as file:
+            json.dump({"percentiles_ms": summary, "frames": self.rows()}, file)
+
+    def export(self, path):
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
@@ -0,0 +1,68 @@
+# File: render_thread.py
+
+import threading
+from renderer import CommandBuffer
+
+
+class RenderThread:
+    # Plays CommandBuffers recorded by the game back onto the window on a
+    # thread of its own, so drawing one frame overlaps the logic ticks of
+    # the next. Two buffers take turns: while this thread draws one, the
+    # game records into the other. Only drawing moves here; pygame.display
+    # calls stay with the thread that owns the window, which calls wait()
+    # before presenting. Frames therefore reach the screen one frame late.
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.condition = threading.Condition()
+        self.pending = None
+        self.in_flight = False
+        self.spare = CommandBuffer()
+        self.error = None
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="render", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                buffer = self.pending
+                self.pending = None
+            try:
+                self.renderer.execute(buffer)
+            except Exception as error:
+                self.error = error
+            with self.condition:
+                self.spare = buffer
+                self.in_flight = False
+                self.condition.notify_all()
+
+    def wait(self):
+        # Returns once the frame in flight, if any, is drawn
+        with self.condition:
+            while self.in_flight:
+                self.condition.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, buffer):
+        # Hands over a recorded frame and returns the other buffer to record
+        # the next one into
+        self.wait()
+        with self.condition:
+            spare, self.spare = self.spare, None
+            self.pending = buffer
+            self.in_flight = True
+            self.condition.notify_all()
+        return spare
+
+    def close(self):
+        self.wait()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
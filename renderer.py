@@ -0,0 +1,226 @@
+# File: renderer.py
+
+import random
+from itertools import islice
+import pygame
+from particles import ParticleSystem
+from starfield import Starfield
+from sprites import SpriteCache
+from text_cache import TextCache
+
+WHITE = (255, 255, 255)
+OVERLAY_COLOR = (255, 255, 0)
+# Asteroid sprites built per frame for the wave after the current one, so
+# a level change doesn't have to render the whole wave in one frame
+PREPARED_PER_FRAME = 16
+
+
+class CommandBuffer:
+    # One frame of drawing, recorded from the world by Renderer.record() and
+    # played back onto the window by Renderer.execute(). It holds only
+    # snapshots (sprite surfaces, positions, strings), so the world can move
+    # on while the frame is drawn.
+    __slots__ = ("blits", "polygons", "texts", "overlay", "stars", "particles", "prepared",
+                 "full_redraw")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.blits = []  # (surface, (x, y)), drawn with one blits call
+        self.polygons = []  # (x, y, outline points relative to x, y): asteroids with no sprite
+        self.texts = []  # (font, text, color, center)
+        self.overlay = []  # profiler overlay lines
+        self.stars = None  # starfield layer offsets
+        self.particles = None  # ParticleSystem.snapshot()
+        self.prepared = []  # sprite surfaces built ahead for the next wave
+        self.full_redraw = False
+
+
+class Renderer:
+    # With dirty_rects enabled only the regions drawn this frame or the last
+    # one are cleared and pushed to the display, instead of the whole window.
+    # Frames can fall between two logic ticks: capture() keeps positions from
+    # before a tick, and record() places moving entities `alpha` of the way
+    # from there to where the tick left them. draw() records a frame and
+    # executes it straight away; a RenderThread executes them on a thread of
+    # its own instead.
+    def __init__(self, window, width, height, dirty_rects=False, seed=None):
+        self.window = window
+        self.width = width
+        self.height = height
+        self.particle_system = ParticleSystem(seed=seed)
+        self.starfield = Starfield(width, height, random.Random(seed))
+        self.font = pygame.font.Font(None, 36)
+        self.sprites = SpriteCache()
+        self.text_cache = TextCache()
+        self.overlay_font = pygame.font.Font(None, 20)
+        self.overlay_lines = []
+        self.profiler = None
+        self.dirty_rects = dirty_rects
+        self.previous_rects = []
+        self.rects = []
+        self.drawn = []  # rects drawn over the starfield last frame
+        self.full_redraw = True
+        self.flip_next = True
+        self.previous = {}
+        self.previous_ship = None
+        self.alpha = 1.0
+        self.buffer = CommandBuffer()
+        self.upcoming = None  # (next wave, its asteroids still to prepare)
+
+    def on_event(self, event, position):
+        if event == "explosion":
+            self.particle_system.create_explosion(position)
+        elif event == "respawn":
+            # Not interpolated from where it crashed
+            self.previous_ship = None
+
+    def update(self):
+        self.particle_system.update()
+        self.starfield.update()
+
+    def capture(self, world):
+        # Called before each logic tick
+        previous = {}
+        for entities in (world.asteroids, world.bullets, world.flying_saucers):
+            for entity in entities:
+                previous[entity.id] = (entity.position[0], entity.position[1])
+        self.previous = previous
+        self.previous_ship = (world.ship.position[0], world.ship.position[1])
+
+    def interpolate(self, position, previous):
+        # Entities that just spawned, respawned or wrapped around the screen
+        # are drawn where they are
+        if previous is None or self.alpha >= 1.0:
+            return position
+        dx = position[0] - previous[0]
+        dy = position[1] - previous[1]
+        if abs(dx) > self.width / 2 or abs(dy) > self.height / 2:
+            return position
+        alpha = self.alpha
+        return previous[0] + dx * alpha, previous[1] + dy * alpha
+
+    def draw(self, world, alpha=1.0):
+        self.record(world, alpha, self.buffer)
+        self.execute(self.buffer)
+
+    def record(self, world, alpha, buffer):
+        # Fills `buffer` with this frame; touches neither the window nor the
+        # text cache, which belong to whoever executes it
+        buffer.clear()
+        self.alpha = alpha
+        buffer.full_redraw = self.full_redraw
+        self.full_redraw = False
+        buffer.stars = self.starfield.offsets
+        buffer.particles = self.particle_system.snapshot()
+
+        # Entities are pre-rendered once and drawn with a single blits call
+        sprites = self.sprites
+        sprites.begin_frame()
+        ship = world.ship
+        previous = self.previous
+        interpolate = self.interpolate
+        place = self.place
+        blits = buffer.blits
+        ship_position = interpolate(ship.position, self.previous_ship)
+        blits.append(place(sprites.ship(ship.angle), ship_position))
+        if ship.shield_active:
+            blits.append(place(sprites.shield(ship.radius), ship_position))
+        for asteroid in world.asteroids:
+            position = interpolate(asteroid.position, previous.get(asteroid.id))
+            sprite = sprites.asteroid(asteroid.vertices)
+            if sprite is None:
+                buffer.polygons.append((position[0], position[1], asteroid.vertices))
+            else:
+                blits.append(place(sprite, position))
+        for bullet in world.bullets:
+            blits.append(place(sprites.bullet(bullet.radius), interpolate(bullet.position, previous.get(bullet.id))))
+        for saucer in world.flying_saucers:
+            blits.append(place(sprites.saucer(saucer.radius), interpolate(saucer.position, previous.get(saucer.id))))
+        for power_up in world.power_ups:
+            blits.append(place(sprites.power_up(power_up.type, power_up.radius), power_up.position))
+        if world.waves is not None:
+            self.prepare_wave(world.waves, world.level + 1, buffer)
+
+        # HUD
+        buffer.texts.append((self.font, f"Score: {world.score}", WHITE, (100, 30)))
+        buffer.texts.append((self.font, f"Lives: {world.lives}", WHITE, (self.width - 100, 30)))
+        buffer.texts.append((self.font, f"Level: {world.level}", WHITE, (self.width // 2, 30)))
+        if self.profiler is not None and self.profiler.visible:
+            # Refreshed twice a second so the text cache isn't flooded with
+            # numbers that change every frame
+            if not self.overlay_lines or self.profiler.frame % 30 == 0:
+                self.overlay_lines = self.profiler.summary()
+            buffer.overlay = self.overlay_lines
+
+    def prepare_wave(self, waves, level, buffer):
+        # Spreads the next wave's sprite builds over the frames before it
+        wave = waves.peek(level)
+        if wave is None:
+            return
+        if self.upcoming is None or self.upcoming[0] is not wave:
+            self.upcoming = (wave, iter(wave))
+        for asteroid in islice(self.upcoming[1], PREPARED_PER_FRAME):
+            sprite = self.sprites.prepare_asteroid(asteroid.vertices)
+            if sprite is None:
+                self.upcoming = (wave, iter(()))
+                break
+            buffer.prepared.append(sprite[0])
+
+    def execute(self, buffer):
+        window = self.window
+        self.flip_next = buffer.full_redraw or not self.dirty_rects
+        # The starfield repaints the background under everything drawn last
+        # frame, or all of it when the whole window gets flipped
+        rects = self.starfield.draw(window, buffer.stars, None if self.flip_next else self.drawn)
+        drawn = []
+        # SDL run-length encodes a sprite against the window on its first
+        # blit, which costs about as much as rendering it. Blitting one
+        # transparent corner pixel does that here, a frame or more before
+        # the sprite is needed.
+        window.blits([(surface, (0, 0), (0, 0, 1, 1)) for surface in buffer.prepared], doreturn=False)
+        for px, py, vertices in buffer.polygons:
+            drawn.append(pygame.draw.polygon(window, WHITE, [(px + x, py + y) for x, y in vertices], 2))
+
+        self.blit_batch(buffer.blits, drawn)
+        if buffer.particles is not None:
+            drawn.append(self.particle_system.draw(window, buffer.particles))
+
+        # Text goes on top, also in one blits call
+        texts = []
+        for font, text, color, center in buffer.texts:
+            surface = self.text_cache.render(font, text, color)
+            texts.append((surface, surface.get_rect(center=center)))
+        y = 60
+        for line in buffer.overlay:
+            surface = self.text_cache.render(self.overlay_font, line, OVERLAY_COLOR)
+            texts.append((surface, (10, y)))
+            y += surface.get_height()
+        self.blit_batch(texts, drawn)
+        self.drawn = drawn
+        self.rects = rects + drawn
+
+    def blit_batch(self, blits, rects):
+        if self.dirty_rects:
+            rects.extend(self.window.blits(blits))
+        else:
+            self.window.blits(blits, doreturn=False)
+
+    def present(self):
+        if self.flip_next:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.previous_rects + self.rects)
+        self.previous_rects = self.rects
+
+    def invalidate(self):
+        # Something else drew over the window (e.g. a menu); repaint it all
+        self.full_redraw = True
+        self.previous = {}
+        self.previous_ship = None
+
+    @staticmethod
+    def place(sprite, position):
+        surface, (dx, dy) = sprite
+        return surface, (int(position[0]) + dx, int(position[1]) + dy)
@@ -0,0 +1,118 @@
+# File: replay.py
+
+import argparse
+import struct
+import sys
+import time
+from array import array
+
+from levels import LevelSet
+from saucer_ai import DIFFICULTY_NAMES
+from world import World, Inputs
+
+# Log layout: header, then the level set as level file JSON (empty for the
+# built-in one), then one input bitmask byte per frame, then one uint32 state
+# hash per frame (all little-endian).
+MAGIC = b"AREC"
+# Bumped whenever the simulation or the layout changes: 2 waves from
+# levels.py, 3 timers in seconds, 4 swept collisions, 5 saucer AI, 6 touching
+# bullets keep all hits, 7 level set stored in the log
+VERSION = 7
+HEADER = struct.Struct("<4sBQHHIBI")  # magic, version, seed, width, height, frames, difficulty, levels bytes
+
+
+class InputLog:
+    # The inputs of one game plus the world's state hash after each frame.
+    # Replaying the inputs on a World seeded with `seed` at the same
+    # difficulty and with the same LevelSet (None for the built-in one)
+    # reproduces the game.
+    def __init__(self, seed, width, height, difficulty="normal", levels=None):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.difficulty = difficulty
+        self.levels = levels
+        self.inputs = bytearray()
+        self.hashes = array("I")
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, inputs, world):
+        self.inputs.append(inputs.to_bits())
+        self.hashes.append(world.state_hash())
+
+    def save(self, path):
+        hashes = array("I", self.hashes)
+        if hashes.itemsize != 4:
+            raise ValueError("array('I') is not 32-bit on this platform")
+        if sys.byteorder == "big":
+            hashes.byteswap()
+        levels = self.levels.dumps().encode() if self.levels is not None else b""
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.seed, self.width, self.height, len(self.inputs),
+                                   DIFFICULTY_NAMES.index(self.difficulty), len(levels)))
+            file.write(levels)
+            file.write(self.inputs)
+            file.write(hashes.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, seed, width, height, frames, difficulty, levels = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} input log")
+        start = HEADER.size + levels
+        levels = LevelSet.loads(data[HEADER.size:start].decode()) if levels else None
+        log = cls(seed, width, height, DIFFICULTY_NAMES[difficulty], levels)
+        log.inputs = bytearray(data[start:start + frames])
+        log.hashes = array("I", data[start + frames:start + frames * 5])
+        if len(log.hashes) != frames:
+            raise ValueError(f"{path} is truncated")
+        if sys.byteorder == "big":
+            log.hashes.byteswap()
+        return log
+
+
+def replay(log, verify=True):
+    # Re-simulates the logged game as fast as possible. Returns timing and
+    # the first frame whose state hash differs from the recording, if any.
+    world = World(log.width, log.height, seed=log.seed, levels=log.levels, difficulty=log.difficulty)
+    inputs = [Inputs.from_bits(bits) for bits in range(16)]
+    mismatch = None
+    start = time.perf_counter()
+    for frame, bits in enumerate(log.inputs):
+        world.step(inputs[bits])
+        if verify and world.state_hash() != log.hashes[frame]:
+            mismatch = frame
+            break
+    elapsed = time.perf_counter() - start
+    frames = frame + 1 if log.inputs else 0
+    return {
+        "frames": frames,
+        "elapsed": elapsed,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "mismatch": mismatch,
+        "score": world.score,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded game headlessly")
+    parser.add_argument("log")
+    parser.add_argument("--no-verify", action="store_true", help="skip the per-frame state hash check")
+    parser.add_argument("--repeat", type=int, default=1, help="replay several times and report the best run")
+    args = parser.parse_args()
+
+    log = InputLog.load(args.log)
+    results = [replay(log, verify=not args.no_verify) for _ in range(args.repeat)]
+    best = max(results, key=lambda result: result["fps"])
+    print(f"{best['frames']:,} frames in {best['elapsed']:.3f}s ({best['fps']:,.0f} fps), score {best['score']}")
+    if best["mismatch"] is not None:
+        print(f"state diverged from the recording at frame {best['mismatch']}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# File: saucer_ai.py
+
+import math
+from collision import wrapped
+from entities import BULLET_SPEED
+
+# Per difficulty: the fraction of the lead solution applied when aiming (0
+# aims at where the ship is now), random aim error in degrees, the range of
+# seconds between shots, seconds between re-plans, and how far ahead in
+# pixels a saucer looks for asteroids to dodge (0 never dodges).
+DIFFICULTIES = {
+    "easy": {"lead": 0.0, "spread": 12.0, "fire": (1.5, 2.5), "think": 0.5, "avoid": 0},
+    "normal": {"lead": 0.75, "spread": 6.0, "fire": (1.0, 2.0), "think": 0.25, "avoid": 60},
+    "hard": {"lead": 1.0, "spread": 2.0, "fire": (0.6, 1.2), "think": 0.1, "avoid": 120},
+}
+# Index of each difficulty as stored in replay logs
+DIFFICULTY_NAMES = tuple(DIFFICULTIES)
+# Saucers that may re-plan in one tick
+THINK_BUDGET = 8
+# Vertical speeds in pixels per tick: dodging an asteroid, and the most a
+# saucer drifts otherwise
+CLIMB = 1.5
+DRIFT = 0.5
+# Bullets leave this many pixels outside the hull. Any nearer and the
+# collision sweep, which starts a bullet one tick back, finds it inside the
+# saucer that fired it.
+MUZZLE = 10
+
+
+def intercept_ticks(dx, dy, vx, vy, speed=BULLET_SPEED, muzzle=0):
+    # Ticks until a bullet fired now at `speed`, starting `muzzle` pixels
+    # out, can meet a target at offset (dx, dy) moving at (vx, vy), or None
+    # if it can't catch up. Solves |d + v t| = muzzle + speed t for the
+    # smallest t > 0.
+    a = vx * vx + vy * vy - speed * speed
+    half_b = dx * vx + dy * vy - speed * muzzle
+    c = dx * dx + dy * dy - muzzle * muzzle
+    if abs(a) < 1e-9:
+        return -c / (2 * half_b) if half_b < 0 else None
+    discriminant = half_b * half_b - a * c
+    if discriminant < 0:
+        return None
+    root = math.sqrt(discriminant)
+    for t in sorted(((-half_b - root) / a, (-half_b + root) / a)):
+        if t > 0:
+            return t
+    return None
+
+
+class SaucerAI:
+    # Steers and aims the flying saucers for one difficulty. A saucer
+    # re-plans every few tenths of a second: it picks the nearest ship,
+    # works out how far to lead it, and looks up nearby asteroids in the
+    # world's spatial hash to dodge. Shots in between reuse that plan. At
+    # most `budget` saucers re-plan in a tick and the rest take their turn
+    # on the following ticks, so a swarm costs about as much per tick as a
+    # handful. The budget counts saucers rather than time so a replay makes
+    # the same decisions as the game it recorded.
+    def __init__(self, difficulty="normal", budget=THINK_BUDGET):
+        self.difficulty = difficulty
+        self.settings = DIFFICULTIES[difficulty]
+        self.budget = budget
+        self.cursor = 0
+
+    def due(self, saucers):
+        # The saucers to re-plan this tick, starting where the last full
+        # batch left off so none is starved
+        count = len(saucers)
+        due = []
+        for step in range(count):
+            saucer = saucers[(self.cursor + step) % count]
+            if saucer.think_timer <= 0:
+                due.append(saucer)
+                if len(due) == self.budget:
+                    self.cursor = (self.cursor + step + 1) % count
+                    break
+        return due
+
+    def plan(self, saucer, ships, asteroids, grid, width, height):
+        # grid must index `asteroids` at their current positions
+        settings = self.settings
+        saucer.think_timer = settings["think"]
+        x, y = saucer.position
+        target = None
+        nearest = None
+        for ship in ships:
+            dx = wrapped(ship.position[0] - x, width)
+            dy = wrapped(ship.position[1] - y, height)
+            distance = dx * dx + dy * dy
+            if nearest is None or distance < nearest:
+                target, nearest, offset = ship, distance, (dx, dy)
+        saucer.target = target
+        saucer.lead_ticks = 0.0
+        if target is not None and settings["lead"]:
+            t = intercept_ticks(*offset, *target.speed, muzzle=saucer.radius + MUZZLE)
+            if t is not None:
+                saucer.lead_ticks = t * settings["lead"]
+
+        look = settings["avoid"]
+        if look:
+            # Nearest asteroid ahead whose path would clip the saucer
+            direction = 1 if saucer.speed[0] > 0 else -1
+            threat = None
+            for a in grid.query(x + direction * look / 2, y, look / 2 + saucer.radius):
+                asteroid = asteroids[a]
+                dx = wrapped(asteroid.position[0] - x, width) * direction
+                dy = wrapped(asteroid.position[1] - y, height)
+                reach = asteroid.radius + saucer.radius
+                if -reach < dx < look + reach and abs(dy) < reach and (threat is None or dx < threat[0]):
+                    threat = (dx, dy)
+            if threat is not None:
+                saucer.speed[1] = CLIMB if threat[1] < 0 else -CLIMB
+                return
+        saucer.speed[1] = saucer.rng.uniform(-DRIFT, DRIFT)
+
+    def shoot(self, saucer, ships, make_bullet, width, height):
+        # Fires along the planned lead, if the saucer's target is still in
+        # play. Returns the bullet or None.
+        settings = self.settings
+        saucer.shoot_timer = saucer.rng.uniform(*settings["fire"])
+        target = saucer.target
+        if target is None or target not in ships:
+            return None
+        lead = saucer.lead_ticks
+        dx = wrapped(target.position[0] + target.speed[0] * lead - saucer.position[0], width)
+        dy = wrapped(target.position[1] + target.speed[1] * lead - saucer.position[1], height)
+        # Screen y points down, bullet angles count counterclockwise
+        angle = math.degrees(math.atan2(-dy, dx)) + saucer.rng.uniform(-settings["spread"], settings["spread"])
+        muzzle = saucer.radius + MUZZLE
+        radians = math.radians(angle)
+        return make_bullet((saucer.position[0] + math.cos(radians) * muzzle,
+                            saucer.position[1] - math.sin(radians) * muzzle), angle)
@@ -0,0 +1,61 @@
+# File: spatial.py
+
+class SpatialHash:
+    def __init__(self, width, height, cell_size=64):
+        self.width = width
+        self.height = height
+        # Snap the grid so it tiles the screen exactly; cell indices can then
+        # wrap with a plain modulo, the same way entity positions do.
+        self.cols = max(1, int(width // cell_size))
+        self.rows = max(1, int(height // cell_size))
+        self.cell_width = width / self.cols
+        self.cell_height = height / self.rows
+        self.cells = {}
+
+    def clear(self):
+        self.cells.clear()
+
+    def covered_cells(self, x, y, radius):
+        x0 = int((x - radius) // self.cell_width)
+        x1 = int((x + radius) // self.cell_width)
+        y0 = int((y - radius) // self.cell_height)
+        y1 = int((y + radius) // self.cell_height)
+        if x0 == x1 and y0 == y1:
+            # Most bullets and ships sit inside a single cell
+            return [(x0 % self.cols, y0 % self.rows)]
+        if x1 - x0 + 1 >= self.cols:
+            xs = range(self.cols)
+        else:
+            xs = [cx % self.cols for cx in range(x0, x1 + 1)]
+        if y1 - y0 + 1 >= self.rows:
+            ys = range(self.rows)
+        else:
+            ys = [cy % self.rows for cy in range(y0, y1 + 1)]
+        return [(cx, cy) for cx in xs for cy in ys]
+
+    def insert(self, item, x, y, radius):
+        cells = self.cells
+        for key in self.covered_cells(x, y, radius):
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [item]
+            else:
+                bucket.append(item)
+
+    def query(self, x, y, radius):
+        cells = self.cells
+        keys = self.covered_cells(x, y, radius)
+        if len(keys) == 1:
+            bucket = cells.get(keys[0])
+            return set(bucket) if bucket else set()
+        found = set()
+        for key in keys:
+            bucket = cells.get(key)
+            if bucket:
+                found.update(bucket)
+        return found
+
+    def rebuild(self, entities):
+        self.cells.clear()
+        for i, entity in enumerate(entities):
+            self.insert(i, entity.position[0], entity.position[1], entity.radius)
@@ -0,0 +1,592 @@
+# File: spectator.py
+
+import argparse
+import asyncio
+import math
+import random
+import struct
+
+from entities import TICK_RATE
+from world import World
+
+SHIP = 0
+ASTEROID = 1
+BULLET = 2
+SAUCER = 3
+POWER_UP = 4
+
+POWER_UP_TYPES = ("shield", "rapid_fire", "multi_shot")
+SHIP_RADIUS = 15
+SHIP_FRICTION = 0.99
+
+POSITION_SCALE = 8  # positions are sent in 1/8 px
+SPEED_SCALE = 256  # speeds in 1/256 px per frame
+TOLERANCE = 1.0  # px a spectator's prediction may drift before it's corrected
+
+# The first byte of every message. A keyframe holds the whole state; any
+# other message is the delta for exactly one tick and says which sections
+# follow. Spectators move everything along its last known speed each tick,
+# so an entity only appears in a delta when it spawns, dies or drifts more
+# than TOLERANCE from that prediction.
+KEYFRAME = 0x80
+GLOBALS = 0x01
+SHIP_MOTION = 0x02
+SHIP_POSE = 0x04
+SPAWNS = 0x08
+MOVES = 0x10
+REMOVALS = 0x20
+
+KEYFRAME_HEADER = struct.Struct("<IHH")  # tick, width, height
+GLOBALS_RECORD = struct.Struct("<IbH")  # score, lives, level
+MOTION = struct.Struct("<hhhh")  # x, y, speed x, speed y
+EXACT_MOTION = struct.Struct("<dddd")  # keyframes carry predictions unrounded
+POSE = struct.Struct("<HB")  # angle, shield
+COUNT = struct.Struct("<H")
+SPAWN = struct.Struct("<BIB")  # kind, id, size or power-up type; then motion
+MOVE = struct.Struct("<Ihhhh")  # id, motion
+ID = struct.Struct("<I")
+LENGTH = struct.Struct("<H")
+LONG_LENGTH = struct.Struct("<I")
+
+
+class EntityView:
+    # An entity as a spectator sees it. Has the attributes Renderer.draw
+    # reads, so a SpectatorState can be drawn like a World.
+    __slots__ = ("id", "kind", "position", "speed", "size", "radius", "type", "vertices", "shape", "seen")
+
+    def __init__(self, entity_id, kind, size):
+        # For power-ups, size is the index of their type in POWER_UP_TYPES
+        self.id = entity_id
+        self.kind = kind
+        self.position = [0.0, 0.0]
+        self.speed = [0.0, 0.0]
+        self.size = size
+        self.type = POWER_UP_TYPES[size] if kind == POWER_UP else None
+        self.radius = {SHIP: SHIP_RADIUS, ASTEROID: size * 10, BULLET: 2, SAUCER: size * 15, POWER_UP: 10}[kind]
+        self.vertices = ()
+        self.shape = b""
+        self.seen = 0
+
+
+class ShipView(EntityView):
+    __slots__ = ("angle", "shield_active")
+
+    def __init__(self):
+        super().__init__(0, SHIP, 0)
+        self.angle = 0
+        self.shield_active = False
+
+
+def quantize(entity):
+    x, y = entity.position
+    speed_x, speed_y = getattr(entity, "speed", (0, 0))  # power-ups don't move
+    return (round(x * POSITION_SCALE), round(y * POSITION_SCALE),
+            round(speed_x * SPEED_SCALE), round(speed_y * SPEED_SCALE))
+
+
+def set_motion(view, x, y, speed_x, speed_y):
+    view.position[0] = x / POSITION_SCALE
+    view.position[1] = y / POSITION_SCALE
+    view.speed[0] = speed_x / SPEED_SCALE
+    view.speed[1] = speed_y / SPEED_SCALE
+
+
+def set_exact_motion(view, x, y, speed_x, speed_y):
+    view.position[0] = x
+    view.position[1] = y
+    view.speed[0] = speed_x
+    view.speed[1] = speed_y
+
+
+def predict(view, width, height):
+    # Same motion as the entity's update(); encoder and spectators run this
+    # on identical values, so their predictions match exactly.
+    position, speed = view.position, view.speed
+    position[0] += speed[0]
+    position[1] += speed[1]
+    if view.kind == SHIP:
+        speed[0] *= SHIP_FRICTION
+        speed[1] *= SHIP_FRICTION
+    if view.kind != SAUCER:
+        position[0] %= width
+        position[1] %= height
+
+
+def drift(view, entity, width, height):
+    dx = entity.position[0] - view.position[0]
+    dy = entity.position[1] - view.position[1]
+    if view.kind != SAUCER:
+        dx -= round(dx / width) * width
+        dy -= round(dy / height) * height
+    return abs(dx) > TOLERANCE or abs(dy) > TOLERANCE
+
+
+def encode_shape(asteroid):
+    # Vertices sit at evenly spaced angles, so only each distance from the
+    # center is sent, as a byte spanning 0.8-1.2 times the radius.
+    distances = bytes(min(255, max(0, round((math.hypot(x, y) / asteroid.radius - 0.8) / 0.4 * 255)))
+                      for x, y in asteroid.vertices)
+    return bytes([len(distances)]) + distances
+
+
+def decode_shape(shape, radius):
+    count = len(shape)
+    vertices = []
+    for i, value in enumerate(shape):
+        angle = i * (2 * math.pi / count)
+        distance = radius * (0.8 + value / 255 * 0.4)
+        vertices.append((distance * math.cos(angle), distance * math.sin(angle)))
+    return tuple(vertices)
+
+
+def entity_groups(world):
+    return ((ASTEROID, world.asteroids), (BULLET, world.bullets),
+            (SAUCER, world.flying_saucers), (POWER_UP, world.power_ups))
+
+
+def detail(kind, entity):
+    if kind == POWER_UP:
+        return POWER_UP_TYPES.index(entity.type)
+    return getattr(entity, "size", 0)
+
+
+class StateEncoder:
+    # Keeps a copy of what spectators currently believe and encodes, once
+    # per tick, only where the World differs from it. Entities that move as
+    # predicted cost a dictionary lookup and a comparison.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.views = {}
+        self.ship = ShipView()
+        self.globals = None
+        self.tick = 0
+        self.frame = 0
+
+    def encode(self, world):
+        self.tick = world.tick
+        width, height = self.width, self.height
+        out = bytearray(1)
+        flags = 0
+        first = self.globals is None
+
+        state = (world.score, world.lives, world.level)
+        if state != self.globals:
+            self.globals = state
+            flags |= GLOBALS
+            out += GLOBALS_RECORD.pack(*state)
+
+        ship = self.ship
+        predict(ship, width, height)
+        if first or drift(ship, world.ship, width, height):
+            motion = quantize(world.ship)
+            set_motion(ship, *motion)
+            flags |= SHIP_MOTION
+            out += MOTION.pack(*motion)
+        angle = world.ship.angle % 360
+        if first or angle != ship.angle or world.ship.shield_active != ship.shield_active:
+            ship.angle = angle
+            ship.shield_active = world.ship.shield_active
+            flags |= SHIP_POSE
+            out += POSE.pack(angle, ship.shield_active)
+
+        entity_flags, body = self.encode_entities(world)
+        out[0] = flags | entity_flags
+        return bytes(out + body)
+
+    def encode_entities(self, world):
+        # The asteroid, bullet, saucer and power-up sections of a delta
+        self.frame += 1
+        width, height = self.width, self.height
+        flags = 0
+        out = bytearray()
+        spawns = bytearray()
+        moves = bytearray()
+        spawned = moved = 0
+        views = self.views
+        frame = self.frame
+        half_width, half_height = width / 2, height / 2
+        for kind, entities in entity_groups(world):
+            wraps = kind != SAUCER
+            for entity in entities:
+                view = views.get(entity.id)
+                if view is None:
+                    view = EntityView(entity.id, kind, detail(kind, entity))
+                    motion = quantize(entity)
+                    set_motion(view, *motion)
+                    if kind == ASTEROID:
+                        view.shape = encode_shape(entity)
+                    views[entity.id] = view
+                    spawns += SPAWN.pack(kind, entity.id, view.size) + MOTION.pack(*motion) + view.shape
+                    spawned += 1
+                else:
+                    # predict() and drift() inlined; this runs for every
+                    # entity every tick
+                    position, speed = view.position, view.speed
+                    x = position[0] + speed[0]
+                    y = position[1] + speed[1]
+                    if wraps:
+                        x %= width
+                        y %= height
+                    position[0] = x
+                    position[1] = y
+                    dx = entity.position[0] - x
+                    dy = entity.position[1] - y
+                    if wraps:
+                        if dx > half_width:
+                            dx -= width
+                        elif dx < -half_width:
+                            dx += width
+                        if dy > half_height:
+                            dy -= height
+                        elif dy < -half_height:
+                            dy += height
+                    if dx > TOLERANCE or dx < -TOLERANCE or dy > TOLERANCE or dy < -TOLERANCE:
+                        motion = quantize(entity)
+                        set_motion(view, *motion)
+                        moves += MOVE.pack(entity.id, *motion)
+                        moved += 1
+                view.seen = frame
+        removed = [entity_id for entity_id, view in views.items() if view.seen != frame]
+        for entity_id in removed:
+            del views[entity_id]
+
+        if spawned:
+            flags |= SPAWNS
+            out += COUNT.pack(spawned) + spawns
+        if moved:
+            flags |= MOVES
+            out += COUNT.pack(moved) + moves
+        if removed:
+            flags |= REMOVALS
+            out += COUNT.pack(len(removed))
+            for entity_id in removed:
+                out += ID.pack(entity_id)
+        return flags, out
+
+    def keyframe(self):
+        # The state spectators hold after the last encode() call, exactly,
+        # so later deltas apply to a newcomer just as to everyone else
+        ship = self.ship
+        out = bytearray([KEYFRAME])
+        out += KEYFRAME_HEADER.pack(self.tick, self.width, self.height)
+        out += GLOBALS_RECORD.pack(*self.globals)
+        out += EXACT_MOTION.pack(*ship.position, *ship.speed)
+        out += POSE.pack(ship.angle, ship.shield_active)
+        return bytes(out + self.keyframe_entities())
+
+    def keyframe_entities(self):
+        out = bytearray(COUNT.pack(len(self.views)))
+        for view in self.views.values():
+            out += SPAWN.pack(view.kind, view.id, view.size)
+            out += EXACT_MOTION.pack(*view.position, *view.speed) + view.shape
+        return out
+
+
+class SpectatorState:
+    # Rebuilds a game from keyframes and deltas. Exposes the same
+    # attributes as World that Renderer.draw uses.
+    def __init__(self):
+        self.width = 800
+        self.height = 600
+        self.tick = 0
+        self.score = 0
+        self.lives = 0
+        self.level = 0
+        # Nothing is planned ahead here, so the renderer has no waves to
+        # prepare sprites for
+        self.waves = None
+        self.ship = ShipView()
+        self.entities = {kind: {} for kind in (ASTEROID, BULLET, SAUCER, POWER_UP)}
+        self.index = {}
+        self.synced = False
+
+    @property
+    def asteroids(self):
+        return list(self.entities[ASTEROID].values())
+
+    @property
+    def bullets(self):
+        return list(self.entities[BULLET].values())
+
+    @property
+    def flying_saucers(self):
+        return list(self.entities[SAUCER].values())
+
+    @property
+    def power_ups(self):
+        return list(self.entities[POWER_UP].values())
+
+    def apply(self, message):
+        # Returns the (event, position) pairs a frontend would have received
+        # from the World this tick: explosions for destroyed asteroids and
+        # saucers and for lost lives.
+        flags = message[0]
+        if flags & KEYFRAME:
+            self.apply_keyframe(message)
+            return []
+        if not self.synced:
+            return []
+        self.tick += 1
+        events = []
+        predict(self.ship, self.width, self.height)
+        self.predict_entities()
+
+        offset = 1
+        if flags & GLOBALS:
+            score, lives, level = GLOBALS_RECORD.unpack_from(message, offset)
+            offset += GLOBALS_RECORD.size
+            if lives < self.lives:
+                events.append(("explosion", tuple(self.ship.position)))
+            self.score, self.lives, self.level = score, lives, level
+        if flags & SHIP_MOTION:
+            set_motion(self.ship, *MOTION.unpack_from(message, offset))
+            offset += MOTION.size
+        if flags & SHIP_POSE:
+            self.ship.angle, shield = POSE.unpack_from(message, offset)
+            self.ship.shield_active = bool(shield)
+            offset += POSE.size
+        self.apply_entities(flags, message, offset, events)
+        return events
+
+    def predict_entities(self):
+        width, height = self.width, self.height
+        for view in self.index.values():
+            predict(view, width, height)
+
+    def apply_entities(self, flags, message, offset, events):
+        if flags & SPAWNS:
+            offset = self.read_spawns(message, offset, MOTION)
+        if flags & MOVES:
+            (count,) = COUNT.unpack_from(message, offset)
+            offset += COUNT.size
+            for _ in range(count):
+                entity_id, *motion = MOVE.unpack_from(message, offset)
+                offset += MOVE.size
+                set_motion(self.index[entity_id], *motion)
+        if flags & REMOVALS:
+            (count,) = COUNT.unpack_from(message, offset)
+            offset += COUNT.size
+            for _ in range(count):
+                (entity_id,) = ID.unpack_from(message, offset)
+                offset += ID.size
+                view = self.index.pop(entity_id)
+                del self.entities[view.kind][entity_id]
+                if view.kind in (ASTEROID, SAUCER):
+                    events.append(("explosion", tuple(view.position)))
+        return offset
+
+    def apply_keyframe(self, message):
+        offset = 1
+        self.tick, self.width, self.height = KEYFRAME_HEADER.unpack_from(message, offset)
+        offset += KEYFRAME_HEADER.size
+        self.score, self.lives, self.level = GLOBALS_RECORD.unpack_from(message, offset)
+        offset += GLOBALS_RECORD.size
+        set_exact_motion(self.ship, *EXACT_MOTION.unpack_from(message, offset))
+        offset += EXACT_MOTION.size
+        self.ship.angle, shield = POSE.unpack_from(message, offset)
+        self.ship.shield_active = bool(shield)
+        offset += POSE.size
+        self.read_keyframe_entities(message, offset)
+        self.synced = True
+
+    def read_keyframe_entities(self, message, offset):
+        for entities in self.entities.values():
+            entities.clear()
+        self.index.clear()
+        return self.read_spawns(message, offset, EXACT_MOTION)
+
+    def read_spawns(self, message, offset, motion):
+        (count,) = COUNT.unpack_from(message, offset)
+        offset += COUNT.size
+        apply_motion = set_exact_motion if motion is EXACT_MOTION else set_motion
+        for _ in range(count):
+            kind, entity_id, size = SPAWN.unpack_from(message, offset)
+            offset += SPAWN.size
+            view = EntityView(entity_id, kind, size)
+            apply_motion(view, *motion.unpack_from(message, offset))
+            offset += motion.size
+            if kind == ASTEROID:
+                length = message[offset]
+                view.shape = bytes(message[offset:offset + 1 + length])
+                view.vertices = decode_shape(view.shape[1:], view.radius)
+                offset += 1 + length
+            self.entities[kind][entity_id] = view
+            self.index[entity_id] = view
+        return offset
+
+
+def frame_message(message):
+    # Length-prefixed for the stream; 2 bytes for all but huge keyframes
+    if len(message) < 0xFFFF:
+        return LENGTH.pack(len(message)) + message
+    return LENGTH.pack(0xFFFF) + LONG_LENGTH.pack(len(message)) + message
+
+
+def unframe(buffer):
+    # Removes every complete message from the front of a bytearray
+    messages = []
+    offset = 0
+    while len(buffer) - offset >= LENGTH.size:
+        (length,) = LENGTH.unpack_from(buffer, offset)
+        header = LENGTH.size
+        if length == 0xFFFF:
+            if len(buffer) - offset < LENGTH.size + LONG_LENGTH.size:
+                break
+            (length,) = LONG_LENGTH.unpack_from(buffer, offset + LENGTH.size)
+            header += LONG_LENGTH.size
+        end = offset + header + length
+        if end > len(buffer):
+            break
+        messages.append(bytes(buffer[offset + header:end]))
+        offset = end
+    del buffer[:offset]
+    return messages
+
+
+async def read_message(reader):
+    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    if length == 0xFFFF:
+        (length,) = LONG_LENGTH.unpack(await reader.readexactly(LONG_LENGTH.size))
+    return await reader.readexactly(length)
+
+
+class SpectatorServer:
+    # Sends every spectator the same framed delta each tick. New spectators,
+    # and any whose socket backs up past max_backlog bytes, skip deltas and
+    # get a keyframe once they can take it.
+    def __init__(self, encoder, host="127.0.0.1", port=0, max_backlog=64 * 1024):
+        self.encoder = encoder
+        self.host = host
+        self.port = port
+        self.max_backlog = max_backlog
+        self.clients = {}  # writer -> waiting for a keyframe
+        self.server = None
+        self.bytes_sent = 0
+        self.keyframes_sent = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        self.clients[writer] = True
+        try:
+            # Spectators never send anything; EOF means they left
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def broadcast(self, delta):
+        framed = frame_message(delta)
+        keyframe = None
+        for writer, waiting in self.clients.items():
+            if writer.transport.get_write_buffer_size() > self.max_backlog:
+                self.clients[writer] = True
+                continue
+            if waiting:
+                if keyframe is None:
+                    keyframe = frame_message(self.encoder.keyframe())
+                writer.write(keyframe)
+                self.clients[writer] = False
+                self.bytes_sent += len(keyframe)
+                self.keyframes_sent += 1
+            else:
+                writer.write(framed)
+                self.bytes_sent += len(framed)
+
+    async def close(self):
+        for writer in list(self.clients):
+            writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def broadcast_game(world, server, policy, seconds=None, seed=0):
+    # Steps the world at TICK_RATE, restarting it on game over, and hands
+    # each tick's delta to the server.
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    frames = 0
+    while seconds is None or frames < seconds * TICK_RATE:
+        world.step(policy(world, rng))
+        if world.game_over:
+            world.reset()
+        server.broadcast(server.encoder.encode(world))
+        frames += 1
+        next_tick += 1 / TICK_RATE
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+
+async def watch(host, port, state, on_frame=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            message = await read_message(reader)
+            events = state.apply(message)
+            if on_frame is not None and on_frame(state, events, len(message)) is False:
+                break
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(args):
+    from farm import random_policy
+
+    world = World(args.width, args.height, seed=args.seed)
+    server = SpectatorServer(StateEncoder(args.width, args.height), args.host, args.port)
+    await server.start()
+    print(f"Broadcasting on {args.host}:{server.port}")
+    try:
+        await broadcast_game(world, server, random_policy, args.seconds, args.seed)
+    finally:
+        await server.close()
+
+
+def watch_window(args):
+    import pygame
+    from renderer import Renderer
+
+    pygame.init()
+    window = pygame.display.set_mode((args.width, args.height))
+    pygame.display.set_caption("Asteroids - spectating")
+    renderer = Renderer(window, args.width, args.height)
+
+    def on_frame(state, events, size):
+        for event, position in events:
+            renderer.on_event(event, position)
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            return False
+        renderer.update()
+        renderer.draw(state)
+        renderer.present()
+        return True
+
+    asyncio.run(watch(args.host, args.port, SpectatorState(), on_frame))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast a headless game to spectators, or watch one")
+    parser.add_argument("mode", choices=("serve", "watch"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--seconds", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.mode == "serve":
+        asyncio.run(serve(args))
+    else:
+        watch_window(args)
+
+
+if __name__ == "__main__":
+    main()
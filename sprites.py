@@ -0,0 +1,182 @@
+# File: sprites.py
+
+import math
+from collections import OrderedDict
+import pygame
+
+WHITE = (255, 255, 255)
+POWER_UP_COLORS = {"shield": (0, 255, 0), "rapid_fire": (255, 255, 0), "multi_shot": (255, 0, 255)}
+
+
+class SpriteCache:
+    # Pre-rendered entity shapes, keyed by what determines their pixels
+    # (asteroid outline, ship angle, saucer size...). Each entry is a
+    # (surface, offset) pair where offset is the blit position relative to
+    # the entity's center. Least recently used entries are evicted once the
+    # cache grows past max_bytes.
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.last_used = {}
+        self.frame = 0
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypasses = 0
+        self.prepared = set()  # built ahead and not drawn yet
+
+    def begin_frame(self):
+        self.frame += 1
+
+    def get(self, key, build, optional=False):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.prepared.discard(key)
+            self.entries.move_to_end(key)
+            self.last_used[key] = self.frame
+            return entry
+        self.misses += 1
+        if optional and self.entries and self.memory >= self.max_bytes and self.in_use(next(iter(self.entries))):
+            # Everything cached is still on screen, so evicting would only
+            # thrash; let the caller draw this one directly.
+            self.bypasses += 1
+            return None
+        entry = build()
+        self.last_used[key] = self.frame
+        self.entries[key] = entry
+        self.memory += self.surface_bytes(entry[0])
+        while self.memory > self.max_bytes and len(self.entries) > 1:
+            if optional and self.in_use(next(iter(self.entries))):
+                break
+            self.evict_oldest()
+        return entry
+
+    def evict_oldest(self):
+        old_key, (old, _) = self.entries.popitem(last=False)
+        del self.last_used[old_key]
+        self.prepared.discard(old_key)
+        self.memory -= self.surface_bytes(old)
+        self.evictions += 1
+
+    def in_use(self, key):
+        # Drawn this frame or the last one
+        return self.last_used[key] >= self.frame - 1
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_pitch() * surface.get_height()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "memory_bytes": self.memory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bypasses": self.bypasses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.last_used.clear()
+        self.prepared.clear()
+        self.memory = 0
+
+    def prepare_asteroid(self, vertices):
+        # Builds an asteroid's sprite before it first goes on screen, making
+        # room from sprites that are neither on screen nor prepared
+        # themselves. Returns the entry, or None when there is no room.
+        key = ("asteroid", vertices)
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry
+        entry = render_asteroid(vertices)
+        size = self.surface_bytes(entry[0])
+        while self.memory + size > self.max_bytes and self.entries:
+            oldest = next(iter(self.entries))
+            if self.in_use(oldest) or oldest in self.prepared:
+                return None
+            self.evict_oldest()
+        self.last_used[key] = self.frame
+        self.entries[key] = entry
+        self.prepared.add(key)
+        self.memory += size
+        return entry
+
+    def asteroid(self, vertices):
+        # Returns None when the cache is too small for every asteroid on
+        # screen; the caller then draws the outline directly.
+        return self.get(("asteroid", vertices), lambda: render_asteroid(vertices), optional=True)
+
+    def ship(self, angle):
+        # Ship.rotate always turns in 5 degree steps
+        angle = int(round(angle / 5)) * 5 % 360
+        return self.get(("ship", angle), lambda: render_ship(angle))
+
+    def shield(self, radius):
+        return self.get(("shield", radius), lambda: render_circle(radius + 5, (0, 255, 255), 1))
+
+    def bullet(self, radius):
+        return self.get(("bullet", radius), lambda: render_circle(radius, WHITE, 0))
+
+    def saucer(self, radius):
+        return self.get(("saucer", radius), lambda: render_saucer(radius))
+
+    def power_up(self, power_type, radius):
+        return self.get(("power_up", power_type, radius), lambda: render_power_up(power_type, radius))
+
+
+def blank_surface(half_width, half_height):
+    surface = pygame.Surface((half_width * 2 + 1, half_height * 2 + 1))
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+    surface.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+    return surface, (-half_width, -half_height)
+
+
+def render_asteroid(vertices):
+    extent = int(math.ceil(max(max(abs(x), abs(y)) for x, y in vertices))) + 2
+    surface, offset = blank_surface(extent, extent)
+    points = [(x + extent, y + extent) for x, y in vertices]
+    pygame.draw.polygon(surface, WHITE, points, 2)
+    return surface, offset
+
+
+def render_ship(angle, radius=15):
+    extent = radius + 2
+    surface, offset = blank_surface(extent, extent)
+    angle_rad = math.radians(angle)
+    points = [(extent + radius * math.cos(angle_rad + turn), extent - radius * math.sin(angle_rad + turn))
+              for turn in (0, 2.5, -2.5)]
+    pygame.draw.polygon(surface, WHITE, points, 2)
+    return surface, offset
+
+
+def render_circle(radius, color, width):
+    surface, offset = blank_surface(radius + 1, radius + 1)
+    pygame.draw.circle(surface, color, (radius + 1, radius + 1), radius, width)
+    return surface, offset
+
+
+def render_saucer(radius):
+    surface, offset = blank_surface(radius + 1, radius // 2 + 1)
+    cx, cy = radius + 1, radius // 2 + 1
+    pygame.draw.ellipse(surface, WHITE, (cx - radius, cy - radius // 2, radius * 2, radius), 2)
+    pygame.draw.rect(surface, WHITE, (cx - radius // 2, cy - radius // 4, radius, radius // 2), 2)
+    return surface, offset
+
+
+def render_power_up(power_type, radius):
+    surface, offset = blank_surface(radius + 1, radius + 1)
+    center = (radius + 1, radius + 1)
+    pygame.draw.circle(surface, POWER_UP_COLORS.get(power_type, (255, 0, 255)), center, radius)
+    pygame.draw.circle(surface, WHITE, center, radius, 1)
+    return surface, offset
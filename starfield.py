@@ -3,31 +3,139 @@
 import pygame
 import random
 
-class Star:
-    def __init__(self, x, y, speed):
-        self.x = x
-        self.y = y
-        self.speed = speed
+# Slowest and fastest layer speeds in pixels per frame, and the brightness of
+# the farthest and nearest layers
+MIN_SPEED = 0.1
+MAX_SPEED = 0.5
+MIN_BRIGHTNESS = 110
+MAX_BRIGHTNESS = 255
+# Past this many rects of moved stars a frame reports the whole window
+# instead, and past this many rects to repaint it repaints the whole window;
+# either way one big rect is cheaper than many small ones
+MAX_STAR_RECTS = 512
+MAX_RESTORE_RECTS = 256
+# Most stars any nearer layer holds. The far layer's cost doesn't depend on
+# how many stars it has, so it takes whatever the others don't.
+MAX_NEAR_STARS = 100
 
-    def update(self, height):
-        self.y += self.speed
-        if self.y > height:
-            self.y = 0
 
-    def draw(self, window):
-        pygame.draw.circle(window, (255, 255, 255), (int(self.x), int(self.y)), 1)
+def render_layer(width, height, stars, brightness, opaque=False):
+    # Stars are drawn once into a tile the size of the window. Stars touching
+    # the top edge are drawn again past the bottom one so the tile wraps
+    # without a seam.
+    layer = pygame.Surface((width, height))
+    color = (brightness, brightness, brightness)
+    for x, y in stars:
+        pygame.draw.circle(layer, color, (x, y), 1)
+        if y < 2:
+            pygame.draw.circle(layer, color, (x, y + height), 1)
+        elif y >= height - 1:
+            pygame.draw.circle(layer, color, (x, y - height), 1)
+    if not opaque:
+        # Run-length encoding makes the empty space between stars nearly
+        # free to blit
+        layer.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+    return layer
+
 
 class Starfield:
-    def __init__(self, width, height):
+    # Each parallax depth is a pre-rendered tile scrolled down at its own
+    # speed. The farthest layer is opaque and doubles as the window clear;
+    # each nearer layer holds a quarter as many stars as the one behind it,
+    # up to MAX_NEAR_STARS.
+    # The far layer scrolls slowest, so most frames only repaint what was
+    # drawn over last frame and the nearer layers' stars, and report just
+    # the stars that moved.
+    def __init__(self, width, height, rng=random, count=400, layers=3):
         self.width = width
         self.height = height
-        self.stars = [Star(random.randint(0, width), random.randint(0, height), random.uniform(0.1, 0.5)) 
-                      for _ in range(100)]
+        self.layers = []
+        self.stars = []  # per layer, (x, y) of each star in its tile
+        self.speeds = []
+        self.offsets = [0.0] * layers
+        self.drawn = None
+        weights = [4 ** (layers - 1 - depth) for depth in range(layers)]
+        counts = [count * weight // sum(weights) for weight in weights]
+        counts[-1] += count - sum(counts)
+        for depth in range(1, layers):
+            counts[0] += max(0, counts[depth] - MAX_NEAR_STARS)
+            counts[depth] = min(counts[depth], MAX_NEAR_STARS)
+        for depth in range(layers):
+            near = depth / (layers - 1) if layers > 1 else 1.0
+            brightness = int(MIN_BRIGHTNESS + (MAX_BRIGHTNESS - MIN_BRIGHTNESS) * near)
+            stars = [(rng.randint(0, width), rng.randint(0, height)) for _ in range(counts[depth])]
+            self.stars.append(stars)
+            self.layers.append(render_layer(width, height, stars, brightness, opaque=depth == 0))
+            self.speeds.append(MIN_SPEED + (MAX_SPEED - MIN_SPEED) * near)
 
     def update(self):
-        for star in self.stars:
-            star.update(self.height)
+        height = self.height
+        self.offsets = [(offset + speed) % height for offset, speed in zip(self.offsets, self.speeds)]
+
+    def draw(self, window, offsets=None, erase=None):
+        # Paints the layers scrolled to `offsets` (by default the current ones;
+        # update() replaces the list rather than changing it, so a saved one
+        # stays valid). `erase` lists what was drawn over the stars since the
+        # last call; without it the whole window is repainted. Returns the
+        # rects whose stars changed.
+        height = self.height
+        positions = [int(offset) for offset in (self.offsets if offsets is None else offsets)]
+        drawn, self.drawn = self.drawn, positions
+        if drawn is None or erase is None:
+            self.blit_layers(window, positions, 0)
+            return [window.get_rect()]
+        changed = []
+        for stars, old, new in zip(self.stars, drawn, positions):
+            if old != new:
+                moved = None if len(changed) + len(stars) > MAX_STAR_RECTS else self.moved(stars, old, new)
+                if moved is None:
+                    changed = None
+                    break
+                changed.extend(moved)
+        if changed is None or positions[0] != drawn[0] or len(erase) + len(changed) > MAX_RESTORE_RECTS:
+            self.blit_layers(window, positions, 0)
+        else:
+            # Put the far layer back under last frame's drawing and where
+            # nearer stars were, then lay the nearer layers over it again
+            far = self.layers[0]
+            y = positions[0]
+            bounds = window.get_rect()
+            blits = []
+            for rect in erase + changed:
+                rect = rect.clip(bounds)
+                top = (rect.top - y) % height
+                if top + rect.height <= height:
+                    blits.append((far, rect.topleft, (rect.left, top, rect.width, rect.height)))
+                else:
+                    split = height - top
+                    blits.append((far, rect.topleft, (rect.left, top, rect.width, split)))
+                    blits.append((far, (rect.left, rect.top + split), (rect.left, 0, rect.width, rect.height - split)))
+            window.blits(blits, doreturn=False)
+            self.blit_layers(window, positions, 1)
+        return [window.get_rect()] if changed is None else changed
+
+    def blit_layers(self, window, positions, first):
+        height = self.height
+        blits = []
+        for layer, y in zip(self.layers[first:], positions[first:]):
+            blits.append((layer, (0, y)))
+            if y:
+                blits.append((layer, (0, y - height)))
+        window.blits(blits, doreturn=False)
 
-    def draw(self, window):
-        for star in self.stars:
-            star.draw(window)
\ No newline at end of file
+    def moved(self, stars, old, new):
+        # Rects covering where a layer's stars were drawn at offset `old` and
+        # are now at `new`, or None if it jumped too far to bother
+        height = self.height
+        step = (new - old) % height
+        if step > 2:
+            return None
+        rects = []
+        for x, y in stars:
+            rect = pygame.Rect(x - 1, (y + old) % height - 1, 2, step + 2)
+            rects.append(rect)
+            if rect.top < 0:
+                rects.append(rect.move(0, height))
+            elif rect.bottom > height:
+                rects.append(rect.move(0, -height))
+        return rects
@@ -0,0 +1,39 @@
+# File: startup.py
+
+import threading
+import time
+import pygame
+
+
+class Preloader:
+    # Starts the mixer, imports the game modules (renderer, particles...) and
+    # decodes the sounds on a background thread while the menu is already up. make_game() waits
+    # for that to finish, then builds the Game on the calling thread, which
+    # owns the window.
+    def __init__(self):
+        self.error = None
+        self.game_module = None
+        self.elapsed = None
+        self.thread = threading.Thread(target=self.run, name="preload", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            pygame.mixer.init()
+            import audio
+            import game
+            audio.load_bank(audio.default_backend())
+            self.game_module = game
+        except Exception as error:
+            self.error = error
+        self.elapsed = time.perf_counter() - start
+
+    def wait(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def make_game(self, *args, **kwargs):
+        self.wait()
+        return self.game_module.Game(*args, **kwargs)
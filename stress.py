@@ -0,0 +1,268 @@
+# File: stress.py
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+from entities import FlyingSaucer, PowerUp, TICK_RATE
+from profiler import FrameProfiler, COUNTS, PHASES
+from world import World, Inputs
+
+WIDTH = 800
+HEIGHT = 600
+
+# Scenario files are JSON:
+#
+#   {"duration": 60, "budget_ms": 16.7, "seed": 1,
+#    "targets": {"asteroids": [[0, 20], [60, 4000]], "bullets": [[0, 0], [30, 1000]],
+#                "saucers": [[20, 0], [60, 100]], "power_ups": [[0, 5]]},
+#    "bursts": [{"at": 10, "every": 5, "explosions": 40}, {"at": 45, "bullets": 2000}],
+#    "saucer_odds": 0, "power_up_odds": 0}
+#
+# duration is in seconds of game time. Each target is a trace of
+# [seconds, count] points: counts ramp linearly between points and hold
+# after the last one, and every tick tops that kind of entity up to its
+# count (nothing is removed). A burst adds `explosions` explosions and
+# `bullets` bullets at random spots at `at` seconds, then again every
+# `every` seconds if given. The odds replace World's 1 in n chances of a
+# saucer or power-up spawning each tick; 0 turns that off. Missing keys
+# come from DEFAULT_SCENARIO.
+DEFAULT_SCENARIO = {
+    "duration": 60,
+    "budget_ms": 1000 / TICK_RATE,
+    "seed": 1,
+    "targets": {"asteroids": [[0, 20], [60, 4000]], "bullets": [[0, 0], [60, 1000]],
+                "saucers": [[0, 0], [60, 100]]},
+    "bursts": [{"at": 5, "every": 5, "explosions": 40}],
+    "saucer_odds": 0,
+    "power_up_odds": 0,
+}
+KINDS = ("asteroids", "bullets", "saucers", "power_ups")
+# Length of each sample, in seconds of game time
+SAMPLE_SECONDS = 1.0
+
+
+def ramp(trace, seconds):
+    # The count a [[seconds, count], ...] trace gives at this time
+    if seconds <= trace[0][0]:
+        return trace[0][1]
+    for (t0, c0), (t1, c1) in zip(trace, trace[1:]):
+        if seconds < t1:
+            return c0 + (c1 - c0) * (seconds - t0) / (t1 - t0)
+    return trace[-1][1]
+
+
+def resident_bytes():
+    # Current resident set size, or None where /proc isn't available
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Scenario:
+    def __init__(self, data=None):
+        data = dict(DEFAULT_SCENARIO, **(data or {}))
+        self.duration = data["duration"]
+        self.budget_ms = data["budget_ms"]
+        self.seed = data["seed"]
+        self.targets = {kind: sorted(trace) for kind, trace in data["targets"].items()}
+        unknown = set(self.targets) - set(KINDS)
+        if unknown:
+            raise ValueError(f"unknown target kinds: {', '.join(sorted(unknown))}")
+        self.bursts = data["bursts"]
+        self.saucer_odds = data["saucer_odds"]
+        self.power_up_odds = data["power_up_odds"]
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls(json.load(file))
+
+    def targets_at(self, seconds):
+        return {kind: int(ramp(trace, seconds)) for kind, trace in self.targets.items()}
+
+    def bursts_at(self, tick):
+        # The bursts that go off on this tick
+        due = []
+        for burst in self.bursts:
+            start = round(burst["at"] * TICK_RATE)
+            every = round(burst.get("every", 0) * TICK_RATE)
+            if tick == start or (every and tick > start and (tick - start) % every == 0):
+                due.append(burst)
+        return due
+
+
+class StressRun:
+    # Plays a Scenario headlessly as fast as it will go, one logic tick and,
+    # with render=True, one drawn frame per step. Every SAMPLE_SECONDS of
+    # game time it keeps a sample: entity counts, ticks per wall-clock
+    # second, frame time percentiles, per-phase medians and resident
+    # memory. over_budget is the first sample whose p95 frame time went
+    # over the scenario's budget.
+    def __init__(self, scenario, render=True, width=WIDTH, height=HEIGHT):
+        self.scenario = scenario
+        self.width = width
+        self.height = height
+        self.rng = random.Random(scenario.seed)
+        self.world = World(width, height, seed=scenario.seed, threaded_waves=False)
+        self.world.saucer_odds = scenario.saucer_odds
+        self.world.power_up_odds = scenario.power_up_odds
+        self.ticks = round(scenario.duration * TICK_RATE)
+        self.profiler = FrameProfiler(history=self.ticks)
+        self.world.profiler = self.profiler
+        self.renderer = None
+        if render:
+            import pygame
+            from renderer import Renderer
+            pygame.init()
+            window = pygame.display.set_mode((width, height))
+            self.renderer = Renderer(window, width, height, dirty_rects=True, seed=scenario.seed)
+            self.renderer.profiler = self.profiler
+            self.world.subscribe(self.renderer.on_event)
+        self.samples = []
+        self.sampled = 0  # profiler frames already in a sample
+        self.over_budget = None
+
+    def random_position(self):
+        return [self.rng.uniform(0, self.width), self.rng.uniform(0, self.height)]
+
+    def top_up(self, targets):
+        world = self.world
+        rng = self.rng
+        for _ in range(targets.get("asteroids", 0) - len(world.asteroids)):
+            world.asteroids.append(world.make_asteroid(rng.randint(1, 3), self.random_position()))
+        for _ in range(targets.get("bullets", 0) - len(world.bullets)):
+            world.bullets.append(world.make_bullet(self.random_position(), rng.uniform(0, 360)))
+        for _ in range(targets.get("saucers", 0) - len(world.flying_saucers)):
+            saucer = FlyingSaucer(self.width, self.height, world.rng)
+            saucer.id = world.new_id()
+            world.flying_saucers.append(saucer)
+        for _ in range(targets.get("power_ups", 0) - len(world.power_ups)):
+            power_up = PowerUp(rng.choice(["shield", "rapid_fire", "multi_shot"]), self.width, self.height, rng)
+            power_up.id = world.new_id()
+            world.power_ups.append(power_up)
+
+    def burst(self, burst):
+        world = self.world
+        for _ in range(burst.get("explosions", 0)):
+            world.emit("explosion", self.random_position())
+        for _ in range(burst.get("bullets", 0)):
+            world.bullets.append(world.make_bullet(self.random_position(), self.rng.uniform(0, 360)))
+
+    def counts(self):
+        world = self.world
+        particles = self.renderer.particle_system.live_count() if self.renderer else 0
+        return (len(world.asteroids), len(world.bullets), len(world.flying_saucers), len(world.power_ups),
+                particles)
+
+    def step(self, tick):
+        profiler = self.profiler
+        world = self.world
+        profiler.begin_frame()
+        # Load injection stands in for reading input
+        self.top_up(self.scenario.targets_at(tick / TICK_RATE))
+        for burst in self.scenario.bursts_at(tick):
+            self.burst(burst)
+        profiler.mark("input")
+        world.step(Inputs())
+        if self.renderer is not None:
+            self.renderer.update()
+            self.renderer.draw(world)
+            profiler.mark("draw")
+            self.renderer.present()
+            profiler.mark("present")
+        profiler.end_frame(self.counts())
+
+    def run(self, until_over=False, report=None):
+        # report, if given, is called with each sample as it is taken
+        per_sample = max(1, round(SAMPLE_SECONDS * TICK_RATE))
+        start = time.perf_counter()
+        for tick in range(self.ticks):
+            self.step(tick)
+            if (tick + 1) % per_sample == 0 or tick + 1 == self.ticks:
+                now = time.perf_counter()
+                sample = self.sample(tick + 1, now - start)
+                start = now
+                self.samples.append(sample)
+                if report is not None:
+                    report(sample)
+                if self.over_budget is None and sample["p95_ms"] > self.scenario.budget_ms:
+                    self.over_budget = sample
+                    if until_over:
+                        break
+        return self.samples
+
+    def sample(self, ticks, elapsed):
+        rows = list(self.profiler.frames)[self.sampled:]
+        self.sampled += len(rows)
+        totals = sorted(row[1 + len(PHASES)] for row in rows)
+        counts = rows[-1][-len(COUNTS):]
+        return {
+            "seconds": ticks / TICK_RATE,
+            "asteroids": counts[0],
+            "bullets": counts[1],
+            "saucers": counts[2],
+            "power_ups": counts[3],
+            "particles": counts[4],
+            "ticks_per_second": len(rows) / elapsed if elapsed else 0.0,
+            "p50_ms": totals[len(totals) // 2],
+            "p95_ms": totals[min(len(totals) - 1, len(totals) * 95 // 100)],
+            "max_ms": totals[-1],
+            "phases_ms": {phase: statistics.median(row[1 + i] for row in rows) for i, phase in enumerate(PHASES)},
+            "resident_bytes": resident_bytes(),
+        }
+
+
+def format_sample(sample):
+    memory = sample["resident_bytes"]
+    phases = sample["phases_ms"]
+    return (f"{sample['seconds']:6.1f} {sample['asteroids']:6d} {sample['bullets']:6d} {sample['saucers']:5d} "
+            f"{sample['particles']:6d} {sample['ticks_per_second']:7.0f} {sample['p50_ms']:7.2f} "
+            f"{sample['p95_ms']:7.2f} {phases['update']:6.2f} {phases['collisions']:6.2f} {phases['draw']:6.2f} "
+            f"{memory / 2 ** 20 if memory is not None else float('nan'):7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp entity counts headlessly and find where frames go over budget")
+    parser.add_argument("scenario", nargs="?", help="scenario file (default: the built-in ramp)")
+    parser.add_argument("--duration", type=float, help="seconds of game time, overriding the scenario")
+    parser.add_argument("--budget", type=float, help="frame budget in ms, overriding the scenario")
+    parser.add_argument("--no-render", action="store_true", help="simulate only, without drawing frames")
+    parser.add_argument("--until-over", action="store_true", help="stop at the first sample over budget")
+    parser.add_argument("--output", help="save the samples as JSON")
+    parser.add_argument("--trace", help="save every frame's profile (.csv or .json, as ASTEROIDS_TRACE)")
+    args = parser.parse_args()
+
+    if not args.no_render:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    scenario = Scenario.load(args.scenario) if args.scenario else Scenario()
+    if args.duration is not None:
+        scenario.duration = args.duration
+    if args.budget is not None:
+        scenario.budget_ms = args.budget
+    run = StressRun(scenario, render=not args.no_render)
+
+    print(f"{scenario.duration:g} s of game time, frame budget {scenario.budget_ms:.1f} ms")
+    print(f"{'time':>6} {'ast':>6} {'bul':>6} {'sau':>5} {'part':>6} {'tick/s':>7} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'update':>6} {'coll':>6} {'draw':>6} {'RSS MiB':>7}")
+    run.run(args.until_over, lambda sample: print(format_sample(sample)))
+    over = run.over_budget
+    if over is None:
+        print("stayed within budget")
+    else:
+        print(f"over budget at {over['seconds']:.1f} s: {over['asteroids']} asteroids, {over['bullets']} bullets, "
+              f"{over['saucers']} saucers, {over['particles']} particles (p95 {over['p95_ms']:.2f} ms)")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"budget_ms": scenario.budget_ms, "samples": run.samples, "over_budget": over}, file, indent=1)
+    if args.trace:
+        run.profiler.export(args.trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+# File: world.py
+
+import heapq
+import logging
+import random
+import struct
+import zlib
+from collision import time_of_impact
+from entities import Ship, Asteroid, Bullet, FlyingSaucer, PowerUp, TIMESTEP
+from levels import LevelSet, WavePlanner
+from saucer_ai import SaucerAI
+from spatial import SpatialHash
+from pool import Pool, swap_remove
+
+# Input bits, as stored in replay logs and passed to BatchWorld
+LEFT = 1
+RIGHT = 2
+THRUST = 4
+FIRE = 8
+
+# Each tick spawns a saucer with a 1 in SAUCER_ODDS chance and a power-up
+# with a 1 in POWER_UP_ODDS chance
+SAUCER_ODDS = 1000
+POWER_UP_ODDS = 600
+
+# Kinds of bullet hit, in the order same-time hits are resolved
+ASTEROID_HIT = 0
+SAUCER_HIT = 1
+
+log = logging.getLogger(__name__)
+
+
+class Inputs:
+    def __init__(self, left=False, right=False, thrust=False, fire=False):
+        self.left = left
+        self.right = right
+        self.thrust = thrust
+        self.fire = fire
+
+    def to_bits(self):
+        return (LEFT if self.left else 0) | (RIGHT if self.right else 0) | \
+               (THRUST if self.thrust else 0) | (FIRE if self.fire else 0)
+
+    @classmethod
+    def from_bits(cls, bits):
+        return cls(bool(bits & LEFT), bool(bits & RIGHT), bool(bits & THRUST), bool(bits & FIRE))
+
+
+class World:
+    # Pure game logic: no pygame, no window, no sound. Frontends subscribe
+    # to the events emitted here ("shoot", "thrust", "explosion"). Waves of
+    # asteroids come from a LevelSet, built ahead of time by a WavePlanner.
+    # Saucers are flown by a SaucerAI for the given difficulty (see
+    # saucer_ai.DIFFICULTIES).
+    def __init__(self, width, height, seed=None, levels=None, threaded_waves=True, difficulty="normal"):
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.waves = WavePlanner(levels or LevelSet(), width, height, threaded_waves)
+        self.saucer_ai = SaucerAI(difficulty)
+        # Spawn chances per tick; 0 turns spawning off
+        self.saucer_odds = SAUCER_ODDS
+        self.power_up_odds = POWER_UP_ODDS
+        self.listeners = []
+        # Optional FrameProfiler; step() marks its update and collision phases
+        self.profiler = None
+        self.asteroid_grid = SpatialHash(width, height)
+        self.saucer_grid = SpatialHash(width, height)
+        self.asteroid_reach = 0
+        self.saucer_reach = 0
+        self.bullet_pool = Pool(Bullet)
+        self.asteroid_pool = Pool(Asteroid)
+        # Entity IDs keep increasing across resets, so an ID never names two
+        # different entities over the life of a World
+        self.next_id = 1
+        self.asteroids = []
+        self.bullets = []
+        self.reset()
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def emit(self, event, position):
+        for listener in self.listeners:
+            listener(event, position)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.ship = Ship(self.width // 2, self.height // 2)
+        self.asteroid_pool.release_all(self.asteroids)
+        self.bullet_pool.release_all(self.bullets)
+        self.asteroids = []
+        self.bullets = []
+        self.flying_saucers = []
+        self.saucer_ai.cursor = 0
+        self.power_ups = []
+        self.score = 0
+        self.lives = 3
+        self.level = 1
+        self.tick = 0
+        self.time = 0.0
+        # Waves are seeded from the world's own stream, so a seeded world
+        # still plays out the same
+        self.waves.start(self.rng.getrandbits(64))
+        self.spawn_wave(self.level)
+
+    @property
+    def game_over(self):
+        return self.lives <= 0
+
+    def state_hash(self):
+        # CRC of everything that affects the simulation, used to check that
+        # a replay follows the recorded game frame by frame.
+        ship = self.ship
+        values = [self.tick, self.score, self.lives, self.level, *ship.position, *ship.speed, ship.angle,
+                  ship.shield_timer, ship.rapid_fire_timer, ship.multi_shot_timer]
+        for asteroid in self.asteroids:
+            values += (asteroid.size, *asteroid.position, *asteroid.speed)
+        for bullet in self.bullets:
+            values += (bullet.lifetime, *bullet.position)
+        for saucer in self.flying_saucers:
+            values += (saucer.size, *saucer.position, saucer.shoot_timer)
+        for power_up in self.power_ups:
+            values += (power_up.duration, *power_up.position)
+        return zlib.crc32(struct.pack(f"{len(values)}d", *values))
+
+    def spawn_wave(self, level):
+        wave = self.waves.take(level)
+        for asteroid in wave:
+            asteroid.id = self.new_id()
+        self.asteroids.extend(wave)
+        log.debug("Spawned wave %d. Total asteroids: %d", level, len(self.asteroids))
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def make_asteroid(self, size, position=None):
+        asteroid = self.asteroid_pool.acquire(size, self.width, self.height, position, self.rng)
+        asteroid.id = self.new_id()
+        return asteroid
+
+    def make_bullet(self, position, angle, owner=None):
+        bullet = self.bullet_pool.acquire(position, angle, owner)
+        bullet.id = self.new_id()
+        return bullet
+
+    def step(self, inputs):
+        self.apply_inputs(self.ship, inputs)
+        self.update()
+        if self.profiler:
+            self.profiler.mark("update")
+        self.check_collisions()
+        if self.profiler:
+            self.profiler.mark("collisions")
+        self.tick += 1
+        self.time += TIMESTEP
+
+    def apply_inputs(self, ship, inputs, owner=None):
+        if inputs.fire:
+            self.bullets.append(self.make_bullet(ship.position, ship.angle, owner))
+            self.emit("shoot", ship.position)
+        if inputs.left:
+            ship.rotate(1)
+        if inputs.right:
+            ship.rotate(-1)
+        if inputs.thrust:
+            ship.thrust()
+            self.emit("thrust", ship.position)
+
+    def update(self):
+        self.ship.update(self.width, self.height)
+        self.update_field([self.ship])
+
+    def update_field(self, ships):
+        # Everything but the ships; saucers aim at the nearest one
+        for asteroid in self.asteroids:
+            asteroid.update(self.width, self.height)
+        for bullet in self.bullets:
+            bullet.update(self.width, self.height)
+        if self.flying_saucers:
+            self.update_saucers(ships)
+        for power_up in self.power_ups:
+            power_up.update()
+
+        # Spawn flying saucers
+        if self.saucer_odds and self.rng.randint(1, self.saucer_odds) == 1:
+            saucer = FlyingSaucer(self.width, self.height, self.rng)
+            saucer.id = self.new_id()
+            self.flying_saucers.append(saucer)
+
+        # Spawn power-ups
+        if self.power_up_odds and self.rng.randint(1, self.power_up_odds) == 1:
+            power_type = self.rng.choice(["shield", "rapid_fire", "multi_shot"])
+            power_up = PowerUp(power_type, self.width, self.height, self.rng)
+            power_up.id = self.new_id()
+            self.power_ups.append(power_up)
+
+        # Remove expired bullets and power-ups
+        expired = [i for i, bullet in enumerate(self.bullets) if bullet.lifetime <= 0]
+        if expired:
+            self.bullet_pool.release_all(swap_remove(self.bullets, expired))
+        expired = [i for i, power_up in enumerate(self.power_ups) if power_up.duration <= 0]
+        if expired:
+            swap_remove(self.power_ups, expired)
+
+        # Level progression
+        if len(self.asteroids) == 0:
+            self.level += 1
+            self.spawn_wave(self.level)
+
+    def update_saucers(self, ships):
+        ai = self.saucer_ai
+        due = ai.due(self.flying_saucers)
+        if due:
+            # The collision pass rebuilds this grid too, but by then
+            # asteroids have moved and some have been removed
+            self.asteroid_grid.rebuild(self.asteroids)
+            for saucer in due:
+                ai.plan(saucer, ships, self.asteroids, self.asteroid_grid, self.width, self.height)
+        for saucer in self.flying_saucers:
+            if saucer.update(self.width, self.height):
+                saucer_bullet = ai.shoot(saucer, ships, self.make_bullet, self.width, self.height)
+                if saucer_bullet:
+                    self.bullets.append(saucer_bullet)
+
+    def award(self, bullet, points):
+        self.score += points
+
+    def ship_hit(self, ship):
+        self.lives -= 1
+        self.emit("explosion", ship.position)
+        ship.reset(self.width // 2, self.height // 2)
+        self.emit("respawn", ship.position)
+
+    def check_collisions(self):
+        dead = self.collide_bullets()
+        self.collide_ship(self.ship, *dead[1:])
+        self.remove_dead(*dead)
+        self.collect_power_ups(self.ship)
+
+    def collide_bullets(self):
+        # Also rebuilds the grids that collide_ship queries. Hits are swept
+        # over the whole tick and resolved in the order they happened, so a
+        # fast bullet can't skip over a small asteroid and the first bullet
+        # to reach an asteroid is the one that scores.
+        self.asteroid_grid.rebuild(self.asteroids)
+        self.saucer_grid.rebuild(self.flying_saucers)
+        # Broad-phase queries are widened by how far anything moved this tick
+        self.asteroid_reach = max((abs(a.speed[0]) + abs(a.speed[1]) for a in self.asteroids), default=0)
+        self.saucer_reach = max((abs(s.speed[0]) + abs(s.speed[1]) for s in self.flying_saucers), default=0)
+        width, height = self.width, self.height
+        largest = max((a.radius for a in self.asteroids), default=0)
+        bullets = self.bullets
+        # Each bullet's earliest hit found so far, in the order they happened.
+        # Its other hits are only looked at if that one's target is claimed
+        # by an earlier bullet first.
+        pending = []
+        scans = [None] * len(bullets)
+        for b, bullet in enumerate(bullets):
+            x, y = bullet.position
+            travel = bullet.radius + abs(bullet.speed[0]) + abs(bullet.speed[1])
+            found = []
+            if self.flying_saucers:
+                for s in self.saucer_grid.query(x, y, travel + self.saucer_reach):
+                    t = time_of_impact(bullet, self.flying_saucers[s], width, height)
+                    if t is not None:
+                        found.append((t, SAUCER_HIT, s))
+                heapq.heapify(found)
+            candidates = sorted(self.asteroid_grid.query(x, y, travel + self.asteroid_reach))
+            limit = travel + self.asteroid_reach + largest
+            scanned = self.scan_asteroids(bullet, candidates, 0, limit, found, ())
+            if found:
+                t, kind, i = found[0]
+                pending.append((t, b, kind, i))
+                scans[b] = [found, candidates, scanned, limit]
+        heapq.heapify(pending)
+
+        dead_bullets = set()
+        dead_asteroids = set()
+        dead_saucers = set()
+        fragments = []
+        while pending:
+            t, b, kind, i = heapq.heappop(pending)
+            bullet = bullets[b]
+            if i in (dead_asteroids if kind == ASTEROID_HIT else dead_saucers):
+                # Claimed already; move on to this bullet's next hit
+                scan = scans[b]
+                found, candidates, scanned, limit = scan
+                heapq.heappop(found)
+                if scanned < len(candidates):
+                    scan[2] = self.scan_asteroids(bullet, candidates, scanned, limit, found, dead_asteroids)
+                if found:
+                    t, kind, i = found[0]
+                    heapq.heappush(pending, (t, b, kind, i))
+                continue
+            if kind == ASTEROID_HIT:
+                asteroid = self.asteroids[i]
+                dead_bullets.add(b)
+                dead_asteroids.add(i)
+                self.award(bullet, 100 * asteroid.size)
+                self.emit("explosion", asteroid.position)
+                if asteroid.size > 1:
+                    for _ in range(2):
+                        fragments.append(self.make_asteroid(asteroid.size - 1, asteroid.position))
+            else:
+                saucer = self.flying_saucers[i]
+                dead_bullets.add(b)
+                dead_saucers.add(i)
+                self.award(bullet, 500 * saucer.size)
+                self.emit("explosion", saucer.position)
+        return dead_bullets, dead_asteroids, dead_saucers, fragments
+
+    def scan_asteroids(self, bullet, candidates, start, limit, found, claimed):
+        # Pushes the bullet's hits on candidates[start:] that aren't already
+        # claimed onto found, stopping
+        # after one that was already touching: candidates are in index order,
+        # so nothing past it can be resolved first. Returns where to carry on.
+        # Candidates are screened with a plain box test first, except near
+        # the edges where the nearest copy may be across a wrap.
+        width, height = self.width, self.height
+        x, y = bullet.position
+        inside = limit < x < width - limit and limit < y < height - limit
+        asteroids = self.asteroids
+        for n in range(start, len(candidates)):
+            a = candidates[n]
+            if a in claimed:
+                continue
+            asteroid = asteroids[a]
+            if inside and not (-limit < x - asteroid.position[0] < limit and
+                               -limit < y - asteroid.position[1] < limit):
+                continue
+            t = time_of_impact(bullet, asteroid, width, height)
+            if t is not None:
+                heapq.heappush(found, (t, ASTEROID_HIT, a))
+                if t == 0.0:
+                    return n + 1
+        return len(candidates)
+
+    def collide_ship(self, ship, dead_asteroids, dead_saucers, fragments):
+        # The ship is hit at most once a tick, by whatever it touched first.
+        # Its speed has already had this tick's friction applied, which is
+        # close enough for the sweep.
+        if ship.shield_active:
+            return
+        width, height = self.width, self.height
+        x, y = ship.position
+        travel = ship.radius + abs(ship.speed[0]) + abs(ship.speed[1])
+        first = None
+        candidates = [self.asteroids[a] for a in self.asteroid_grid.query(x, y, travel + self.asteroid_reach)
+                      if a not in dead_asteroids]
+        for asteroid in candidates + fragments:
+            t = time_of_impact(ship, asteroid, width, height)
+            if t is not None and (first is None or t < first[0]):
+                first = (t, None)
+        for s in self.saucer_grid.query(x, y, travel + self.saucer_reach):
+            if s not in dead_saucers:
+                t = time_of_impact(ship, self.flying_saucers[s], width, height)
+                if t is not None and (first is None or t < first[0]):
+                    first = (t, s)
+        if first is not None:
+            self.ship_hit(ship)
+            if first[1] is not None:
+                dead_saucers.add(first[1])
+
+    def remove_dead(self, dead_bullets, dead_asteroids, dead_saucers, fragments):
+        # Remove destroyed entities in place and recycle them
+        if dead_bullets:
+            self.bullet_pool.release_all(swap_remove(self.bullets, dead_bullets))
+        if dead_asteroids:
+            self.asteroid_pool.release_all(swap_remove(self.asteroids, dead_asteroids))
+        self.asteroids.extend(fragments)
+        if dead_saucers:
+            swap_remove(self.flying_saucers, dead_saucers)
+
+    def collect_power_ups(self, ship):
+        # Ship-PowerUp collision
+        collected = []
+        for p, power_up in enumerate(self.power_ups):
+            if ship.collides_with(power_up):
+                if power_up.type == "shield":
+                    ship.activate_shield()
+                elif power_up.type == "rapid_fire":
+                    ship.activate_rapid_fire()
+                elif power_up.type == "multi_shot":
+                    ship.activate_multi_shot()
+                collected.append(p)
+        if collected:
+            swap_remove(self.power_ups, collected)